@@ -1,15 +1,42 @@
 # Import required modules
+import sqlite3
+import threading
 import dash
 from dash import html, dcc
 from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc
+import config
+import main
 from main import font_awesome
+from services import callback_metrics, jobs, metrics, profiling, reload, responses, startup, warmup
+from services.scheduler import ServerBusy
 
-# Connect to app pages
-from pages import page_landing, page_table, page_graph
+
+# Without a writable cache directory (e.g. a read-only serverless file system) the callbacks run inline instead. This
+# is decided before the pages register their callbacks with config.BACKGROUND_CALLBACKS.
+background_callback_manager = None
+if config.BACKGROUND_CALLBACKS:
+    try:
+        background_callback_manager = jobs.JobManager(config.BACKGROUND_CACHE_DIR)
+    except (OSError, sqlite3.Error):
+        config.BACKGROUND_CALLBACKS = False
+
+# Connect to app pages. Importing a page only registers its callbacks: Dash hands the callbacks to the browser once,
+# on its first request, so they cannot be added later. The layouts are built on the first visit of their route.
+with startup.phase('import pages'):
+    from pages import page_landing, page_table, page_graph
+
+# Page of every route.
+ROUTES = {
+    '/': page_landing,
+    '/pages/table': page_table,
+    '/pages/graph': page_graph,
+}
 
 # Initialize the Dash app
-app = dash.Dash(__name__, suppress_callback_exceptions=True, external_stylesheets=[dbc.themes.LUMEN, font_awesome])
+with startup.phase('create app'):
+    app = dash.Dash(__name__, suppress_callback_exceptions=True, external_stylesheets=[dbc.themes.LUMEN, font_awesome],
+                    background_callback_manager=background_callback_manager)
 
 # create app layout
 app.layout = html.Div([ 
@@ -56,16 +83,74 @@ app.layout = html.Div([
 
 @app.callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
+@main.dataset.pinned
 def display_page(pathname):
-    if pathname == '/':
-        return page_landing.layout
-    elif pathname == '/pages/table':
-        return page_table.layout
-    elif pathname == '/pages/graph':
-        return page_graph.layout
+    if pathname in ROUTES:
+        return get_layout(pathname)
+
+
+# Layout of every visited route and the dataset version it was built from, so a reload rebuilds it on the next visit.
+layouts = {}
+layouts_lock = threading.Lock()
+
+
+def get_layout(pathname):
+    version = main.dataset.version
+    cached = layouts.get(pathname)
+    hit = cached is not None and cached[0] == version
+    if not hit:
+        with layouts_lock:
+            cached = layouts.get(pathname)
+            if cached is None or cached[0] != version:
+                cached = layouts[pathname] = (version, ROUTES[pathname].create_layout())
+    callback_metrics.record_cache_lookup('display_page', 'layout', hit)
+    return cached[1]
 
 
 server = app.server
+
+# Reload the dataset incrementally whenever the source file changes. Every process (e.g. gunicorn worker) runs its own
+# watcher; the shared stores make sure the increment is only built once.
+if config.RELOAD_INTERVAL > 0:
+    source_watcher = reload.SourceWatcher(main.source_file_path, config.RELOAD_INTERVAL, main.refresh_dataset,
+                                          main.dataset_version)
+    source_watcher.start()
+
+# Precompute popular views into the result cache now and after every reload, while no real request needs the CPU.
+warmer = None
+if config.WARMUP_VIEWS and config.RESULT_CACHE_ENTRIES > 0:
+    warmer = warmup.Warmer(config.WARMUP_VIEWS, config.WARMUP_IDLE_SECONDS)
+    main.dataset.subscribe(lambda previous, snapshot, appended: warmer.start())
+    warmer.start()
+
+
+# Heavy callbacks rejected by admission control get a fast "busy" response instead of waiting in line.
+@server.errorhandler(ServerBusy)
+def handle_server_busy(error):
+    return str(error), 503, {'Retry-After': '1'}
+
+
+# Latency, payload, status and input metrics of every callback.
+callback_metrics.instrument(app)
+# Profile flagged callback requests when config.PROFILING is on.
+profiling.instrument(app)
+# Compress responses and answer unchanged layouts and assets with 304. Registered last so it runs first, and the
+# callback metrics record the bytes actually sent.
+responses.instrument(app)
+
+
+# Expose the in-process metrics in the Prometheus text format.
+@server.route('/metrics')
+def metrics_endpoint():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+# The entries of the last warm-up pass and their results.
+@server.route('/warmup')
+def warmup_endpoint():
+    return warmer.report if warmer else {'views': [], 'state': 'disabled', 'entries': []}
+
+
 # Run the app
 if __name__ == '__main__':
     app.run_server(debug=False, port=8080)
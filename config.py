@@ -0,0 +1,87 @@
+# Runtime settings of the dashboard. Every value can be overridden with an environment variable of the same name.
+import os
+
+
+def env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Run the expensive graph callbacks as background jobs on a local process/disk-backed job manager. They run inline
+# when the cache directory cannot be created or written, e.g. on a read-only serverless file system.
+BACKGROUND_CALLBACKS = env_flag('BACKGROUND_CALLBACKS', True)
+# Directory of the disk cache used to exchange background job results between processes.
+BACKGROUND_CACHE_DIR = os.environ.get('BACKGROUND_CACHE_DIR', './cache/background')
+
+# Callbacks classified as heavy. They run in a bounded worker pool, every other callback runs inline as cheap. The pool
+# only covers callbacks running in the server process: background callbacks are admitted as jobs with the same limits.
+HEAVY_CALLBACKS = [name.strip() for name in os.environ.get(
+    'HEAVY_CALLBACKS', 'update_overview_cards,update_bubble_graph,update_timeline_graph').split(',') if name.strip()]
+# Number of worker threads executing heavy callbacks, and of background callback jobs running at once.
+HEAVY_POOL_WORKERS = int(os.environ.get('HEAVY_POOL_WORKERS', 4))
+# Maximum number of heavy callbacks (or background jobs) waiting for a worker. Requests beyond it get a fast "busy"
+# response.
+HEAVY_QUEUE_DEPTH = int(os.environ.get('HEAVY_QUEUE_DEPTH', 16))
+
+# Aggregation mode of the page callbacks: 'serial' (single pandas groupby) or 'parallel' (process pool over partitions).
+AGGREGATION_MODE = os.environ.get('AGGREGATION_MODE', 'serial')
+# Worker processes of the parallel aggregation mode.
+AGGREGATION_WORKERS = int(os.environ.get('AGGREGATION_WORKERS', os.cpu_count() or 1))
+# Partitioning of the parallel aggregation mode: 'year' or 'month' of 'Order Date'.
+AGGREGATION_PARTITION = os.environ.get('AGGREGATION_PARTITION', 'year')
+
+# Share the processed dataset between worker processes through a memory-mapped columnar store.
+SHARED_DATASET = env_flag('SHARED_DATASET', True)
+# Directory of the memory-mapped dataset store, one sub-directory per dataset version.
+SHARED_DATASET_DIR = os.environ.get('SHARED_DATASET_DIR', './cache/dataset')
+
+# Backend of the data source queried by the pages: 'pandas' (in-memory df_main) or 'sqlite' (embedded database file).
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'pandas')
+# Directory of the SQLite database files, one file per dataset version.
+SQLITE_DIR = os.environ.get('SQLITE_DIR', './cache/sqlite')
+# Maximum number of open SQLite connections per process.
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+
+# Rows read per chunk by the streaming ingest (python -m services.ingest).
+INGEST_CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', 100000))
+# Directory written by the streaming ingest. When set, the dataset is loaded from it instead of the source workbook.
+INGESTED_DATASET_DIR = os.environ.get('INGESTED_DATASET_DIR', '')
+
+# Seconds between checks of the source file for changes, which are then loaded incrementally. 0 disables hot reload.
+RELOAD_INTERVAL = float(os.environ.get('RELOAD_INTERVAL', 10))
+
+# Startup time budget in seconds, checked by `python -m services.startup`.
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', 10))
+
+# Allow profiling single callback requests on demand (X-Profile header or profile=1 flag, see services.profiling).
+PROFILING = env_flag('PROFILING', False)
+# Directory the request profiles are written to.
+PROFILE_DIR = os.environ.get('PROFILE_DIR', './cache/profiles')
+# Size cap of the profile directory in bytes, the oldest profiles are removed beyond it.
+PROFILE_DIR_MAX_BYTES = int(os.environ.get('PROFILE_DIR_MAX_BYTES', 50 * 1024 * 1024))
+
+# Gzip responses of at least this many bytes when the client accepts it (see services.responses). 0 disables it.
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+# Gzip compression level of callback responses, from 1 (fastest) to 9 (smallest).
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 3))
+# Seconds browsers may cache assets requested with Dash's modification stamp.
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600))
+
+# Show a preview of the timeline and bubble graphs computed from a sample of the rows before the exact result when the
+# dataset loaded at startup has at least this many rows (see services.sampling). Smaller datasets, 0 and the SQLite
+# backend go without previews, and with them without the extra round trip of the graph callbacks (see
+# pages/page_graph.py).
+PREVIEW_MIN_ROWS = int(os.environ.get('PREVIEW_MIN_ROWS', 500000))
+# Rows sampled for the previews.
+PREVIEW_SAMPLE_ROWS = int(os.environ.get('PREVIEW_SAMPLE_ROWS', 50000))
+
+# Callback results kept in memory per dataset version and inputs (see services.result_cache). 0 disables the cache.
+RESULT_CACHE_ENTRIES = int(os.environ.get('RESULT_CACHE_ENTRIES', 256))
+# Popular views precomputed into the result cache after startup and every reload (see services.warmup), comma
+# separated out of landing-years, landing-quarters and timeline. Empty disables warming.
+WARMUP_VIEWS = [name.strip() for name in os.environ.get(
+    'WARMUP_VIEWS', 'landing-years,landing-quarters,timeline').split(',') if name.strip()]
+# Warming pauses while callbacks of real requests run and resumes after this many seconds without them.
+WARMUP_IDLE_SECONDS = float(os.environ.get('WARMUP_IDLE_SECONDS', 1))
@@ -0,0 +1,6 @@
+# Gunicorn settings, picked up automatically when gunicorn is started from the project directory (gunicorn app:server).
+
+
+# Materialise the shared dataset store once in the master process, so forked workers only attach to it.
+def on_starting(server):
+    import main  # noqa: F401
@@ -1,5 +1,7 @@
+import os
 import pandas as pd
-import numpy as np
+import config
+from services import aggregation, datasource, ingest, reload, shared_store, startup, transform
 
 # External stylesheet used for icons.  
 font_awesome = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.2.1/css/all.min.css'
@@ -8,21 +10,105 @@ pd.options.display.float_format = "{:,.2f}".format
 
 # Source file path
 source_file_path = "./dataset/Sample - Superstore.xlsx"
+# Output of the streaming ingest (services.ingest) replaces the source file when configured.
+if config.INGESTED_DATASET_DIR:
+    source_file_path = os.path.join(config.INGESTED_DATASET_DIR, ingest.DAILY_AGGREGATES_FILE)
+# Version of the loaded dataset. Shared computations are keyed on it, so it changes whenever the source file changes.
+dataset_version = reload.file_version(source_file_path)
+
+
+# Read the raw 'Orders' and 'Returns' data from the source file.
+def read_source():
+    with startup.phase('read source'):
+        # Create dataframe with 'Orders' data by considering 'Orders' worksheet from the source file.
+        df_orders_data = pd.read_excel(source_file_path, sheet_name="Orders", usecols=lambda x: x not in transform.DROPPED_COLUMNS)
+        # Create dataframe with 'Returns' data by considering 'Returns' worksheet from the source file.
+        df_returns_data = pd.read_excel(source_file_path, sheet_name="Returns")
+    return df_orders_data, df_returns_data
+
 
 # Create a base/main dataframe to be used as a primary dataframe for any pages.
+def load_dataset():
+    if config.INGESTED_DATASET_DIR:
+        return ingest.read_partitions(config.INGESTED_DATASET_DIR)
+    df_orders_data, df_returns_data = read_source()
+    with startup.phase('prepare orders'):
+        return transform.prepare_orders(df_orders_data, df_returns_data)
+
+
+# Load the processed dataset once per host into the shared memory-mapped store and attach read-only views of it.
+# Returns the dataset and the directory of its store. Without a writable store directory every process keeps a
+# private copy instead, and the directory is None.
+def load_shared_dataset(version, build):
+    if config.SHARED_DATASET:
+        try:
+            df = shared_store.attach_or_materialise(config.SHARED_DATASET_DIR, version, build)
+            return df, os.path.join(config.SHARED_DATASET_DIR, version)
+        except OSError:
+            pass
+    return build(), None
+
+
+# Attach the SQLite database file of the dataset version, building it from the source if no process has done so yet.
+def load_database(version):
+    # SQL queries need the derived columns stored in the table.
+    return datasource.attach_or_build_database(config.SQLITE_DIR, version,
+                                               lambda: transform.with_derived_columns(load_dataset()),
+                                               ['Region', 'State', 'City'], config.SQLITE_POOL_SIZE)
+
+
+# Create the data source queried by the pages. The SQLite backend keeps the dataset in a database file, so df_main
+# is only loaded by the pandas backend.
+with startup.phase('load dataset'):
+    if config.DATA_BACKEND == 'sqlite':
+        df_main = None
+        dataset = datasource.Dataset(dataset_version, None, load_database(dataset_version))
+        data_source = datasource.SQLiteDataSource(dataset)
+    else:
+        df_main, store = load_shared_dataset(dataset_version, load_dataset)
+        dataset = datasource.Dataset(dataset_version, df_main, store=store)
+        data_source = datasource.PandasDataSource(dataset)
+
+# Build the search index of the table page with the dataset, so no search request pays for it.
+with startup.phase('build search index'):
+    dataset.current().search_index
+
+# Draw the sample of the graph previews of large datasets with the dataset too.
+if df_main is not None and dataset.current().previewable:
+    with startup.phase('draw preview sample'):
+        dataset.current().sample
+
+
+# Partitions of the parallel aggregation mode belong to the replaced frame. Appended rows are added to them, with the
+# index labels of the new frame.
+@dataset.subscribe
+def forget_partitions(previous, snapshot, appended):
+    if appended is not None:
+        aggregation.extend(previous.version, snapshot.version, snapshot.df.iloc[len(previous.df):])
+    elif previous.df is not snapshot.df:
+        aggregation.reset()
+
+
+# Index and sample every reloaded snapshot before requests search or preview it.
+@dataset.subscribe
+def index_snapshot(previous, snapshot, appended):
+    snapshot.search_index
+    if snapshot.previewable:
+        snapshot.sample
+
 
-# Create dataframe with 'Orders' data by considering 'Orders' worksheet from the source file.
-df_orders_data = pd.read_excel(source_file_path, sheet_name="Orders", usecols=lambda x: x not in ['Row ID', 'Customer ID', 'Country', 'Postal Code', 'Product ID'])
-# Create dataframe with 'Returns' data by considering 'Returns' worksheet from the source file.
-df_returns_data = pd.read_excel(source_file_path, sheet_name="Returns")
-# Merge above dataframes based on 'Order ID' as this column is common between two dataframe.
-df_main = pd.merge(df_orders_data, df_returns_data, on='Order ID', how='left')
-# Fill missing entries of 'Returned' column with 'No'. Then assign numeric vlues: 1 for all Yes and 0 for all No values for later calculation. 
-df_main['Returned'] = df_main['Returned'].fillna('No').map(dict(Yes=1, No=0))
-# Add 'Days to Ship' column to keep the information of taken shipment days for individual order.
-df_main['Days to Ship'] = (df_main['Ship Date'] - df_main['Order Date']).dt.days + 1
-# Calculate and Add 'Profit Ratio' column to the dataframe.
-df_main['Profit Ratio'] = df_main['Profit'] / df_main['Sales']
-df_main = np.round(df_main, decimals=2).sort_values(by='Order Date')
-# Create granularity columns. 
-df_main['Year'], df_main['Month'], df_main['Quarter'], df_main['Week'] = df_main['Order Date'].dt.year, df_main['Order Date'].dt.month, df_main['Order Date'].dt.quarter, df_main['Order Date'].dt.isocalendar().week
+# Apply the changes of the source file to the dataset and publish it as a new snapshot. Called by the
+# services.reload.SourceWatcher started in app.py. The SQLite backend writes the new version to a new database file.
+def refresh_dataset():
+    global df_main, dataset_version
+    version = reload.file_version(source_file_path)
+    if version == dataset_version:
+        return
+    if config.DATA_BACKEND == 'sqlite':
+        dataset_version = version
+        dataset.publish(version, None, pool=load_database(version))
+        return
+    df_next, df_appended = reload.apply_increment(dataset.snapshot.df, load_dataset())
+    df_main, store = load_shared_dataset(version, lambda: df_next)
+    dataset_version = version
+    dataset.publish(version, df_main, df_appended, store=store)
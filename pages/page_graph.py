@@ -1,12 +1,18 @@
 # This page visualizes a timeline graph and a bubble graph for data analysis
 # Import required modules
+import os
+import threading
+
 import pandas as pd
-from dash import html, dcc, Input, Output, callback
+from dash import html, dcc, Input, Output, Patch, callback, no_update
 import dash_bootstrap_components as dbc
-import plotly.express as px
 from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
-from main import df_main
+import config
+from main import data_source, dataset
+from services.result_cache import cached
+from services.scheduler import admission_controlled
+from services.singleflight import single_flight
 
 # Color scheme
 COLOR_PRIMARY = '#2E86AB'
@@ -24,11 +30,15 @@ CARD_STYLE = {
     'backgroundColor': 'white'
 }
 
+# Progress bar styling, the bars are only shown while a graph callback is running
+PROGRESS_HIDDEN_STYLE = {'display': 'none'}
+PROGRESS_VISIBLE_STYLE = {'height': '4px', 'marginBottom': '10px'}
+
 # Create a list of columns required for the page
 column_list = ['Order Date', 'Ship Date', 'Customer Name', 'Region', 'State', 'City', 'Category', 'Sub-Category',
                'Product Name', 'Ship Mode', 'Sales', 'Profit', 'Profit Ratio', 'Discount', 'Quantity', 'Segment',
-               'Days to Ship', 'Returned', 'Year', 'Month', 'Quarter', 'Week']
-df = df_main[column_list]
+               'Days to Ship', 'Returned']
+source = data_source.project(column_list)
 
 # List of columns for bubble size parameter
 columns_to_label = ['Customer Name', 'Segment', 'Product Name', 'Ship Mode', 'Category', 'Sub-Category']
@@ -44,6 +54,57 @@ def assign_integer_labels(df_resampled, column_names):
     return df_resampled
 
 
+# Measures plotted on the timeline graph, one trace per measure.
+timeline_columns = ['Days to Ship', 'Sales', 'Profit', 'Profit Ratio', 'Returned']
+timeline_aggregation = {'Days to Ship': 'mean', 'Sales': 'sum', 'Profit': 'sum', 'Returned': 'sum'}
+bubble_keys = ['Region', 'Customer Name', 'Product Name', 'Ship Mode', 'Segment', 'Category', 'Sub-Category']
+bubble_aggregation = {
+    'Days to Ship': 'mean',
+    'Sales': 'sum',
+    'Profit': 'sum',
+    'Discount': 'mean',
+    'Quantity': 'sum',
+    'Returned': 'sum',
+}
+
+# Labels of the timeline bins of every granularity, from the end date of the bin.
+time_labels = {
+    'W': lambda dates: dates.dt.year.astype(str) + ' CW' + dates.dt.isocalendar().week.astype(str),
+    'ME': lambda dates: dates.dt.year.astype(str) + ' M' + dates.dt.month.astype(str),
+    'QE': lambda dates: dates.dt.year.astype(str) + ' Q' + dates.dt.quarter.astype(str),
+    'YE': lambda dates: dates.dt.year.astype(str),
+}
+
+
+# Static timeline figure skeleton. It is sent once with the layout; the callback only patches the trace arrays.
+def create_timeline_figure():
+    fig = go.Figure()
+    for col in timeline_columns:
+        fig.add_trace(go.Scatter(
+            x=[],
+            y=[],
+            name=col,
+            mode='lines+markers',
+            hovertemplate='%{x}<br>%{y:.2f}<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title='',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(l=20, r=20, t=40, b=20),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        hovermode="x unified"
+    )
+    return fig
+
+
 # Dropdown options
 fs_dropdown_options = [
     {'label': 'Days to Ship', 'value': 'Days to Ship'},
@@ -81,129 +142,142 @@ page_header = dbc.Card(
     }
 )
 
-# Layout
-layout = html.Div([
-    # Store component
-    dcc.Store(id='store-data', data=[], storage_type='memory'),
-
-    # Header
-    dbc.Row(dbc.Col(page_header, width=12)),
-
-    # Filters section
-    dbc.Card(
-        dbc.CardBody([
-            html.H5("Data Filters", className="card-title",
-                    style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
-
-            dbc.Row([
-                dbc.Col([
-                    dbc.Label("Date Range:", className="mb-1"),
-                    dcc.DatePickerRange(
-                        id='date-range-picker',
-                        start_date=str(df['Order Date'].min()),
-                        end_date=str(df['Order Date'].max()),
-                        display_format='DD/MM/YYYY',
-                        style={'width': '100%'}
-                    )
-                ], width=6),
-
-                dbc.Col([
-                    dbc.Label("Time Granularity:", className="mb-1"),
-                    dcc.Dropdown(
-                        id='granularity-dropdown',
-                        options=[
-                            {'label': 'Weekly', 'value': 'W'},
-                            {'label': 'Monthly', 'value': 'ME'},
-                            {'label': 'Quarterly', 'value': 'QE'},
-                            {'label': 'Yearly', 'value': 'YE'}
-                        ],
-                        value='YE',
-                        clearable=False,
-                        style={'width': '100%'}
-                    )
-                ], width=6)
-            ])
-        ]),
-        style=CARD_STYLE
-    ),
-
-    # Visualization section
-    dbc.Row([
-        # Timeline graph
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H5("Sales Timeline", className="card-title",
-                            style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
-                    dcc.Graph(
-                        id='timeline-graph',
-                        figure=go.Figure(),
-                        style={'height': '500px'}
-                    )
-                ]),
-                style=CARD_STYLE
-            ),
-            width=12, lg=6, className="mb-4"
+# Layout. Built on the first visit of the route (see app.py).
+def create_layout():
+    # First and last order date of the data
+    first_order_date, last_order_date = source.date_range('Order Date')
+    return html.Div([
+        # Store component
+        dcc.Store(id='store-data', data=[], storage_type='memory'),
+        # Inputs of the exact graph callbacks, written by the preview callbacks once they have drawn a preview
+        *([dcc.Store(id='timeline-request', storage_type='memory'),
+           dcc.Store(id='bubble-request', storage_type='memory')] if previews else []),
+
+        # Header
+        dbc.Row(dbc.Col(page_header, width=12)),
+
+        # Filters section
+        dbc.Card(
+            dbc.CardBody([
+                html.H5("Data Filters", className="card-title",
+                        style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Label("Date Range:", className="mb-1"),
+                        dcc.DatePickerRange(
+                            id='date-range-picker',
+                            start_date=str(first_order_date),
+                            end_date=str(last_order_date),
+                            display_format='DD/MM/YYYY',
+                            style={'width': '100%'}
+                        )
+                    ], width=6),
+
+                    dbc.Col([
+                        dbc.Label("Time Granularity:", className="mb-1"),
+                        dcc.Dropdown(
+                            id='granularity-dropdown',
+                            options=[
+                                {'label': 'Weekly', 'value': 'W'},
+                                {'label': 'Monthly', 'value': 'ME'},
+                                {'label': 'Quarterly', 'value': 'QE'},
+                                {'label': 'Yearly', 'value': 'YE'}
+                            ],
+                            value='YE',
+                            clearable=False,
+                            style={'width': '100%'}
+                        )
+                    ], width=6)
+                ])
+            ]),
+            style=CARD_STYLE
         ),
 
-        # Bubble graph with controls
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H5("Bubble Chart Analysis", className="card-title",
-                            style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
-
-                    dbc.Row([
-                        dbc.Col([
-                            dbc.Label("X-Axis:", className="mb-1"),
-                            dcc.Dropdown(
-                                id='dropdown-1',
-                                options=fs_dropdown_options,
-                                placeholder="Select X-axis...",
-                                style={'width': '100%'}
-                            ),
-
-                            dbc.Label("Y-Axis:", className="mb-1 mt-3"),
-                            dcc.Dropdown(
-                                id='dropdown-2',
-                                options=fs_dropdown_options,
-                                placeholder="Select Y-axis...",
-                                style={'width': '100%'}
-                            ),
-
-                            dbc.Label("Bubble Size:", className="mb-1 mt-3"),
-                            dcc.Dropdown(
-                                id='dropdown-3',
-                                options=th_dropdown_options,
-                                placeholder="Select size...",
-                                style={'width': '100%'}
-                            )
-                        ], width=4),
-
-                        dbc.Col([
-                            dcc.Graph(
-                                id='bubble-graph',
-                                style={'height': '450px'}
-                            )
-                        ], width=8)
-                    ])
-                ]),
-                style=CARD_STYLE
+        # Visualization section
+        dbc.Row([
+            # Timeline graph
+            dbc.Col(
+                dbc.Card(
+                    dbc.CardBody([
+                        html.H5("Sales Timeline", className="card-title",
+                                style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+                        dbc.Progress(id='timeline-progress', value=100, striped=True, animated=True,
+                                     style=PROGRESS_HIDDEN_STYLE),
+                        dcc.Graph(
+                            id='timeline-graph',
+                            figure=create_timeline_figure(),
+                            style={'height': '500px'}
+                        )
+                    ]),
+                    style=CARD_STYLE
+                ),
+                width=12, lg=6, className="mb-4"
             ),
-            width=12, lg=6, className="mb-4"
-        )
-    ])
-], style={
-    'backgroundColor': COLOR_LIGHT,
-    'padding': '20px'
-})
+
+            # Bubble graph with controls
+            dbc.Col(
+                dbc.Card(
+                    dbc.CardBody([
+                        html.H5("Bubble Chart Analysis", className="card-title",
+                                style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+                        dbc.Progress(id='bubble-progress', value=100, striped=True, animated=True,
+                                     style=PROGRESS_HIDDEN_STYLE),
+
+                        dbc.Row([
+                            dbc.Col([
+                                dbc.Label("X-Axis:", className="mb-1"),
+                                dcc.Dropdown(
+                                    id='dropdown-1',
+                                    options=fs_dropdown_options,
+                                    placeholder="Select X-axis...",
+                                    style={'width': '100%'}
+                                ),
+
+                                dbc.Label("Y-Axis:", className="mb-1 mt-3"),
+                                dcc.Dropdown(
+                                    id='dropdown-2',
+                                    options=fs_dropdown_options,
+                                    placeholder="Select Y-axis...",
+                                    style={'width': '100%'}
+                                ),
+
+                                dbc.Label("Bubble Size:", className="mb-1 mt-3"),
+                                dcc.Dropdown(
+                                    id='dropdown-3',
+                                    options=th_dropdown_options,
+                                    placeholder="Select size...",
+                                    style={'width': '100%'}
+                                )
+                            ], width=4),
+
+                            dbc.Col([
+                                dcc.Graph(
+                                    id='bubble-graph',
+                                    style={'height': '450px'}
+                                )
+                            ], width=8)
+                        ])
+                    ]),
+                    style=CARD_STYLE
+                ),
+                width=12, lg=6, className="mb-4"
+            )
+        ])
+    ], style={
+        'backgroundColor': COLOR_LIGHT,
+        'padding': '20px'
+    })
 
 
 # Callbacks remain the same as in your original code
+# A new request from a session terminates its superseded background job; leaving the page cancels it.
 @callback(
     Output('dropdown-2', 'options'),
     [Input('dropdown-1', 'value')]
 )
+@dataset.pinned
+@admission_controlled
 def update_dropdown_2_options(selected_value):
     if selected_value:
         updated_options = [option for option in fs_dropdown_options if option['value'] != selected_value]
@@ -215,6 +289,8 @@ def update_dropdown_2_options(selected_value):
     Output('dropdown-1', 'options'),
     [Input('dropdown-2', 'value')]
 )
+@dataset.pinned
+@admission_controlled
 def update_dropdown_1_options(selected_value):
     if selected_value:
         updated_options = [option for option in fs_dropdown_options if option['value'] != selected_value]
@@ -222,129 +298,198 @@ def update_dropdown_1_options(selected_value):
     return fs_dropdown_options
 
 
-@callback(
-    Output('bubble-graph', 'figure'),
-    [Input('date-range-picker', 'start_date'),
-     Input('date-range-picker', 'end_date'),
-     Input('granularity-dropdown', 'value'),
-     Input('dropdown-1', 'value'),
-     Input('dropdown-2', 'value'),
-     Input('dropdown-3', 'value')]
-)
-def update_bubble_graph(start_date, end_date, granularity, selected_value_1, selected_value_2, selected_value_3):
-    df_date_filtered = df[df['Order Date'].between(start_date, end_date)]
-    df_resampled = df_date_filtered.groupby(
-        [pd.Grouper(key='Order Date', freq=granularity),
-         'Region', 'Customer Name', 'Product Name',
-         'Ship Mode', 'Segment', 'Category', 'Sub-Category'
-         ]).agg({
-        'Days to Ship': 'mean',
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Discount': 'mean',
-        'Quantity': 'sum',
-        'Returned': 'sum',
-    }).fillna(0)
+# plotly.express reads its default template while building a figure, which fails when threads build figures at once.
+figure_lock = threading.Lock()
+
+
+# A background job may be forked while another thread builds a figure.
+def reset_figure_lock():
+    global figure_lock
+    figure_lock = threading.Lock()
 
+
+os.register_at_fork(after_in_child=reset_figure_lock)
+
+
+# Bubble figure of the aggregated rows, or None when no axis is selected.
+def bubble_figure(df_resampled, selected_value_1, selected_value_2, selected_value_3, title=''):
+    # plotly.express is slow to import and only needed by the bubble graph.
+    import plotly.express as px
+    df_resampled = df_resampled.fillna(0)
     df_resampled['Profit Ratio'] = df_resampled['Profit'] / df_resampled['Sales']
     df_resampled = df_resampled.reset_index()
     df_resampled = assign_integer_labels(df_resampled, columns_to_label)
 
-    if (selected_value_1 or selected_value_2) and selected_value_3:
-        fig = px.scatter(
-            df_resampled,
-            x=selected_value_1,
-            y=selected_value_2,
-            size=selected_value_3,
-            size_max=20,
-            color='Region',
-            hover_name=selected_value_3[:-6],
-            hover_data=["Order Date", "Product Name"],
-            title='',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            margin=dict(l=20, r=20, t=40, b=20)
-        )
-        return fig
-    elif (selected_value_1 or selected_value_2) and selected_value_3 is None:
-        fig = px.scatter(
-            df_resampled,
-            x=selected_value_1,
-            y=selected_value_2,
-            color='Region',
-            title='',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            margin=dict(l=20, r=20, t=40, b=20)
-        )
-        return fig
-    else:
+    if not (selected_value_1 or selected_value_2):
+        return None
+    with figure_lock:
+        if selected_value_3:
+            fig = px.scatter(
+                df_resampled,
+                x=selected_value_1,
+                y=selected_value_2,
+                size=selected_value_3,
+                size_max=20,
+                color='Region',
+                hover_name=selected_value_3[:-6],
+                hover_data=["Order Date", "Product Name"],
+                title=title,
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+        else:
+            fig = px.scatter(
+                df_resampled,
+                x=selected_value_1,
+                y=selected_value_2,
+                color='Region',
+                title=title,
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+
+# Graphs of large datasets are drawn in two steps: the preview callbacks immediately draw a preview from a sample of
+# the rows (see services.sampling), then write their inputs to a request store, which runs the exact callback.
+# The extra round trip is only paid when the dataset loaded at startup is large enough for previews
+# (config.PREVIEW_MIN_ROWS); otherwise the filters are the inputs of the exact callbacks (see the registrations at the
+# end of the page). Callbacks are registered once, so a reload crossing the threshold takes effect on restart; if a
+# reloaded dataset has no sample, the preview callbacks only write the request.
+previews = dataset.current().previewable
+
+
+@dataset.pinned
+@admission_controlled
+def preview_bubble_graph(start_date, end_date, granularity, selected_value_1, selected_value_2, selected_value_3):
+    request = [start_date, end_date, granularity, selected_value_1, selected_value_2, selected_value_3]
+    if not (selected_value_1 or selected_value_2):
+        return no_update, request
+    # A sample of the points: the groups are single orders more often than not, so their sums are not scaled up.
+    estimate = source.estimate([pd.Grouper(key='Order Date', freq=granularity)] + bubble_keys, bubble_aggregation,
+                               start_date, end_date, scale=False)
+    if estimate is None:
+        return no_update, request
+    title = f'Preview of a {estimate.fraction * 100:.3g}% sample of the points, all points follow'
+    return bubble_figure(estimate.values, selected_value_1, selected_value_2, selected_value_3, title), request
+
+
+def refine_bubble_graph(request):
+    return update_bubble_graph(*request)
+
+
+@dataset.pinned
+@single_flight
+@admission_controlled
+def update_bubble_graph(start_date, end_date, granularity, selected_value_1, selected_value_2, selected_value_3):
+    df_resampled = source.aggregate([pd.Grouper(key='Order Date', freq=granularity)] + bubble_keys,
+                                    bubble_aggregation, start_date, end_date)
+    fig = bubble_figure(df_resampled, selected_value_1, selected_value_2, selected_value_3)
+    if fig is None:
         raise PreventUpdate
+    return fig
+
+
+@dataset.pinned
+@admission_controlled
+def preview_timeline_graph(granularity, start_date, end_date):
+    request = [granularity, start_date, end_date]
+    estimate = source.estimate(pd.Grouper(key='Order Date', freq=granularity), timeline_aggregation,
+                               start_date, end_date) if granularity in time_labels else None
+    if estimate is None:
+        return no_update, request
+    df_resampled = estimate.values.fillna(0).reset_index()
+    bounds = estimate.bounds.reindex(estimate.values.index).fillna(0)
+    df_resampled['Order Date'] = time_labels[granularity](df_resampled['Order Date'])
+    df_resampled['Profit Ratio'] = round(df_resampled['Profit'] * 100 / df_resampled['Sales'], 2)
 
+    # Estimated sums carry their 95% error bounds as error bars.
+    patch = Patch()
+    for i, col in enumerate(timeline_columns):
+        patch['data'][i]['x'] = df_resampled['Order Date'].astype(str).tolist()
+        patch['data'][i]['y'] = df_resampled[col].tolist()
+        if col in bounds:
+            patch['data'][i]['error_y'] = {'type': 'data', 'array': bounds[col].tolist(), 'visible': True}
+        else:
+            patch['data'][i]['error_y'] = {'visible': False}
+    patch['layout']['title']['text'] = (f'Preview from a {estimate.fraction * 100:.3g}% sample with 95% error bounds, '
+                                        'exact values follow')
+    return patch, request
 
-@callback(
-    Output('timeline-graph', 'figure'),
-    [Input('granularity-dropdown', 'value'),
-     Input('date-range-picker', 'start_date'),
-     Input('date-range-picker', 'end_date')]
-)
+
+def refine_timeline_graph(request):
+    return update_timeline_graph(*request)
+
+
+@dataset.pinned
+@cached
+@single_flight
+@admission_controlled
 def update_timeline_graph(granularity, start_date, end_date):
     list_columns = ['Order Date', 'Days to Ship', 'Returned', 'Sales', 'Profit']
-    df_filtered = df[list_columns]
-    df_date_filtered = df_filtered[df_filtered['Order Date'].between(start_date, end_date)]
-
-    df_resampled = df_date_filtered.groupby([pd.Grouper(key='Order Date', freq=granularity)]).agg({
-        'Days to Ship': 'mean',
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Returned': 'sum'
-    }).fillna(0).reset_index()
-
-    if granularity == 'W':
-        df_resampled['Order Date'] = df_resampled['Order Date'].dt.year.astype(str) + ' CW' + df_resampled[
-            'Order Date'].dt.isocalendar().week.astype(str)
-    elif granularity == 'ME':
-        df_resampled['Order Date'] = df_resampled['Order Date'].dt.year.astype(str) + ' M' + df_resampled[
-            'Order Date'].dt.month.astype(str)
-    elif granularity == 'QE':
-        df_resampled['Order Date'] = df_resampled['Order Date'].dt.year.astype(str) + ' Q' + df_resampled[
-            'Order Date'].dt.quarter.astype(str)
-    elif granularity == 'YE':
-        df_resampled['Order Date'] = df_resampled['Order Date'].dt.year.astype(str)
+
+    df_resampled = source.aggregate(pd.Grouper(key='Order Date', freq=granularity), timeline_aggregation,
+                                    start_date, end_date).fillna(0).reset_index()
+
+    if granularity in time_labels:
+        df_resampled['Order Date'] = time_labels[granularity](df_resampled['Order Date'])
     else:
-        df_resampled = df_date_filtered
+        df_resampled = source.select(list_columns, start_date, end_date)
 
     df_resampled['Profit Ratio'] = round(df_resampled['Profit'] * 100 / df_resampled['Sales'], 2)
 
-    fig = go.Figure()
-    for col in ['Days to Ship', 'Sales', 'Profit', 'Profit Ratio', 'Returned']:
-        fig.add_trace(go.Scatter(
-            x=df_resampled['Order Date'],
-            y=df_resampled[col],
-            name=col,
-            mode='lines+markers',
-            hovertemplate='%{x}<br>%{y:.2f}<extra></extra>'
-        ))
-
-    fig.update_layout(
-        title='',
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        margin=dict(l=20, r=20, t=40, b=20),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        hovermode="x unified"
+    patch = Patch()
+    for i, col in enumerate(timeline_columns):
+        patch['data'][i]['x'] = df_resampled['Order Date'].astype(str).tolist()
+        patch['data'][i]['y'] = df_resampled[col].tolist()
+        patch['data'][i]['error_y'] = {'visible': False}
+    patch['layout']['title']['text'] = ''
+
+    return patch
+
+
+bubble_inputs = [Input('date-range-picker', 'start_date'),
+                 Input('date-range-picker', 'end_date'),
+                 Input('granularity-dropdown', 'value'),
+                 Input('dropdown-1', 'value'),
+                 Input('dropdown-2', 'value'),
+                 Input('dropdown-3', 'value')]
+timeline_inputs = [Input('granularity-dropdown', 'value'),
+                   Input('date-range-picker', 'start_date'),
+                   Input('date-range-picker', 'end_date')]
+
+
+def exact_graph_callback(graph_id, progress_id, inputs, **kwargs):
+    return callback(
+        Output(graph_id, 'figure'),
+        inputs,
+        background=config.BACKGROUND_CALLBACKS,
+        running=[(Output(progress_id, 'style'), PROGRESS_VISIBLE_STYLE, PROGRESS_HIDDEN_STYLE)],
+        cancel=[Input('url', 'pathname')] if config.BACKGROUND_CALLBACKS else None,
+        **kwargs
     )
 
-    return fig
\ No newline at end of file
+
+if previews:
+    callback(
+        Output('bubble-graph', 'figure', allow_duplicate=True),
+        Output('bubble-request', 'data'),
+        bubble_inputs,
+        prevent_initial_call='initial_duplicate'
+    )(preview_bubble_graph)
+    exact_graph_callback('bubble-graph', 'bubble-progress', Input('bubble-request', 'data'),
+                         prevent_initial_call=True)(refine_bubble_graph)
+    callback(
+        Output('timeline-graph', 'figure', allow_duplicate=True),
+        Output('timeline-request', 'data'),
+        timeline_inputs,
+        prevent_initial_call='initial_duplicate'
+    )(preview_timeline_graph)
+    exact_graph_callback('timeline-graph', 'timeline-progress', Input('timeline-request', 'data'),
+                         prevent_initial_call=True)(refine_timeline_graph)
+else:
+    exact_graph_callback('bubble-graph', 'bubble-progress', bubble_inputs)(update_bubble_graph)
+    exact_graph_callback('timeline-graph', 'timeline-progress', timeline_inputs)(update_timeline_graph)
@@ -1,12 +1,14 @@
 # This page gives the general overview of different properties to analyze the sales data.
 # Import required modules
 import pandas as pd
-from dash import dcc, html, Output, Input, callback
+from dash import dcc, html, Output, Input, Patch, callback
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 from dash.exceptions import PreventUpdate
-from main import df_main
+from main import data_source, dataset
+from services.result_cache import cached
+from services.scheduler import admission_controlled
+from services.singleflight import single_flight
 
 # Common styling constants
 COLOR_PRIMARY = '#2E86AB'
@@ -41,8 +43,8 @@ GRAPH_STYLE = {
 
 # Create a list of columns, those are required for the landing page.
 column_list = ['Order Date', 'Sales', 'Profit', 'Days to Ship', 'Region', 'Category', 'Segment']
-# Create page specific initial dataframe.
-df = df_main[column_list]
+# Create page specific data source.
+source = data_source.project(column_list)
 
 # Designing page layout by initializing different blocks/sections.
 # Design the page header/title block.
@@ -77,16 +79,119 @@ selection_filter = dbc.Card(
     style=CARD_STYLE
 )
 
+# Color palettes of the breakdown members. Every result colors its members in sorted order, cycling through the
+# palette, so members of reloaded or generated data get a color too.
+REGION_COLORS = [COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER]
+CATEGORY_COLORS = [COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS]
+SEGMENT_COLORS = [COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS]
+
+
+def member_colors(members, palette):
+    colors = {member: palette[i % len(palette)] for i, member in enumerate(sorted(set(members)))}
+    return [colors[member] for member in members]
+
+
+# Static figure skeletons. These are sent once with the layout; the callback only patches the data arrays.
+# Create figure with both indicator and line chart
+def create_combined_figure(title, prefix="", suffix="", color=COLOR_PRIMARY):
+    # Create figure with secondary y-axis
+    fig = go.Figure()
+
+    # Add indicator
+    fig.add_trace(go.Indicator(
+        mode="number+delta",
+        value=0,
+        number={"prefix": prefix, "suffix": suffix},
+        delta={"reference": 0, "valueformat": ".2f"},
+        title={"text": title, "font": {"size": 16}},
+        domain={'y': [0.6, 1], 'x': [0, 1]}
+    ))
+
+    # Add line chart
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        name="Current",
+        line=dict(color=color),
+        yaxis="y2"
+    ))
+
+    # Add previous period line
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        name="Previous",
+        line=dict(color='gray', dash='dot'),
+        yaxis="y2"
+    ))
+
+    fig.update_layout(
+        template='plotly_white',
+        margin=dict(l=20, r=20, t=60, b=20),
+        height=300,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        yaxis2=dict(
+            anchor="x",
+            overlaying="y",
+            side="right",
+            showgrid=False
+        ),
+        yaxis=dict(showgrid=False, showticklabels=False)
+    )
+
+    return fig
+
+
+# Create horizontal bar figure for regional breakdowns
+def create_bar_figure(x_title, y_title='Region'):
+    fig = go.Figure(go.Bar(
+        x=[],
+        y=[],
+        text=[],
+        orientation="h",
+        textposition="inside",
+        hovertemplate=f'{x_title}=%{{x}}<br>{y_title}=%{{y}}<extra></extra>'
+    ))
+    fig.update_layout(
+        template='plotly_white',
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=300,
+        showlegend=False,
+        xaxis_title=x_title,
+        yaxis_title=y_title
+    )
+    return fig
+
+
+# Create pie chart figure
+def create_pie_figure():
+    fig = go.Figure(go.Pie(
+        values=[],
+        labels=[],
+        hole=.3,
+        textposition='inside',
+        textinfo='percent+label'
+    ))
+    fig.update_layout(
+        template='plotly_white',
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=300,
+        showlegend=True
+    )
+    return fig
+
+
 # Helper function to create metric cards
 
 
-def create_metric_card(title, figure_id, color):
+def create_metric_card(title, figure_id, color, figure):
     return dbc.Card(
         dbc.CardBody([
             html.H5(title, className="card-title", style={'textAlign': 'center'}),
             dcc.Graph(
                 id=figure_id,
-                figure=go.Figure(),
+                figure=figure,
                 style=GRAPH_STYLE,
                 config={'displayModeBar': False}
             )
@@ -98,21 +203,14 @@ def create_metric_card(title, figure_id, color):
     )
 
 
-# Create metric cards
-overview_chart_1 = create_metric_card("Total Sales", 'overview-sales', COLOR_PRIMARY)
-overview_chart_2 = create_metric_card("Total Profit", 'overview-profit', COLOR_SECONDARY)
-overview_chart_3 = create_metric_card("Profit Ratio", 'overview-profit-ratio', COLOR_SUCCESS)
-overview_chart_4 = create_metric_card("Avg Days to Ship", 'overview-average-days-to-ship', COLOR_DANGER)
-
-
 # Helper function to create breakdown cards
-def create_breakdown_card(title, figure_id, color):
+def create_breakdown_card(title, figure_id, color, figure):
     return dbc.Card(
         dbc.CardBody([
             html.H5(title, className="card-title", style={'textAlign': 'center'}),
             dcc.Graph(
                 id=figure_id,
-                figure=go.Figure(),
+                figure=figure,
                 style=GRAPH_STYLE
             )
         ]),
@@ -123,22 +221,14 @@ def create_breakdown_card(title, figure_id, color):
     )
 
 
-# Create breakdown cards
-overview_chart_5 = create_breakdown_card("Sales by Region", 'overview-sales-by-region', COLOR_PRIMARY)
-overview_chart_6 = create_breakdown_card("Profit by Region", 'overview-profit-by-region', COLOR_SECONDARY)
-overview_chart_7 = create_breakdown_card("Profit Ratio by Region", 'overview-profit-ratio-by-region', COLOR_SUCCESS)
-overview_chart_8 = create_breakdown_card("Avg Days to Ship by Region", 'overview-average-days-to-ship-by-region',
-                                         COLOR_DANGER)
-
-
 # Helper function to create pie chart cards
-def create_pie_card(title, figure_id, color, link_text, link_href):
+def create_pie_card(title, figure_id, color, link_text, link_href, figure):
     return dbc.Card(
         dbc.CardBody([
             html.H5(title, className="card-title", style={'textAlign': 'center'}),
             dcc.Graph(
                 id=figure_id,
-                figure=go.Figure(),
+                figure=figure,
                 style=GRAPH_STYLE
             ),
             dbc.Button(
@@ -156,76 +246,129 @@ def create_pie_card(title, figure_id, color, link_text, link_href):
     )
 
 
-# Create pie chart cards
-overview_chart_9 = create_pie_card(
-    "Sales by Category",
-    'overview-sales-by-category',
-    COLOR_PRIMARY,
-    "View DataTable",
-    "/pages/table"
-)
+# Structuring the main layout of the page. Built on the first visit of the route (see app.py).
+def create_layout():
+    # Create metric cards
+    overview_chart_1 = create_metric_card("Total Sales", 'overview-sales', COLOR_PRIMARY,
+                                          create_combined_figure("Total Sales", "$", "", COLOR_PRIMARY))
+    overview_chart_2 = create_metric_card("Total Profit", 'overview-profit', COLOR_SECONDARY,
+                                          create_combined_figure("Total Profit", "$", "", COLOR_SECONDARY))
+    overview_chart_3 = create_metric_card("Profit Ratio", 'overview-profit-ratio', COLOR_SUCCESS,
+                                          create_combined_figure("Profit Ratio", "", "%", COLOR_SUCCESS))
+    overview_chart_4 = create_metric_card("Avg Days to Ship", 'overview-average-days-to-ship', COLOR_DANGER,
+                                          create_combined_figure("Avg Days to Ship", "", " days", COLOR_DANGER))
+
+    # Create breakdown cards
+    overview_chart_5 = create_breakdown_card("Sales by Region", 'overview-sales-by-region', COLOR_PRIMARY,
+                                             create_bar_figure('Sales'))
+    overview_chart_6 = create_breakdown_card("Profit by Region", 'overview-profit-by-region', COLOR_SECONDARY,
+                                             create_bar_figure('Profit'))
+    overview_chart_7 = create_breakdown_card("Profit Ratio by Region", 'overview-profit-ratio-by-region', COLOR_SUCCESS,
+                                             create_bar_figure('Profit Ratio'))
+    overview_chart_8 = create_breakdown_card("Avg Days to Ship by Region", 'overview-average-days-to-ship-by-region',
+                                             COLOR_DANGER, create_bar_figure('Days to Ship'))
+
+    # Create pie chart cards
+    overview_chart_9 = create_pie_card(
+        "Sales by Category",
+        'overview-sales-by-category',
+        COLOR_PRIMARY,
+        "View DataTable",
+        "/pages/table",
+        create_pie_figure()
+    )
 
-overview_chart_10 = create_pie_card(
-    "Sales by Segment",
-    'overview-sales-by-segment',
-    COLOR_SECONDARY,
-    "View Graphs",
-    "/pages/graph"
-)
+    overview_chart_10 = create_pie_card(
+        "Sales by Segment",
+        'overview-sales-by-segment',
+        COLOR_SECONDARY,
+        "View Graphs",
+        "/pages/graph",
+        create_pie_figure()
+    )
 
-# Structuring the main layout of the page.
-layout = html.Div([
-    # Page title/header
-    dbc.Row(
-        dbc.Col(page_header, width=12),
-        className="mb-4"
-    ),
-
-    # Date filter
-    dbc.Row(
-        dbc.Col(selection_filter, width=12, lg=8, className="mx-auto"),
-        className="mb-4"
-    ),
-
-    # First row of metric cards
-    dbc.Row([
-        dbc.Col(overview_chart_1, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_2, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_3, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_4, xs=12, sm=6, md=3, className="mb-4"),
-    ], className="mb-4"),
-
-    # Second row of breakdown cards
-    dbc.Row([
-        dbc.Col(overview_chart_5, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_6, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_7, xs=12, sm=6, md=3, className="mb-4"),
-        dbc.Col(overview_chart_8, xs=12, sm=6, md=3, className="mb-4"),
-    ], className="mb-4"),
-
-    # Third row of pie charts
-    dbc.Row([
-        dbc.Col(overview_chart_9, xs=12, md=6, className="mb-4"),
-        dbc.Col(overview_chart_10, xs=12, md=6, className="mb-4"),
-    ])
-], style={
-    'backgroundColor': COLOR_LIGHT,
-    'minHeight': '100vh',
-    'padding': '20px'
-})
+    return html.Div([
+        # Page title/header
+        dbc.Row(
+            dbc.Col(page_header, width=12),
+            className="mb-4"
+        ),
+
+        # Date filter
+        dbc.Row(
+            dbc.Col(selection_filter, width=12, lg=8, className="mx-auto"),
+            className="mb-4"
+        ),
+
+        # First row of metric cards
+        dbc.Row([
+            dbc.Col(overview_chart_1, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_2, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_3, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_4, xs=12, sm=6, md=3, className="mb-4"),
+        ], className="mb-4"),
+
+        # Second row of breakdown cards
+        dbc.Row([
+            dbc.Col(overview_chart_5, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_6, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_7, xs=12, sm=6, md=3, className="mb-4"),
+            dbc.Col(overview_chart_8, xs=12, sm=6, md=3, className="mb-4"),
+        ], className="mb-4"),
+
+        # Third row of pie charts
+        dbc.Row([
+            dbc.Col(overview_chart_9, xs=12, md=6, className="mb-4"),
+            dbc.Col(overview_chart_10, xs=12, md=6, className="mb-4"),
+        ])
+    ], style={
+        'backgroundColor': COLOR_LIGHT,
+        'minHeight': '100vh',
+        'padding': '20px'
+    })
 
 
 # Create additional dataframes by aggregating relevant information.
-def filter_and_aggregate(df, column, start_date, end_date):
-    df_filtered = df[df['Order Date'].between(start_date, end_date)]
-    df_filtered = df_filtered.groupby(column).agg({
+def filter_and_aggregate(source, column, start_date, end_date):
+    df_filtered = source.aggregate(column, {
         'Sales': 'sum',
         'Profit': 'sum',
         'Days to Ship': 'mean'
-    }).reset_index()
+    }, start_date, end_date).reset_index()
     return df_filtered
 
 
+# Patch the indicator values and line arrays of a combined figure.
+def patch_combined_figure(df, value_col, pp_col, value, reference):
+    patch = Patch()
+    patch['data'][0]['value'] = value
+    patch['data'][0]['delta']['reference'] = reference
+    patch['data'][1]['x'] = df['Order Date'].dt.strftime('%Y-%m-%d').tolist()
+    patch['data'][1]['y'] = df[value_col].tolist()
+    patch['data'][2]['x'] = df['Order Date'].dt.strftime('%Y-%m-%d').tolist()
+    patch['data'][2]['y'] = df[pp_col].tolist()
+    return patch
+
+
+# Patch the bar arrays of a regional breakdown figure.
+def patch_bar_figure(df, x, y, text, colors):
+    patch = Patch()
+    patch['data'][0]['x'] = list(x)
+    patch['data'][0]['y'] = df[y].tolist()
+    patch['data'][0]['text'] = list(text)
+    patch['data'][0]['marker']['color'] = member_colors(df[y].tolist(), colors)
+    return patch
+
+
+# Patch the slice arrays of a pie figure.
+def patch_pie_figure(df, values, names, colors):
+    patch = Patch()
+    patch['data'][0]['values'] = df[values].tolist()
+    patch['data'][0]['labels'] = df[names].tolist()
+    patch['data'][0]['marker']['colors'] = member_colors(df[names].tolist(), colors)
+    return patch
+
+
 # Callback function to update overview charts
 @callback([
     Output('overview-sales', 'figure'),
@@ -240,15 +383,14 @@ def filter_and_aggregate(df, column, start_date, end_date):
     Output('overview-sales-by-segment', 'figure')],
     [Input('date-range-picker', 'start_date'),
      Input('date-range-picker', 'end_date')])
+@dataset.pinned
+@cached
+@single_flight
+@admission_controlled
 def update_overview_cards(start_date, end_date):
     if start_date and end_date:
-        df_filtered = df[df['Order Date'].between(start_date, end_date)]
         # Group by 'Order Date' and calculate the aggregated values.
-        df_filtered = df_filtered.groupby('Order Date').agg({
-            'Sales': 'sum',
-            'Profit': 'sum',
-            'Days to Ship': 'mean'
-        }).reset_index()
+        df_filtered = filter_and_aggregate(source, 'Order Date', start_date, end_date)
         # Calculate Profit Ratio.
         df_filtered['Profit Ratio'] = df_filtered['Profit'] / df_filtered['Sales']
 
@@ -274,12 +416,12 @@ def update_overview_cards(start_date, end_date):
         df_overview['PP_Profit_Ratio'] = df_overview['PP_Total_Profit'] / df_overview['PP_Total_Sales']
 
         # Create dataframe for regional breakdowns
-        df_filtered_region = filter_and_aggregate(df, 'Region', start_date, end_date)
+        df_filtered_region = filter_and_aggregate(source, 'Region', start_date, end_date)
         df_filtered_region['Profit Ratio'] = df_filtered_region['Profit'] / df_filtered_region['Sales']
 
         # Create dataframes for category and segment breakdowns
-        df_filtered_category = filter_and_aggregate(df, 'Category', start_date, end_date)
-        df_filtered_segment = filter_and_aggregate(df, 'Segment', start_date, end_date)
+        df_filtered_category = filter_and_aggregate(source, 'Category', start_date, end_date)
+        df_filtered_segment = filter_and_aggregate(source, 'Segment', start_date, end_date)
     else:
         raise PreventUpdate
 
@@ -293,161 +435,47 @@ def update_overview_cards(start_date, end_date):
     pp_profit_ratio = df_overview['PP_Profit_Ratio'].iloc[0]
     pp_average_days_to_ship = df_overview['PP_Average_Days_to_Ship'].iloc[0]
 
-    # Create figures with both indicator and line chart
-    def create_combined_figure(df, value_col, pp_col, title, value, reference, prefix="", suffix="",
-                               color=COLOR_PRIMARY):
-        # Create figure with secondary y-axis
-        fig = go.Figure()
-
-        # Add indicator
-        fig.add_trace(go.Indicator(
-            mode="number+delta",
-            value=value,
-            number={"prefix": prefix, "suffix": suffix},
-            delta={"reference": reference, "valueformat": ".2f"},
-            title={"text": title, "font": {"size": 16}},
-            domain={'y': [0.6, 1], 'x': [0, 1]}
-        ))
-
-        # Add line chart
-        fig.add_trace(go.Scatter(
-            x=df['Order Date'],
-            y=df[value_col],
-            name="Current",
-            line=dict(color=color),
-            yaxis="y2"
-        ))
-
-        # Add previous period line
-        fig.add_trace(go.Scatter(
-            x=df['Order Date'],
-            y=df[pp_col],
-            name="Previous",
-            line=dict(color='gray', dash='dot'),
-            yaxis="y2"
-        ))
-
-        fig.update_layout(
-            template='plotly_white',
-            margin=dict(l=20, r=20, t=60, b=20),
-            height=300,
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            yaxis2=dict(
-                anchor="x",
-                overlaying="y",
-                side="right",
-                showgrid=False
-            ),
-            yaxis=dict(showgrid=False, showticklabels=False)
-        )
-
-        return fig
-
     # Sales figure
-    fig_overview_1 = create_combined_figure(
-        df_filtered, 'Sales', 'PP_Sales',
-        "Total Sales", cp_total_sales, pp_total_sales,
-        "$", "", COLOR_PRIMARY
-    )
+    fig_overview_1 = patch_combined_figure(df_filtered, 'Sales', 'PP_Sales', cp_total_sales, pp_total_sales)
 
     # Profit figure
-    fig_overview_2 = create_combined_figure(
-        df_filtered, 'Profit', 'PP_Profit',
-        "Total Profit", cp_total_profit, pp_total_profit,
-        "$", "", COLOR_SECONDARY
-    )
+    fig_overview_2 = patch_combined_figure(df_filtered, 'Profit', 'PP_Profit', cp_total_profit, pp_total_profit)
 
     # Profit Ratio figure
-    fig_overview_3 = create_combined_figure(
-        df_filtered, 'Profit Ratio', 'PP_Profit_Ratio',
-        "Profit Ratio", cp_profit_ratio * 100, pp_profit_ratio * 100,
-        "", "%", COLOR_SUCCESS
+    fig_overview_3 = patch_combined_figure(
+        df_filtered, 'Profit Ratio', 'PP_Profit_Ratio', cp_profit_ratio * 100, pp_profit_ratio * 100
     )
 
     # Days to Ship figure
-    fig_overview_4 = create_combined_figure(
-        df_filtered, 'Days to Ship', 'PP_Days_to_Ship',
-        "Avg Days to Ship", cp_avg_days_to_ship, pp_average_days_to_ship,
-        "", " days", COLOR_DANGER
+    fig_overview_4 = patch_combined_figure(
+        df_filtered, 'Days to Ship', 'PP_Days_to_Ship', cp_avg_days_to_ship, pp_average_days_to_ship
     )
 
     # Regional breakdown figures
-    def create_bar_figure(df, x, y, title, color_scale, text, color_discrete=None):
-        fig = px.bar(
-            data_frame=df,
-            x=x,
-            y=y,
-            text=text,
-            color=y if color_discrete else None,
-            color_discrete_sequence=color_discrete if color_discrete else None,
-            color_continuous_scale=color_scale if not color_discrete else None,
-            orientation="h",
-            title=title
-        )
-        fig.update_layout(
-            template='plotly_white',
-            margin=dict(l=20, r=20, t=40, b=20),
-            height=300,
-            showlegend=False
-        )
-        fig.update_traces(textposition="inside")
-        return fig
-
-    fig_overview_5 = create_bar_figure(
-        df_filtered_region, 'Sales', 'Region', '',
-        px.colors.diverging.Picnic, round(df_filtered_region['Sales'], 2),
-        color_discrete=[COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER]
+    fig_overview_5 = patch_bar_figure(
+        df_filtered_region, df_filtered_region['Sales'], 'Region',
+        round(df_filtered_region['Sales'], 2), REGION_COLORS
     )
 
-    fig_overview_6 = create_bar_figure(
-        df_filtered_region, 'Profit', 'Region', '',
-        px.colors.diverging.Picnic, round(df_filtered_region['Profit'], 2),
-        color_discrete=[COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER]
+    fig_overview_6 = patch_bar_figure(
+        df_filtered_region, df_filtered_region['Profit'], 'Region',
+        round(df_filtered_region['Profit'], 2), REGION_COLORS
     )
 
-    fig_overview_7 = create_bar_figure(
+    fig_overview_7 = patch_bar_figure(
         df_filtered_region, df_filtered_region['Profit Ratio'] * 100, 'Region',
-        '', px.colors.diverging.Picnic,
-        round(df_filtered_region['Profit Ratio'] * 100, 2),
-        color_discrete=[COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER]
+        round(df_filtered_region['Profit Ratio'] * 100, 2), REGION_COLORS
     )
 
-    fig_overview_8 = create_bar_figure(
-        df_filtered_region, 'Days to Ship', 'Region',
-        '', px.colors.diverging.Picnic,
-        round(df_filtered_region['Days to Ship'], 2),
-        color_discrete=[COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER]
+    fig_overview_8 = patch_bar_figure(
+        df_filtered_region, df_filtered_region['Days to Ship'], 'Region',
+        round(df_filtered_region['Days to Ship'], 2), REGION_COLORS
     )
 
     # Pie chart figures
-    def create_pie_figure(df, values, names, title, color_sequence):
-        fig = px.pie(
-            df,
-            values=values,
-            names=names,
-            hole=.3,
-            title=title,
-            color_discrete_sequence=color_sequence
-        )
-        fig.update_layout(
-            template='plotly_white',
-            margin=dict(l=20, r=20, t=40, b=20),
-            height=300,
-            showlegend=True
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        return fig
+    fig_overview_9 = patch_pie_figure(df_filtered_category, 'Sales', 'Category', CATEGORY_COLORS)
 
-    fig_overview_9 = create_pie_figure(
-        df_filtered_category, 'Sales', 'Category', '',
-        [COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS]
-    )
-
-    fig_overview_10 = create_pie_figure(
-        df_filtered_segment, 'Sales', 'Segment', '',
-        [COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS]
-    )
+    fig_overview_10 = patch_pie_figure(df_filtered_segment, 'Sales', 'Segment', SEGMENT_COLORS)
 
     return (
         fig_overview_1, fig_overview_2, fig_overview_3, fig_overview_4,
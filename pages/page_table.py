@@ -3,7 +3,9 @@
 from dash import dash_table, dcc, html, Input, Output, callback, State
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
-from main import df_main
+from main import data_source, dataset
+from services.scheduler import admission_controlled
+from services.singleflight import single_flight
 
 # Color scheme
 COLOR_PRIMARY = '#2E86AB'
@@ -24,8 +26,8 @@ CARD_STYLE = {
 # Create a list of columns required for the table page
 column_list = ['Region', 'State', 'City', 'Order Date', 'Ship Date', 'Category', 'Sub-Category',
                'Sales', 'Profit', 'Profit Ratio', 'Discount', 'Quantity', 'Segment', 'Days to Ship', 'Returned']
-# Create page specific initial dataframe
-df = df_main[column_list]
+# Create page specific data source
+source = data_source.project(column_list)
 # Create a list of updatable columns
 input_fields = ['Region', 'State', 'City', 'Category', 'Sub-Category']
 
@@ -45,168 +47,186 @@ page_header = dbc.Card(
     }
 )
 
-# Design app layout for the datatable page
-layout = html.Div([
-    # Pop up messages
-    dcc.ConfirmDialog(
-        id='no-update',
-        displayed=False,
-        message='Region already exists!',
-        submit_n_clicks=0
-    ),
-    dcc.ConfirmDialog(
-        id='data-update',
-        displayed=False,
-        message='Record successfully added!',
-        submit_n_clicks=0
-    ),
+# Design app layout for the datatable page. Built on the first visit of the route (see app.py).
+def create_layout():
+    return html.Div([
+        # Pop up messages
+        dcc.ConfirmDialog(
+            id='no-update',
+            displayed=False,
+            message='Region already exists!',
+            submit_n_clicks=0
+        ),
+        dcc.ConfirmDialog(
+            id='data-update',
+            displayed=False,
+            message='Record successfully added!',
+            submit_n_clicks=0
+        ),
 
-    # Page header
-    dbc.Row(dbc.Col(page_header, width=12)),
+        # Page header
+        dbc.Row(dbc.Col(page_header, width=12)),
 
-    # Filters section
-    dbc.Card(
-        dbc.CardBody([
-            html.H5("Data Filters", className="card-title",
-                    style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+        # Filters section
+        dbc.Card(
+            dbc.CardBody([
+                html.H5("Data Filters", className="card-title",
+                        style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
 
-            dbc.Row([
-                dbc.Col([
-                    dbc.Label("Rows per page:", className="mb-1"),
-                    dcc.Dropdown(
-                        id='row-dropdown',
-                        value=25,
-                        clearable=False,
-                        options=[10, 25, 50, 100],
-                        style={'width': '100%'}
-                    )
-                ], width=2),
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Label("Rows per page:", className="mb-1"),
+                        dcc.Dropdown(
+                            id='row-dropdown',
+                            value=25,
+                            clearable=False,
+                            options=[10, 25, 50, 100],
+                            style={'width': '100%'}
+                        )
+                    ], width=2),
 
-                dbc.Col([
-                    dbc.Label("Region:", className="mb-1"),
-                    dcc.Dropdown(
-                        id='region',
-                        options=[{'label': x, 'value': x} for x in sorted(df['Region'].unique())],
-                        multi=False,
-                        placeholder="Select region...",
-                        style={'width': '100%'}
-                    )
-                ], width=3),
+                    dbc.Col([
+                        dbc.Label("Region:", className="mb-1"),
+                        dcc.Dropdown(
+                            id='region',
+                            options=[{'label': x, 'value': x} for x in source.distinct('Region')],
+                            multi=False,
+                            placeholder="Select region...",
+                            style={'width': '100%'}
+                        )
+                    ], width=3),
 
-                dbc.Col([
-                    dbc.Label("State:", className="mb-1"),
-                    dcc.Dropdown(
-                        id='state',
-                        options=[{'label': x, 'value': x} for x in sorted(df['State'].unique())],
-                        multi=False,
-                        placeholder="Select state...",
-                        style={'width': '100%'}
-                    )
-                ], width=3),
+                    dbc.Col([
+                        dbc.Label("State:", className="mb-1"),
+                        dcc.Dropdown(
+                            id='state',
+                            options=[{'label': x, 'value': x} for x in source.distinct('State')],
+                            multi=False,
+                            placeholder="Select state...",
+                            style={'width': '100%'}
+                        )
+                    ], width=3),
 
-                dbc.Col([
-                    dbc.Label("City:", className="mb-1"),
-                    dcc.Dropdown(
-                        id='city',
-                        options=[{'label': x, 'value': x} for x in sorted(df['City'].unique())],
-                        multi=False,
-                        placeholder="Select city...",
-                        style={'width': '100%'}
-                    )
-                ], width=3)
-            ], className='mb-3')
-        ]),
-        style=CARD_STYLE
-    ),
+                    dbc.Col([
+                        dbc.Label("City:", className="mb-1"),
+                        dcc.Dropdown(
+                            id='city',
+                            options=[{'label': x, 'value': x} for x in source.distinct('City')],
+                            multi=False,
+                            placeholder="Select city...",
+                            style={'width': '100%'}
+                        )
+                    ], width=3)
+                ], className='mb-3'),
 
-    # Data table section
-    dbc.Card(
-        dbc.CardBody([
-            html.H5("Sales Records", className="card-title",
-                    style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+                # Search over the city, state, product and customer of the records, with suggestions while typing
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Label("Search:", className="mb-1"),
+                        dcc.Input(
+                            id='search',
+                            type='search',
+                            list='search-suggestions',
+                            debounce=0.25,
+                            placeholder="Search city, state, product or customer...",
+                            className="form-control",
+                            style={'width': '100%'}
+                        ),
+                        html.Datalist(id='search-suggestions', children=[])
+                    ], width=11)
+                ])
+            ]),
+            style=CARD_STYLE
+        ),
 
-            dash_table.DataTable(
-                id='data-table',
-                columns=[{"name": i, "id": i} for i in df.columns],
-                data=df.to_dict("records"),
-                style_table={
-                    'overflowX': 'auto',
-                    'height': '600px',
-                    'borderRadius': '8px'
-                },
-                style_cell={
-                    'textAlign': 'left',
-                    'padding': '10px',
-                    'fontFamily': 'Arial, sans-serif',
-                    'border': '1px solid #e0e0e0'
-                },
-                style_header={
-                    'backgroundColor': COLOR_PRIMARY,
-                    'color': 'white',
-                    'fontWeight': 'bold',
-                    'border': '1px solid #e0e0e0'
-                },
-                style_data={
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                    'border': '1px solid #e0e0e0'
-                },
-                style_data_conditional=[
-                    {
-                        'if': {'row_index': 'odd'},
-                        'backgroundColor': 'rgba(240, 240, 240, 0.5)'
-                    }
-                ],
-                filter_action="native",
-                sort_action="native",
-                row_deletable=True,
-                editable=True,
-                page_action="native",
-                page_current=0,
-                page_size=25,
-                fixed_rows={'headers': True}
-            )
-        ]),
-        style=CARD_STYLE
-    ),
+        # Data table section
+        dbc.Card(
+            dbc.CardBody([
+                html.H5("Sales Records", className="card-title",
+                        style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
 
-    # Add new record section
-    dbc.Card(
-        dbc.CardBody([
-            html.H5("Add New Record", className="card-title",
-                    style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+                dash_table.DataTable(
+                    id='data-table',
+                    columns=[{"name": i, "id": i} for i in source.columns],
+                    data=source.select().to_dict("records"),
+                    style_table={
+                        'overflowX': 'auto',
+                        'height': '600px',
+                        'borderRadius': '8px'
+                    },
+                    style_cell={
+                        'textAlign': 'left',
+                        'padding': '10px',
+                        'fontFamily': 'Arial, sans-serif',
+                        'border': '1px solid #e0e0e0'
+                    },
+                    style_header={
+                        'backgroundColor': COLOR_PRIMARY,
+                        'color': 'white',
+                        'fontWeight': 'bold',
+                        'border': '1px solid #e0e0e0'
+                    },
+                    style_data={
+                        'whiteSpace': 'normal',
+                        'height': 'auto',
+                        'border': '1px solid #e0e0e0'
+                    },
+                    style_data_conditional=[
+                        {
+                            'if': {'row_index': 'odd'},
+                            'backgroundColor': 'rgba(240, 240, 240, 0.5)'
+                        }
+                    ],
+                    filter_action="native",
+                    sort_action="native",
+                    row_deletable=True,
+                    editable=True,
+                    page_action="native",
+                    page_current=0,
+                    page_size=25,
+                    fixed_rows={'headers': True}
+                )
+            ]),
+            style=CARD_STYLE
+        ),
 
-            dbc.Row([
-                dbc.Col([
-                    dbc.Input(
-                        id=f'input_{field}',
-                        placeholder=f"Enter {field}...",
-                        className="mb-2",
-                        style={'width': '100%'}
-                    )
-                ], width=2) for field in input_fields
-            ], className='mb-3'),
+        # Add new record section
+        dbc.Card(
+            dbc.CardBody([
+                html.H5("Add New Record", className="card-title",
+                        style={'color': COLOR_PRIMARY, 'marginBottom': '15px'}),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Input(
+                            id=f'input_{field}',
+                            placeholder=f"Enter {field}...",
+                            className="mb-2",
+                            style={'width': '100%'}
+                        )
+                    ], width=2) for field in input_fields
+                ], className='mb-3'),
 
-            dbc.Row(
-                dbc.Col(
-                    dbc.Button(
-                        'Add New Record',
-                        id='submit-button',
-                        n_clicks=0,
-                        color="primary",
-                        className="me-1",
-                        style={'width': '200px'}
-                    ),
-                    width=12, className="text-center"
+                dbc.Row(
+                    dbc.Col(
+                        dbc.Button(
+                            'Add New Record',
+                            id='submit-button',
+                            n_clicks=0,
+                            color="primary",
+                            className="me-1",
+                            style={'width': '200px'}
+                        ),
+                        width=12, className="text-center"
+                    )
                 )
-            )
-        ]),
-        style=CARD_STYLE
-    )
-], style={
-    'backgroundColor': COLOR_LIGHT,
-    'padding': '20px'
-})
+            ]),
+            style=CARD_STYLE
+        )
+    ], style={
+        'backgroundColor': COLOR_LIGHT,
+        'padding': '20px'
+    })
 
 
 # Callback function to handle user dropdown selections
@@ -219,26 +239,45 @@ layout = html.Div([
     Input('region', 'value'),
     Input('state', 'value'),
     Input('city', 'value'),
-    Input('row-dropdown', 'value')
+    Input('row-dropdown', 'value'),
+    Input('search', 'value')
 )
-def update_dropdown_options(region_v, state_v, city_v, row_v):
-    df_filtered = df.copy()
+@dataset.pinned
+@single_flight
+@admission_controlled
+def update_dropdown_options(region_v, state_v, city_v, row_v, search_v):
+    filters = {}
     if region_v:
-        df_filtered = df_filtered[df_filtered.Region == region_v].sort_values(column_list)
+        filters['Region'] = region_v
     if state_v:
-        df_filtered = df_filtered[df_filtered.State == state_v]
+        filters['State'] = state_v
     if city_v:
-        df_filtered = df_filtered[df_filtered.City == city_v]
+        filters['City'] = city_v
+    # Rows are sorted by all columns once a region is selected.
+    df_filtered = source.select(filters=filters, order_by=column_list if region_v else None, search=search_v)
 
     return (
         df_filtered.to_dict('records'),
         row_v,
-        [{'label': i, 'value': i} for i in sorted(df_filtered['Region'].unique())],
-        [{'label': i, 'value': i} for i in sorted(df_filtered['State'].unique())],
-        [{'label': i, 'value': i} for i in sorted(df_filtered['City'].unique())]
+        [{'label': i, 'value': i} for i in source.distinct('Region', filters)],
+        [{'label': i, 'value': i} for i in source.distinct('State', filters)],
+        [{'label': i, 'value': i} for i in source.distinct('City', filters)]
     )
 
 
+# Callback function to suggest search values while typing
+@callback(
+    Output('search-suggestions', 'children'),
+    Input('search', 'value')
+)
+@dataset.pinned
+@admission_controlled
+def update_search_suggestions(search_v):
+    if not search_v or not search_v.strip():
+        return []
+    return [html.Option(value=value, label=column) for column, value in source.suggest(search_v)]
+
+
 # Callback function to perform datatable update based on user new row entries
 @callback(
     [Output('no-update', 'displayed'),
@@ -249,10 +288,12 @@ def update_dropdown_options(region_v, state_v, city_v, row_v):
     [State(f'input_{x}', 'value') for x in input_fields],
     prevent_initial_call=True
 )
+@dataset.pinned
+@admission_controlled
 def update_datatable(n_clicks, columns, input_region, input_state, input_city, input_category, input_subcategory):
     if n_clicks > 0:
-        if input_region in df['Region'].values:
-            data_updated = df.to_dict('records')
+        if source.contains('Region', input_region):
+            data_updated = source.select().to_dict('records')
             return True, False, data_updated
         else:
             new_row = {c['id']: r for c, r in zip(columns, [
@@ -264,8 +305,8 @@ def update_datatable(n_clicks, columns, input_region, input_state, input_city, i
             if any(x is None for x in [input_region, input_state, input_city, input_category, input_subcategory]):
                 raise PreventUpdate
             else:
-                df.loc[len(df)] = new_row
-                data_updated = df.to_dict('records')
+                source.append(new_row)
+                data_updated = source.select().to_dict('records')
                 return False, True, data_updated
     else:
         raise PreventUpdate
\ No newline at end of file
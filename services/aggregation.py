@@ -0,0 +1,256 @@
+# Date filtered group-by aggregation used by the pages.
+# config.AGGREGATION_MODE selects the implementation:
+#   'serial'   - one pandas groupby over the whole frame.
+#   'parallel' - the frame is partitioned by year or month of 'Order Date' (config.AGGREGATION_PARTITION), each
+#                partition is filtered and aggregated in a worker process and the partial aggregates are merged.
+#                Means are computed as sum and count per partition and divided after merging, so they stay exact.
+#                Only a long-lived frame given with a key (the dataset version) is partitioned; other frames, e.g.
+#                rows selected per call, are aggregated serially. Derived columns (services.transform.DERIVED_COLUMNS)
+#                are not partitioned: every worker derives the ones it aggregates per partition when first needed.
+# Text columns may be categorical (see services.shared_store), so only observed groups are aggregated.
+# Run `python -m services.aggregation` to benchmark both modes on the page aggregations.
+import os
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import config
+from services.transform import DERIVED_COLUMNS
+
+DATE_COLUMN = 'Order Date'
+# How partial aggregates of every supported function are merged.
+MERGE_FUNCTIONS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+# Partitions of the one frame aggregated in parallel mode, their first and last dates and its key. Worker processes
+# are forked after the partitions are registered and read them copy-on-write, so partitions are never pickled.
+# Registering a frame of another key replaces the partitions and forks new workers, which only happens when the
+# dataset is reloaded.
+partitioned_key = None
+partitions = {}
+partition_bounds = {}
+pool = None
+pool_lock = threading.Lock()
+# Derived columns of the partitions computed by a worker process, by partition label and column name.
+derived_partitions = {}
+
+
+def filter_dates(df, start_date, end_date):
+    if start_date is None and end_date is None:
+        return df
+    return df[df[DATE_COLUMN].between(start_date, end_date)]
+
+
+def serial_aggregate(df, by, agg, start_date=None, end_date=None):
+    return filter_dates(df, start_date, end_date).groupby(by, observed=True).agg(agg)
+
+
+# Replace every mean by a sum and a count, which can be merged across partitions.
+def partial_functions(agg):
+    partial = {}
+    for column, function in agg.items():
+        if function == 'mean':
+            partial[f'{column}__sum'] = (column, 'sum')
+            partial[f'{column}__count'] = (column, 'count')
+        elif function in MERGE_FUNCTIONS:
+            partial[column] = (column, function)
+        else:
+            raise ValueError(f'Aggregation function {function!r} cannot be merged across partitions')
+    return partial
+
+
+# The given columns of a partition, deriving the ones it does not hold.
+def partition_columns(label, columns):
+    df_partition = partitions[label]
+    data = {}
+    for name in columns:
+        if name in df_partition.columns:
+            data[name] = df_partition[name]
+        else:
+            if (label, name) not in derived_partitions:
+                derived_partitions[label, name] = DERIVED_COLUMNS[name](df_partition)
+            data[name] = derived_partitions[label, name]
+    return pd.DataFrame(data, copy=False)
+
+
+def aggregate_partition(label, by, agg, start_date, end_date):
+    keys = [getattr(key, 'key', key) for key in by]
+    columns = list(dict.fromkeys([DATE_COLUMN] + keys + list(agg)))
+    df_partition = filter_dates(partition_columns(label, columns), start_date, end_date)
+    if df_partition.empty:
+        return None
+    return df_partition.groupby(by, observed=True).agg(**partial_functions(agg))
+
+
+def merge_partials(partials, by, agg):
+    df_partial = pd.concat(partials)
+    merge = {}
+    for column, function in agg.items():
+        if function == 'mean':
+            merge[f'{column}__sum'] = 'sum'
+            merge[f'{column}__count'] = 'sum'
+        else:
+            merge[column] = MERGE_FUNCTIONS[function]
+    df_merged = df_partial.groupby(level=list(range(df_partial.index.nlevels)), observed=True).agg(merge)
+
+    df_result = pd.DataFrame(index=df_merged.index)
+    for column, function in agg.items():
+        if function == 'mean':
+            df_result[column] = df_merged[f'{column}__sum'] / df_merged[f'{column}__count']
+        else:
+            df_result[column] = df_merged[column]
+
+    return complete_time_bins(df_result, by, agg)
+
+
+# A single time grouper yields every bin between the first and last date, as pandas does, including bins without any
+# rows (e.g. between partitions, or missing from a SQL GROUP BY).
+def complete_time_bins(df_result, by, agg):
+    if len(by) != 1 or not isinstance(by[0], pd.Grouper) or by[0].freq is None or df_result.empty:
+        return df_result
+    dtypes = df_result.dtypes
+    full_range = pd.date_range(df_result.index.min(), df_result.index.max(), freq=by[0].freq, name=by[0].key)
+    df_result = df_result.reindex(full_range)
+    for column, function in agg.items():
+        if function in ('sum', 'count'):
+            df_result[column] = df_result[column].fillna(0).astype(dtypes[column])
+    return df_result
+
+
+def partition_frame(df):
+    dates = df[DATE_COLUMN]
+    if config.AGGREGATION_PARTITION == 'month':
+        labels = dates.dt.year * 100 + dates.dt.month
+    else:
+        labels = dates.dt.year
+    partitions = {}
+    for label, df_partition in df.groupby(labels, sort=True):
+        partitions[int(label)] = df_partition
+    return partitions
+
+
+# First and last dates of the partitions of the frame of the key and the worker pool reading them, partitioning
+# frame() first for a new key.
+def get_partitions(key, frame):
+    global partitioned_key, partitions, partition_bounds, pool
+    with pool_lock:
+        if key != partitioned_key:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=False)
+                pool = None
+            partitioned_key, partitions = key, partition_frame(frame())
+            partition_bounds = {label: (df_partition[DATE_COLUMN].min(), df_partition[DATE_COLUMN].max())
+                                for label, df_partition in partitions.items()}
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=config.AGGREGATION_WORKERS,
+                                       mp_context=multiprocessing.get_context('fork'))
+        return partition_bounds, pool
+
+
+# key identifies a long-lived frame; frame() returns it with the rows of df (df by default). Columns of df it does not
+# hold must be derived columns.
+def parallel_aggregate(df, by, agg, start_date=None, end_date=None, key=None, frame=None):
+    if key is None:
+        return serial_aggregate(df, by, agg, start_date, end_date)
+    bounds, executor = get_partitions(key, frame or (lambda: df))
+
+    start, end = pd.Timestamp(start_date or pd.Timestamp.min), pd.Timestamp(end_date or pd.Timestamp.max)
+    labels = [label for label, (first, last) in bounds.items() if last >= start and first <= end]
+    if not labels:
+        return serial_aggregate(df.iloc[:0], by, agg)
+
+    futures = [executor.submit(aggregate_partition, label, by, agg, start_date, end_date) for label in labels]
+    partials = [partial for partial in (future.result() for future in futures) if partial is not None]
+    if not partials:
+        return serial_aggregate(df.iloc[:0], by, agg)
+    return merge_partials(partials, by, agg)
+
+
+def aggregate(df, by, agg, start_date=None, end_date=None, key=None, frame=None):
+    by = by if isinstance(by, list) else [by]
+    if config.AGGREGATION_MODE == 'parallel':
+        return parallel_aggregate(df, by, agg, start_date, end_date, key, frame)
+    return serial_aggregate(df, by, agg, start_date, end_date)
+
+
+# Register the partitions of key as the ones of previous_key with the rows of df_appended added, after a reload appended
+# them to the dataset. Only the partitions of the appended rows are copied; new workers are forked for them. Without
+# partitions of previous_key, all partitions are forgotten.
+def extend(previous_key, key, df_appended):
+    global partitioned_key, partitions, partition_bounds, pool
+    with pool_lock:
+        extended, bounds = {}, {}
+        if partitioned_key == previous_key:
+            extended, bounds = dict(partitions), dict(partition_bounds)
+            for label, df_partition in partition_frame(df_appended).items():
+                if label in extended:
+                    df_partition = pd.concat([extended[label], df_partition])
+                extended[label] = df_partition
+                bounds[label] = (df_partition[DATE_COLUMN].min(), df_partition[DATE_COLUMN].max())
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=not extended)
+        pool, partitioned_key, partitions, partition_bounds = None, key if extended else None, extended, bounds
+
+
+# Forget all partitions, e.g. after the dataset was reloaded.
+def reset():
+    global pool, partitioned_key, partitions, partition_bounds
+    with pool_lock:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        pool, partitioned_key, partitions, partition_bounds = None, None, {}, {}
+
+
+# A forked child (background job, gunicorn worker) cannot use the worker processes of its parent; it forks its own
+# workers from the partitions it inherited. Workers forked for other partitions must not reuse derived columns.
+def reset_in_child():
+    global pool, pool_lock, derived_partitions
+    pool, pool_lock, derived_partitions = None, threading.Lock(), {}
+
+
+os.register_at_fork(after_in_child=reset_in_child)
+
+
+# The aggregations done by the page callbacks over the full date range.
+def benchmark_cases():
+    from main import dataset
+    df_main = dataset.current().frame()
+    start_date, end_date = df_main[DATE_COLUMN].min(), df_main[DATE_COLUMN].max()
+    cases = {
+        'landing daily': ('Order Date', {'Sales': 'sum', 'Profit': 'sum', 'Days to Ship': 'mean'}),
+        'landing region': ('Region', {'Sales': 'sum', 'Profit': 'sum', 'Days to Ship': 'mean'}),
+        'timeline weekly': (pd.Grouper(key='Order Date', freq='W'),
+                            {'Days to Ship': 'mean', 'Sales': 'sum', 'Profit': 'sum', 'Returned': 'sum'}),
+        'bubble weekly': ([pd.Grouper(key='Order Date', freq='W'), 'Region', 'Customer Name', 'Product Name',
+                           'Ship Mode', 'Segment', 'Category', 'Sub-Category'],
+                          {'Days to Ship': 'mean', 'Sales': 'sum', 'Profit': 'sum', 'Discount': 'mean',
+                           'Quantity': 'sum', 'Returned': 'sum'}),
+    }
+    return df_main, start_date, end_date, cases
+
+
+def parallel_benchmark_aggregate(df, by, agg, start_date, end_date):
+    return parallel_aggregate(df, by, agg, start_date, end_date, key='benchmark')
+
+
+def benchmark(repeats=5):
+    df, start_date, end_date, cases = benchmark_cases()
+    results = {}
+    for name, (by, agg) in cases.items():
+        timings = {}
+        for mode, function in [('serial', serial_aggregate), ('parallel', parallel_benchmark_aggregate)]:
+            by_list = by if isinstance(by, list) else [by]
+            function(df, by_list, agg, start_date, end_date)  # warm up partitions and worker processes
+            started = time.perf_counter()
+            for _ in range(repeats):
+                function(df, by_list, agg, start_date, end_date)
+            timings[mode] = (time.perf_counter() - started) / repeats
+        results[name] = timings
+    return results
+
+
+if __name__ == '__main__':
+    for case, timings in benchmark().items():
+        print(f"{case:<18} serial {timings['serial'] * 1000:9.2f} ms   parallel {timings['parallel'] * 1000:9.2f} ms")
@@ -0,0 +1,186 @@
+# Benchmark of the load pipeline and the page callbacks on synthetic data (services.synthetic) of growing size.
+# For every size the load pipeline of main.py is timed (preparing the orders, materialising and attaching the shared
+# store), the attached frame is published as the current dataset and the page callbacks are called directly over
+# every granularity and date range (all data, last year, quarter and month). The sampled previews of the graphs
+# (page_graph.preview_*) are only drawn for sizes of at least config.PREVIEW_MIN_ROWS. The first call of a case is
+# reported as cold, the following repeats as min/median/mean. Results are written as JSON and can be compared with an
+# earlier run:
+#   python -m services.benchmark [--rows 10000 100000 1000000] [--repeats N] [--seed N] [--output FILE]
+#                                [--compare FILE]
+# Only the pandas backend is benchmarked; page_table.update_datatable is left out as it appends rows to the dataset.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import config
+from services import shared_store, synthetic, transform
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+GRANULARITIES = ['W', 'ME', 'QE', 'YE']
+# Date range -> days before the last order date, None for all data.
+DATE_RANGES = {'all': None, 'year': 365, 'quarter': 91, 'month': 30}
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def summary(seconds):
+    return {'min': min(seconds), 'median': statistics.median(seconds), 'mean': statistics.mean(seconds)}
+
+
+def result(rows, name, case, cold, seconds):
+    return {'rows': rows, 'name': name, 'case': case, 'cold': cold, **(summary(seconds) if seconds else {})}
+
+
+def date_ranges(df):
+    first_date, last_date = df['Order Date'].min(), df['Order Date'].max()
+    for label, days in DATE_RANGES.items():
+        start_date = first_date if days is None else last_date - pd.Timedelta(days=days)
+        yield label, start_date.strftime('%Y-%m-%d'), last_date.strftime('%Y-%m-%d')
+
+
+# Callback cases as (name, case description, function, arguments).
+def callback_cases(df):
+    from pages import page_graph, page_landing, page_table
+    for label, start_date, end_date in date_ranges(df):
+        yield 'update_overview_cards', {'range': label}, page_landing.update_overview_cards, (start_date, end_date)
+        for granularity in GRANULARITIES:
+            case = {'range': label, 'granularity': granularity}
+            yield 'update_timeline_graph', case, page_graph.update_timeline_graph, (granularity, start_date, end_date)
+            yield 'update_bubble_graph', case, page_graph.update_bubble_graph, (
+                start_date, end_date, granularity, 'Sales', 'Profit', 'Segment_Label')
+            yield 'preview_timeline_graph', case, page_graph.preview_timeline_graph, (granularity, start_date, end_date)
+            yield 'preview_bubble_graph', case, page_graph.preview_bubble_graph, (
+                start_date, end_date, granularity, 'Sales', 'Profit', 'Segment_Label')
+    region = df['Region'].iloc[0]
+    state = df.loc[df['Region'] == region, 'State'].iloc[0]
+    search = str(df['City'].iloc[0])[:3]
+    for label, filters in [('none', (None, None, None)), ('region', (region, None, None)),
+                           ('region+state', (region, state, None)), ('search', (None, None, search))]:
+        region_v, state_v, search_v = filters
+        yield 'update_dropdown_options', {'filter': label}, page_table.update_dropdown_options, (
+            region_v, state_v, None, 10, search_v)
+    yield 'update_search_suggestions', {}, page_table.update_search_suggestions, (search,)
+
+
+def call(func, args):
+    from dash.exceptions import PreventUpdate
+    try:
+        func(*args)
+    except PreventUpdate:
+        pass
+
+
+def benchmark_load(rows, seed, directory):
+    results = []
+    seconds, (df_orders, df_returns) = timed(synthetic.generate, rows, seed)
+    results.append(result(rows, 'generate', {}, seconds, []))
+    seconds, df = timed(transform.prepare_orders, df_orders, df_returns)
+    results.append(result(rows, 'prepare orders', {}, seconds, []))
+    store = os.path.join(directory, f'synthetic-{rows}')
+    seconds, _ = timed(shared_store.materialise, df, store)
+    results.append(result(rows, 'materialise store', {}, seconds, []))
+    seconds, df = timed(shared_store.attach, store)
+    results.append(result(rows, 'attach store', {}, seconds, []))
+    return df, results
+
+
+def benchmark_callbacks(rows, df, repeats):
+    import main
+    main.dataset.publish(f'synthetic-{rows}', df)
+    results = []
+    for name, case, func, args in callback_cases(df):
+        cold, _ = timed(call, func, args)
+        seconds = [timed(call, func, args)[0] for _ in range(repeats)]
+        results.append(result(rows, name, case, cold, seconds))
+    return results
+
+
+def run(sizes, repeats, seed):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            df, load_results = benchmark_load(rows, seed, directory)
+            results.extend(load_results)
+            results.extend(benchmark_callbacks(rows, df, repeats))
+            print_results(results, rows)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'repeats': repeats,
+            'aggregation_mode': config.AGGREGATION_MODE,
+            'background_callbacks': config.BACKGROUND_CALLBACKS,
+        },
+        'results': results,
+    }
+
+
+def result_key(entry):
+    return entry['rows'], entry['name'], json.dumps(entry['case'], sort_keys=True)
+
+
+def label(entry):
+    case = ' '.join(str(value) for value in entry['case'].values())
+    return f"{entry['rows']:>9} {entry['name']:<24} {case:<14}"
+
+
+def print_results(results, rows):
+    for entry in results:
+        if entry['rows'] != rows:
+            continue
+        line = f"{label(entry)} cold {entry['cold'] * 1000:10.2f} ms"
+        if 'median' in entry:
+            line += f"   median {entry['median'] * 1000:10.2f} ms   min {entry['min'] * 1000:10.2f} ms"
+        print(line)
+
+
+# Print the ratio of the median (or the cold time of single runs) to the one of an earlier run.
+def compare(report, baseline):
+    previous = {result_key(entry): entry for entry in baseline['results']}
+    for entry in report['results']:
+        before = previous.get(result_key(entry))
+        if before is None:
+            continue
+        field = 'median' if 'median' in entry and 'median' in before else 'cold'
+        print(f"{label(entry)} {field:<6} {before[field] * 1000:10.2f} ms -> {entry[field] * 1000:10.2f} ms"
+              f"   x{entry[field] / before[field]:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the load pipeline and the page callbacks.')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='data set sizes')
+    parser.add_argument('--repeats', type=int, default=3, help='timed calls per case after the cold call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='compare with the JSON results of an earlier run')
+    args = parser.parse_args()
+    if config.DATA_BACKEND != 'pandas':
+        sys.exit('The benchmark runs on the pandas backend only (DATA_BACKEND=pandas)')
+    # Repeated calls would be answered by the result cache; the benchmark times their computation.
+    config.RESULT_CACHE_ENTRIES = 0
+    report = run(args.rows, args.repeats, args.seed)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(report, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Per-callback metrics of the Dash app, rendered on /metrics with the other metrics (see app.py).
+# Every callback runs through one Dash endpoint, so Flask request hooks on it cover every registered callback without
+# wrapping them. Per callback they record the latency, the response payload size, the response status and the number of
+# distinct input combinations (how well a result cache could work). Polls of background callbacks are recorded apart
+# from the calls that start them. Result caches (single-flight, page layouts) report their hits and misses through
+# record_cache_lookup().
+import json
+import threading
+import time
+
+import flask
+
+from services import metrics
+
+# Response payload buckets, in bytes.
+PAYLOAD_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Distinct input combinations tracked per callback, the count stops growing beyond it.
+MAX_TRACKED_INPUTS = 10000
+
+latency_seconds = metrics.histogram(
+    'dashboard_callback_latency_seconds', 'Server time of callback requests, by callback and request kind.')
+response_bytes = metrics.histogram(
+    'dashboard_callback_response_bytes', 'Payload size of callback responses.', buckets=PAYLOAD_BUCKETS)
+responses_total = metrics.counter(
+    'dashboard_callback_responses_total', 'Callback requests by response status.')
+errors_total = metrics.counter(
+    'dashboard_callback_errors_total', 'Callback requests that failed with a server error.')
+distinct_inputs = metrics.gauge(
+    'dashboard_callback_distinct_inputs', f'Distinct input combinations per callback (counted up to {MAX_TRACKED_INPUTS}).')
+cache_lookups_total = metrics.counter(
+    'dashboard_callback_cache_lookups_total', 'Callback result cache lookups, by cache and result (hit or miss).')
+
+seen_inputs = {}
+seen_inputs_lock = threading.Lock()
+
+
+def record_cache_lookup(callback, cache, hit):
+    cache_lookups_total.inc(callback=callback, cache=cache, result='hit' if hit else 'miss')
+
+
+def record_inputs(name, body):
+    key = hash(json.dumps([body.get('inputs'), body.get('state')], sort_keys=True, default=str))
+    with seen_inputs_lock:
+        seen = seen_inputs.setdefault(name, set())
+        if len(seen) < MAX_TRACKED_INPUTS:
+            seen.add(key)
+        count = len(seen)
+    distinct_inputs.set(count, callback=name)
+
+
+def instrument(app):
+    path = app.config.routes_pathname_prefix + '_dash-update-component'
+    names = {}
+
+    # Name of the callback function behind an output id of a request. Only the outputs of registered callbacks are
+    # cached, so requests with made-up outputs cannot grow the cache.
+    def callback_name(output):
+        if not isinstance(output, str):
+            return 'unknown'
+        if output not in names:
+            callback = app.callback_map.get(output, {}).get('callback')
+            if callback is None:
+                return 'unknown'
+            names[output] = getattr(callback, '__name__', 'unknown')
+        return names[output]
+
+    @app.server.before_request
+    def start_callback_timer():
+        if flask.request.path == path:
+            flask.g.callback_started = time.perf_counter()
+
+    @app.server.after_request
+    def record_callback_metrics(response):
+        started = flask.g.pop('callback_started', None)
+        if started is None:
+            return response
+        body = flask.request.get_json(silent=True) or {}
+        name = callback_name(body.get('output'))
+        kind = 'poll' if 'job' in flask.request.args else 'call'
+        latency_seconds.observe(time.perf_counter() - started, callback=name, kind=kind)
+        size = response.content_length
+        response_bytes.observe(size if size is not None else response.calculate_content_length() or 0, callback=name)
+        responses_total.inc(callback=name, status=response.status_code)
+        if response.status_code >= 500 and response.status_code != 503:
+            errors_total.inc(callback=name)
+        if kind == 'call':
+            record_inputs(name, body)
+        return response
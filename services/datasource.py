@@ -0,0 +1,615 @@
+# Data sources the pages query instead of touching a DataFrame directly.
+# Every source answers the same questions - date filtered group-by aggregates, filtered row selections, distinct
+# values - so the pages run unchanged on any backend (config.DATA_BACKEND):
+#   'pandas' - queries an in-memory DataFrame (df_main), aggregations go through services.aggregation.
+#   'sqlite' - queries an embedded SQLite database file through a connection pool. Date range and equality filters,
+#              groupbys and time buckets are pushed down as SQL, so only the aggregated rows are held in memory.
+#              Every dataset version is written to a new database file, which is never changed once published, and
+#              every snapshot holds the pool of its own file.
+# Filters are dicts of column -> value, rows must be equal to every value given. A search text matches rows with a
+# value of the search columns (services.search.SEARCH_COLUMNS) starting with it, or with a word starting with it. Both
+# backends search the SearchIndex of the snapshot, which the SQLite backend builds from the stored rows.
+# Both backends read the current Snapshot of a Dataset, which services.reload replaces when the source changes.
+# Rows appended through a source stay in the process that appended them: the pandas backend adds them to its view,
+# the SQLite backend to a temporary table of every connection of its pool, which queries read after the stored rows.
+import contextvars
+import fcntl
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+import config
+from services import sampling, scheduler, shared_store
+from services.aggregation import DATE_COLUMN, aggregate, complete_time_bins
+from services.search import SEARCH_COLUMNS, SearchIndex
+from services.transform import DERIVED_COLUMNS
+
+TABLE_NAME = 'orders'
+DATABASE_SUFFIX = '.sqlite'
+# Temporary table of the rows appended to a SQLite source, see ConnectionPool.append.
+APPENDED_TABLE = 'temp.appended'
+SQL_FUNCTIONS = {'sum': 'SUM', 'mean': 'AVG', 'count': 'COUNT', 'min': 'MIN', 'max': 'MAX'}
+SQL_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# SQLite expressions labelling a date with the end of its period, like the pandas frequencies used by the pages.
+SQL_TIME_BUCKETS = {
+    'W-SUN': "date({0}, 'weekday 0')",
+    'ME': "date({0}, 'start of month', '+1 month', '-1 day')",
+    'QE-DEC': "date({0}, 'start of month', '+' || (2 - (CAST(strftime('%m', {0}) AS INTEGER) - 1) % 3 + 1) || "
+              "' months', '-1 day')",
+    'YE-DEC': "strftime('%Y', {0}) || '-12-31'",
+}
+
+
+# Snapshot pinned for the callback running in the current context, see Dataset.pinned.
+pinned_snapshot = contextvars.ContextVar('pinned_snapshot', default=None)
+
+
+# Immutable version of the dataset. df is None for backends that do not hold the data in memory, pool is the
+# ConnectionPool of the database file of the SQLite backend and store the directory of the shared memory-mapped store
+# df is attached from, if any.
+# Derived columns (services.transform.DERIVED_COLUMNS), the search index and the preview sample are computed on first
+# access and kept with the snapshot. Derived columns are also added to the store, so the other processes map them
+# instead of computing their own copy. A snapshot publishing rows appended to the previous one extends what was
+# computed for it (see extend); any other reload computes them again.
+class Snapshot:
+    def __init__(self, version, df, pool=None, store=None):
+        self.version = version
+        self.df = df
+        self.pool = pool
+        self.store = store
+        self.derived = {}
+        self.derive_lock = threading.Lock()
+        self.index = None
+        self.sampled = None
+
+    @property
+    def columns(self):
+        return list(self.df.columns) + [name for name in DERIVED_COLUMNS if name not in self.df.columns]
+
+    def column(self, name):
+        if name in self.df.columns:
+            return self.df[name]
+        with self.derive_lock:
+            if name not in self.derived:
+                self.derived[name] = self.derive(name)
+            return self.derived[name]
+
+    def derive(self, name, compute=None):
+        compute = compute or (lambda: DERIVED_COLUMNS[name](self.df))
+        if self.store is not None:
+            try:
+                values = shared_store.attach_or_write_derived(self.store, name, compute)
+                return pd.Series(values, index=self.df.index, name=name, copy=False)
+            except OSError:  # e.g. a read-only store, the column is kept by this process only
+                pass
+        return compute()
+
+    # Take over the derived columns, search index and sample of previous, of which df holds the rows followed by the
+    # rows of df_appended, computing them for the appended rows only.
+    def extend(self, previous, df_appended):
+        first_row = len(previous.df)
+        with previous.derive_lock:
+            derived, index, sampled = dict(previous.derived), previous.index, previous.sampled
+        for name, values in derived.items():
+            self.derived[name] = self.derive(name, lambda: pd.concat(
+                [values, DERIVED_COLUMNS[name](df_appended)], ignore_index=True).set_axis(self.df.index))
+        if index is not None:
+            self.index = index.appended(df_appended[SEARCH_COLUMNS], first_row)
+        if sampled is not None:
+            self.sampled = sampled.extended(df_appended[DATE_COLUMN])
+
+    # Frame of the given columns (all by default), stored and derived ones alike.
+    def frame(self, columns=None):
+        return pd.DataFrame({name: self.column(name) for name in columns or self.columns}, copy=False)
+
+    @property
+    def search_index(self):
+        if self.index is None:
+            with self.derive_lock:
+                if self.index is None:
+                    self.index = SearchIndex(self.frame(SEARCH_COLUMNS) if self.df is not None
+                                             else self.pool.read_columns(SEARCH_COLUMNS))
+        return self.index
+
+    # Whether the snapshot is large enough for sampled previews (config.PREVIEW_MIN_ROWS).
+    @property
+    def previewable(self):
+        return self.df is not None and 0 < config.PREVIEW_MIN_ROWS <= len(self.df)
+
+    @property
+    def sample(self):
+        if self.sampled is None:
+            with self.derive_lock:
+                if self.sampled is None:
+                    self.sampled = sampling.StratifiedSample(self.df[DATE_COLUMN], config.PREVIEW_SAMPLE_ROWS)
+        return self.sampled
+
+
+class Dataset:
+    def __init__(self, version, df, pool=None, store=None):
+        self.snapshot = Snapshot(version, df, pool, store)
+        self.listeners = []
+        self.publish_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self.reset_locks)
+
+    # A background job may be forked while another thread publishes or derives a column of the snapshot. SQLite
+    # connections must not be shared with forked children either.
+    def reset_locks(self):
+        self.publish_lock = threading.Lock()
+        self.snapshot.derive_lock = threading.Lock()
+        if self.snapshot.pool is not None:
+            self.snapshot.pool.reset()
+
+    @property
+    def version(self):
+        return self.current().version
+
+    # The snapshot pinned by the running callback, or else the latest one.
+    def current(self):
+        return pinned_snapshot.get() or self.snapshot
+
+    # Replace the snapshot in one assignment and tell the listeners, e.g. to refresh indexes and caches. appended are
+    # the rows df appends to the one of the current snapshot, or None if df replaces it.
+    def publish(self, version, df, appended=None, pool=None, store=None):
+        snapshot = Snapshot(version, df, pool, store)
+        if appended is not None:
+            snapshot.extend(self.snapshot, appended)
+        with self.publish_lock:
+            previous, self.snapshot = self.snapshot, snapshot
+        for listener in self.listeners:
+            listener(previous, self.snapshot, appended)
+
+    # Register listener(previous, snapshot, appended) called after every publish.
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    # Decorator pinning the current snapshot for the whole call, so a callback never mixes two dataset versions.
+    def pinned(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = pinned_snapshot.set(self.current())
+            try:
+                return func(*args, **kwargs)
+            finally:
+                pinned_snapshot.reset(token)
+
+        return wrapper
+
+
+# Backends implement every abstract method, so an incomplete backend fails when it is constructed.
+class DataSource(ABC):
+    # Names of the columns of the source.
+    @property
+    @abstractmethod
+    def columns(self):
+        raise NotImplementedError
+
+    # A source of the same backend restricted to the given columns.
+    @abstractmethod
+    def project(self, columns):
+        raise NotImplementedError
+
+    # Group-by aggregation of the rows within the date range, indexed by the group keys like DataFrame.groupby.
+    # Keys are column names or pd.Grouper time buckets of the date column; agg maps columns to sum/mean/count/min/max.
+    @abstractmethod
+    def aggregate(self, by, agg, start_date=None, end_date=None, filters=None):
+        raise NotImplementedError
+
+    # Rows within the date range matching the filters and the search text, optionally sorted by the given columns.
+    @abstractmethod
+    def select(self, columns=None, start_date=None, end_date=None, filters=None, order_by=None, search=None):
+        raise NotImplementedError
+
+    # Sorted distinct values of a column among the rows matching the filters.
+    @abstractmethod
+    def distinct(self, column, filters=None):
+        raise NotImplementedError
+
+    # Values of the search columns matching the search text as (column, value) pairs, the ones of the most rows first.
+    @abstractmethod
+    def suggest(self, search, limit=10):
+        raise NotImplementedError
+
+    # Estimate of aggregate(by, agg, start_date, end_date) from a sample of the rows (a services.sampling.Estimate), or
+    # None when the source has no sample. With scale=False the sampled rows are aggregated as they are.
+    def estimate(self, by, agg, start_date=None, end_date=None, scale=True):
+        return None
+
+    # First and last value of a date column.
+    @abstractmethod
+    def date_range(self, column=DATE_COLUMN):
+        raise NotImplementedError
+
+    @abstractmethod
+    def contains(self, column, value):
+        raise NotImplementedError
+
+    # Append one row given as a dict of column -> value.
+    @abstractmethod
+    def append(self, row):
+        raise NotImplementedError
+
+
+# Read-only view of some columns of a snapshot. Its columns are the snapshot's own arrays (memory-mapped when the
+# dataset is shared), so projecting copies nothing. Selecting rows by an index array copies only the selected rows of
+# the requested columns.
+class ProjectedView:
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def __len__(self):
+        return len(self.df)
+
+    def column(self, name):
+        return self.df[name]
+
+    # Positions of the rows within the date range and equal to every filter value, or None for all rows.
+    def rows(self, start_date=None, end_date=None, filters=None):
+        if start_date is None and end_date is None and not filters:
+            return None
+        mask = np.ones(len(self.df), dtype=bool)
+        if start_date is not None or end_date is not None:
+            mask &= self.df[DATE_COLUMN].between(start_date, end_date).to_numpy()
+        for column, value in filters.items() if filters else ():
+            mask &= (self.df[column] == value).to_numpy()
+        return np.flatnonzero(mask)
+
+    # Frame of the given rows (all by default) and columns (all by default).
+    def take(self, rows=None, columns=None):
+        columns = self.columns if columns is None else columns
+        if rows is None:
+            return pd.DataFrame({name: self.df[name] for name in columns}, copy=False)
+        return pd.DataFrame({name: self.df[name].take(rows) for name in columns}, copy=False)
+
+    # New view with the row appended. Unlike projecting, this copies the columns of the view once. The row starts
+    # missing in every column; values new to a categorical column (the columns attached from the shared store) are
+    # added to its categories before they are set, so the column stays categorical instead of becoming one of objects.
+    def append(self, row):
+        label = len(self.df)
+        df = self.df.reindex(self.df.index.append(pd.Index([label])))
+        for name, value in row.items():
+            if name not in df or pd.isna(value):
+                continue
+            if isinstance(df[name].dtype, pd.CategoricalDtype) and value not in df[name].cat.categories:
+                df[name] = df[name].cat.add_categories([value])
+            df.at[label, name] = value
+        return ProjectedView(df)
+
+
+class PandasDataSource(DataSource):
+    def __init__(self, dataset, columns=None):
+        self.dataset = dataset
+        self.projected_columns = columns
+        self.projection = (None, None)
+
+    # View of the projected columns of the current snapshot, built once per snapshot.
+    @property
+    def view(self):
+        snapshot = self.dataset.current()
+        projected_snapshot, view = self.projection
+        if projected_snapshot is not snapshot:
+            view = ProjectedView(snapshot.frame(self.projected_columns))
+            self.projection = (snapshot, view)
+        return view
+
+    @property
+    def df(self):
+        return self.view.df
+
+    @property
+    def columns(self):
+        return list(self.projected_columns or self.dataset.current().columns)
+
+    def project(self, columns):
+        return PandasDataSource(self.dataset, columns)
+
+    def aggregate(self, by, agg, start_date=None, end_date=None, filters=None):
+        view = self.view
+        if filters:
+            keys = [getattr(key, 'key', key) for key in (by if isinstance(by, list) else [by])]
+            columns = list(dict.fromkeys([DATE_COLUMN] + keys + list(agg)))
+            return aggregate(view.take(view.rows(filters=filters), columns), by, agg, start_date, end_date)
+        # The parallel mode partitions the stored columns of the latest snapshot once, for the views of every page.
+        snapshot = self.dataset.current()
+        if snapshot is self.dataset.snapshot and len(view) == len(snapshot.df):
+            return aggregate(view.df, by, agg, start_date, end_date, key=snapshot.version, frame=lambda: snapshot.df)
+        return aggregate(view.df, by, agg, start_date, end_date)
+
+    def select(self, columns=None, start_date=None, end_date=None, filters=None, order_by=None, search=None):
+        view = self.view
+        rows = view.rows(start_date, end_date, filters)
+        if search:
+            found = self.dataset.current().search_index.rows(search)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        df = view.take(rows, columns)
+        if order_by:
+            df = df.sort_values(order_by)
+        return df
+
+    # Rows appended to the view after the snapshot was published are not in its sample.
+    def estimate(self, by, agg, start_date=None, end_date=None, scale=True):
+        snapshot, view = self.dataset.current(), self.view
+        if not snapshot.previewable:
+            return None
+        keys = [getattr(key, 'key', key) for key in (by if isinstance(by, list) else [by])]
+        columns = list(dict.fromkeys([DATE_COLUMN] + keys + list(agg)))
+        sample = snapshot.sample
+        return sampling.estimate(sample, view.take(sample.positions, columns), by, agg, start_date, end_date, scale)
+
+    def distinct(self, column, filters=None):
+        view = self.view
+        return sorted(view.take(view.rows(filters=filters), [column])[column].dropna().unique())
+
+    def suggest(self, search, limit=10):
+        return self.dataset.current().search_index.suggest(search, limit)
+
+    def date_range(self, column=DATE_COLUMN):
+        return self.df[column].min(), self.df[column].max()
+
+    def contains(self, column, value):
+        return value in self.df[column].values
+
+    def append(self, row):
+        snapshot, view = self.dataset.current(), self.view
+        self.projection = (snapshot, view.append(row))
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def sql_timestamp(value):
+    return pd.Timestamp(value).strftime(SQL_TIMESTAMP_FORMAT)
+
+
+def insert_sql(table, columns):
+    return (f'INSERT INTO {table} ({", ".join(quote(c) for c in columns)}) '
+            f'VALUES ({", ".join("?" for _ in columns)})')
+
+
+# Connection knowing how many of the rows appended to its pool it holds.
+class PooledConnection(sqlite3.Connection):
+    appended_rows = 0
+
+
+class ConnectionPool:
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        # (columns, values) of the rows appended by this process. A forked child inherits them with the list.
+        self.appended = []
+        self.reset()
+
+    def reset(self):
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    # Published database files never change, so SQLite reads them without any locking.
+    def open(self):
+        uri = pathlib.Path(self.path).absolute().as_uri() + '?mode=ro&immutable=1'
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, factory=PooledConnection)
+
+    def append(self, columns, values):
+        self.appended.append((columns, values))
+
+    # Copy the rows appended since the last use into the temporary table of the connection.
+    def sync(self, connection):
+        rows = self.appended[connection.appended_rows:]
+        if not rows:
+            return
+        if not connection.appended_rows:
+            connection.execute(f'CREATE TEMP TABLE {APPENDED_TABLE} AS SELECT * FROM main.{quote(TABLE_NAME)} WHERE 0')
+        for columns, values in rows:
+            connection.execute(insert_sql(APPENDED_TABLE, columns), values)
+        connection.commit()
+        connection.appended_rows += len(rows)
+
+    # The given columns of the stored rows in rowid order. Database files are written in one go (see build_database),
+    # so the row at position i has rowid i + 1.
+    def read_columns(self, columns):
+        with self.connection() as connection:
+            return pd.read_sql_query(f'SELECT {", ".join(quote(c) for c in columns)} FROM main.{quote(TABLE_NAME)} '
+                                     f'ORDER BY rowid', connection)
+
+    # Connections are used within a fork_guard section: SQLite must not be forked in the middle of a call.
+    @contextmanager
+    def connection(self):
+        with scheduler.fork_guard.section():
+            with self.checked_out() as connection:
+                self.sync(connection)
+                yield connection
+
+    @contextmanager
+    def checked_out(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_open = self.created < self.size
+                if can_open:
+                    self.created += 1
+            connection = self.open() if can_open else self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+
+class SQLiteDataSource(DataSource):
+    def __init__(self, dataset, columns=None):
+        self.dataset = dataset
+        with self.pool.connection() as connection:
+            table_info = connection.execute(f'PRAGMA table_info({quote(TABLE_NAME)})').fetchall()
+        self.all_columns = [row[1] for row in table_info]
+        self.date_columns = {row[1] for row in table_info if row[2] == 'TIMESTAMP'}
+        self.projected_columns = columns or self.all_columns
+
+    # Pool of the database file of the current snapshot.
+    @property
+    def pool(self):
+        return self.dataset.current().pool
+
+    @property
+    def columns(self):
+        return list(self.projected_columns)
+
+    def project(self, columns):
+        return SQLiteDataSource(self.dataset, columns)
+
+    # The stored rows followed by the appended ones. Their rowid column keeps the order of insertion.
+    @property
+    def table(self):
+        if not self.pool.appended:
+            return quote(TABLE_NAME)
+        return (f'(SELECT rowid AS rowid, * FROM main.{quote(TABLE_NAME)} UNION ALL '
+                f'SELECT (SELECT MAX(rowid) FROM main.{quote(TABLE_NAME)}) + rowid, * FROM {APPENDED_TABLE})')
+
+    def where(self, start_date, end_date, filters, search=None):
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append(f'{quote(DATE_COLUMN)} >= ?')
+            params.append(sql_timestamp(start_date))
+        if end_date is not None:
+            conditions.append(f'{quote(DATE_COLUMN)} <= ?')
+            params.append(sql_timestamp(end_date))
+        for column, value in (filters or {}).items():
+            conditions.append(f'{quote(column)} = ?')
+            params.append(value)
+        # Rows found by the search index, which only holds the stored rows (see ConnectionPool.read_columns).
+        if search:
+            rows = self.dataset.current().search_index.rows(search)
+            conditions.append('rowid IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps((rows + 1).tolist()))
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def query(self, sql, params, date_columns=()):
+        with self.pool.connection() as connection:
+            df = pd.read_sql_query(sql, connection, params=params)
+        for column in date_columns:
+            df[column] = pd.to_datetime(df[column])
+        return df
+
+    def aggregate(self, by, agg, start_date=None, end_date=None, filters=None):
+        by = by if isinstance(by, list) else [by]
+        keys, select_parts, date_keys = [], [], []
+        for key in by:
+            if isinstance(key, pd.Grouper):
+                rule = key.freq.freqstr
+                if rule not in SQL_TIME_BUCKETS:
+                    raise ValueError(f'Time bucket {rule!r} is not supported by the SQLite backend')
+                name, expression = key.key, SQL_TIME_BUCKETS[rule].format(quote(key.key))
+                date_keys.append(name)
+            else:
+                name, expression = key, quote(key)
+                if key in self.date_columns:
+                    date_keys.append(name)
+            keys.append(name)
+            select_parts.append(f'{expression} AS {quote(name)}')
+        for column, function in agg.items():
+            select_parts.append(f'{SQL_FUNCTIONS[function]}({quote(column)}) AS {quote(column)}')
+
+        where, params = self.where(start_date, end_date, filters)
+        positions = ', '.join(str(i + 1) for i in range(len(keys)))
+        sql = f'SELECT {", ".join(select_parts)} FROM {self.table}{where} GROUP BY {positions} ORDER BY {positions}'
+        df = self.query(sql, params, date_keys).set_index(keys)
+        return complete_time_bins(df, by, agg)
+
+    def select(self, columns=None, start_date=None, end_date=None, filters=None, order_by=None, search=None):
+        columns = columns or self.projected_columns
+        where, params = self.where(start_date, end_date, filters, search)
+        # Sort missing values last, as pandas does; without order_by rows keep their insertion (Order Date) order.
+        order = ', '.join(f'{quote(c)} IS NULL, {quote(c)}' for c in order_by) if order_by else 'rowid'
+        sql = f'SELECT {", ".join(quote(c) for c in columns)} FROM {self.table}{where} ORDER BY {order}'
+        return self.query(sql, params, [c for c in columns if c in self.date_columns])
+
+    def distinct(self, column, filters=None):
+        where, params = self.where(None, None, filters)
+        condition = ' AND ' if where else ' WHERE '
+        sql = (f'SELECT DISTINCT {quote(column)} FROM {self.table}{where}{condition}{quote(column)} IS NOT NULL '
+               f'ORDER BY 1')
+        with self.pool.connection() as connection:
+            return [row[0] for row in connection.execute(sql, params)]
+
+    def suggest(self, search, limit=10):
+        return self.dataset.current().search_index.suggest(search, limit)
+
+    def date_range(self, column=DATE_COLUMN):
+        with self.pool.connection() as connection:
+            first, last = connection.execute(
+                f'SELECT MIN({quote(column)}), MAX({quote(column)}) FROM {self.table}').fetchone()
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def contains(self, column, value):
+        with self.pool.connection() as connection:
+            return connection.execute(
+                f'SELECT 1 FROM {self.table} WHERE {quote(column)} = ? LIMIT 1', [value]).fetchone() is not None
+
+    def sql_values(self, row):
+        values = []
+        for column, value in row.items():
+            if value is None or pd.isna(value):
+                values.append(None)
+            elif column in self.date_columns:
+                values.append(sql_timestamp(value))
+            else:
+                values.append(value.item() if hasattr(value, 'item') else value)
+        return values
+
+    def append(self, row):
+        self.pool.append(list(row), self.sql_values(row))
+
+
+# Write the dataset into a new SQLite database file, with indexes on the date and the filtered columns.
+def build_database(df, path, indexed_columns):
+    staging = f'{path}.staging'
+    if os.path.exists(staging):
+        os.remove(staging)
+    connection = sqlite3.connect(staging)
+    try:
+        df.to_sql(TABLE_NAME, connection, index=False)
+        for column in [DATE_COLUMN] + list(indexed_columns):
+            connection.execute(f'CREATE INDEX {quote("index " + column)} ON {quote(TABLE_NAME)} ({quote(column)})')
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(staging, path)
+
+
+# Remove the database files of older versions. The file of the version before keep stays, so processes that have not
+# reloaded yet can still open connections to it; connections that are open keep reading removed files.
+def remove_stale_databases(directory, keep):
+    paths = [os.path.join(directory, entry) for entry in os.listdir(directory)
+             if entry.endswith(DATABASE_SUFFIX) and entry != keep]
+    for path in sorted(paths, key=os.path.getmtime)[:-1]:
+        os.remove(path)
+
+
+# Pool of the database file of the given dataset version, building it from build() if no process has done so yet.
+def attach_or_build_database(directory, version, build, indexed_columns, pool_size):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, version + DATABASE_SUFFIX)
+    if not os.path.exists(path):
+        with open(os.path.join(directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(path):
+                    build_database(build(), path, indexed_columns)
+                    remove_stale_databases(directory, os.path.basename(path))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    return ConnectionPool(path, pool_size)
@@ -0,0 +1,102 @@
+# Chunked streaming ingest of order exports larger than memory.
+# The Orders CSV is read in chunks of config.INGEST_CHUNK_ROWS rows. Every chunk is joined with the (small) Returns
+# data, is processed by services.transform and is written as memory-mapped columnar parts
+# (services.shared_store format) partitioned by order month:
+#   <output>/partitions/<YYYY-MM>/part-<chunk>/
+#   <output>/daily_aggregates.csv
+# The daily aggregates are updated after every chunk, so peak memory depends on the chunk size, not the export size.
+# Their file is also the source file of an ingested dataset (see main.py), so an export without orders is an error.
+#
+# Usage: python -m services.ingest ORDERS_CSV RETURNS_FILE OUTPUT_DIR [--chunk-rows N]
+import argparse
+import os
+import shutil
+
+import pandas as pd
+
+import config
+from services import shared_store, transform
+
+PARTITIONS_DIR = 'partitions'
+DAILY_AGGREGATES_FILE = 'daily_aggregates.csv'
+DATE_COLUMNS = ['Order Date', 'Ship Date']
+# Running daily sums, means are derived from a sum and a count once all chunks are ingested.
+DAILY_SUMS = {'Sales': 'sum', 'Profit': 'sum', 'Quantity': 'sum', 'Returned': 'sum', 'Days to Ship': 'sum'}
+
+
+def read_returns(returns_path):
+    if returns_path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(returns_path, sheet_name='Returns')
+    return pd.read_csv(returns_path)
+
+
+def daily_partial(df_chunk):
+    df_chunk = transform.with_derived_columns(df_chunk, ['Days to Ship'])
+    df_daily = df_chunk.groupby('Order Date').agg(DAILY_SUMS)
+    df_daily['Rows'] = df_chunk.groupby('Order Date').size()
+    return df_daily
+
+
+def finish_daily(df_daily):
+    df_daily = df_daily.sort_index()
+    df_daily['Days to Ship'] = df_daily['Days to Ship'] / df_daily['Rows']
+    df_daily['Profit Ratio'] = df_daily['Profit'] / df_daily['Sales']
+    return df_daily
+
+
+def write_chunk(df_chunk, partitions_root, chunk_number):
+    for month, df_month in df_chunk.groupby(df_chunk['Order Date'].dt.strftime('%Y-%m')):
+        directory = os.path.join(partitions_root, month, f'part-{chunk_number:06d}')
+        shared_store.materialise(df_month.reset_index(drop=True), directory)
+
+
+def ingest(orders_path, returns_path, output_dir, chunk_rows=None):
+    chunk_rows = chunk_rows or config.INGEST_CHUNK_ROWS
+    df_returns_data = read_returns(returns_path)
+    partitions_root = os.path.join(output_dir, PARTITIONS_DIR)
+    if os.path.exists(partitions_root):
+        shutil.rmtree(partitions_root)
+    os.makedirs(partitions_root)
+
+    df_daily = None
+    rows = 0
+    # Exact float parsing, so values rounded to cents match the ones loaded from the workbook.
+    chunks = pd.read_csv(orders_path, chunksize=chunk_rows, parse_dates=DATE_COLUMNS, float_precision='round_trip',
+                         usecols=lambda x: x not in transform.DROPPED_COLUMNS)
+    for chunk_number, df_orders_chunk in enumerate(chunks):
+        if df_orders_chunk.empty:  # an export with only the header row
+            continue
+        df_chunk = transform.prepare_orders(df_orders_chunk, df_returns_data)
+        write_chunk(df_chunk, partitions_root, chunk_number)
+        partial = daily_partial(df_chunk)
+        df_daily = partial if df_daily is None else df_daily.add(partial, fill_value=0)
+        rows += len(df_chunk)
+
+    if df_daily is None:
+        raise ValueError(f'{orders_path} contains no orders')
+    finish_daily(df_daily).to_csv(os.path.join(output_dir, DAILY_AGGREGATES_FILE))
+    return rows
+
+
+# Attach the ingested parts of every month as one DataFrame.
+def read_partitions(output_dir):
+    partitions_root = os.path.join(output_dir, PARTITIONS_DIR)
+    parts = []
+    for month in sorted(os.listdir(partitions_root)):
+        for part in sorted(os.listdir(os.path.join(partitions_root, month))):
+            parts.append(shared_store.attach(os.path.join(partitions_root, month, part)))
+    return pd.concat(parts, ignore_index=True).sort_values(by='Order Date', kind='stable').reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stream a large Orders CSV export into partitioned columnar parts.')
+    parser.add_argument('orders', help='Orders CSV export')
+    parser.add_argument('returns', help='Returns CSV, or a workbook with a Returns sheet')
+    parser.add_argument('output', help='Output directory')
+    parser.add_argument('--chunk-rows', type=int, default=None, help='Rows read per chunk')
+    arguments = parser.parse_args()
+    try:
+        ingested = ingest(arguments.orders, arguments.returns, arguments.output, arguments.chunk_rows)
+    except ValueError as error:
+        parser.exit(1, f'{error}\n')
+    print(f'Ingested {ingested} rows into {arguments.output}')
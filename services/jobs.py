@@ -0,0 +1,84 @@
+# Job manager of the background callbacks (config.BACKGROUND_CALLBACKS).
+# Every job runs in its own process forked from the server and hands its result over through a disk cache (SQLite),
+# so superseded jobs of a session can be terminated. On top of Dash's DiskcacheManager:
+#   - jobs are started through the admission control of the server process (scheduler.job_slots), which bounds how
+#     many run at once;
+#   - every access of the server to the cache is a scheduler.fork_guard section, so no job is forked in the middle of
+#     a transaction of another thread. The child would inherit SQLite's in-process lock state, and its own writes would
+#     wait for a lock nobody releases until they fail with diskcache.Timeout;
+#   - writes to the cache, of the server and of the jobs alike, take turns on a lock file instead of retrying on
+#     SQLite's busy timeout, and a superseded job is only killed while it does not hold that lock, i.e. never in the
+#     middle of writing its result.
+import fcntl
+import os
+from contextlib import contextmanager
+
+import dash
+import diskcache
+
+from services import scheduler
+
+WRITE_LOCK_FILE = 'write.lock'
+
+
+class JobCache(diskcache.Cache):
+    @contextmanager
+    def write_lock(self):
+        with open(os.path.join(self.directory, WRITE_LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def set(self, *args, **kwargs):
+        with self.write_lock():
+            return super().set(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with self.write_lock():
+            return super().delete(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        with self.write_lock():
+            return super().touch(*args, **kwargs)
+
+
+class JobManager(dash.DiskcacheManager):
+    def __init__(self, directory):
+        super().__init__(JobCache(directory))
+
+    # Same as DiskcacheManager.call_job_fn, with the process started by the job slots.
+    def call_job_fn(self, key, job_fn, args, context):
+        from multiprocess import Process
+        process = Process(target=job_fn, args=(key, self._make_progress_key(key), args, context))
+        scheduler.job_slots.start(process)
+        return process.pid
+
+    # DiskcacheManager kills the job within a cache transaction, i.e. holding SQLite's write lock while it waits for
+    # the process to exit.
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self.handle.write_lock():
+            scheduler.job_slots.terminate(int(job))
+
+    # DiskcacheManager looks the process up with psutil, which fails if the job is reaped in between.
+    def job_running(self, job):
+        return scheduler.job_slots.running_job(int(job))
+
+    def clear_cache_entry(self, key):
+        with scheduler.fork_guard.section():
+            super().clear_cache_entry(key)
+
+    def get_progress(self, key):
+        with scheduler.fork_guard.section():
+            return super().get_progress(key)
+
+    def result_ready(self, key):
+        with scheduler.fork_guard.section():
+            return super().result_ready(key)
+
+    def get_result(self, key, job):
+        with scheduler.fork_guard.section():
+            return super().get_result(key, job)
@@ -0,0 +1,357 @@
+# Concurrent load replay against the Dash server.
+# Virtual users replay scenarios of user interactions the way the browser does: navigating to a page fires the page
+# callback and, once its layout arrives, the initial callbacks of the layout; setting component properties fires every
+# callback with one of them as input, in parallel, and the properties these callbacks update fire the next ones in turn.
+# The callbacks are taken from /_dash-dependencies and their inputs and state from the session's component values, so
+# the requests match the ones of the browser. Background callbacks
+# are polled until their result is ready and timed up to it.
+#   python -m services.loadtest [--url URL] [--users N] [--duration SECONDS | --iterations N] [--scenario NAME ...]
+#                               [--scenarios FILE] [--think SECONDS] [--poll-interval SECONDS] [--timeout SECONDS]
+#                               [--json FILE]
+# Without --url the app is imported and requests go to app.server in-process, each on its own thread as in a threaded
+# server; with --url they go over HTTP to a running server (e.g. gunicorn with the worker and thread settings to
+# validate). The report lists throughput and p50/p95/p99 latency per callback. Callbacks are named after their
+# function in-process and after their first output over HTTP.
+# A scenarios file is JSON of the same shape as SCENARIOS: name -> list of {"navigate": path} or {"set": {"id.prop":
+# value}} steps.
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+UPDATE_PATH = '/_dash-update-component'
+DEPENDENCIES_PATH = '/_dash-dependencies'
+
+SCENARIOS = {
+    # Landing page: the overview over every calendar year and the full range.
+    'landing': [
+        {'navigate': '/'},
+        {'set': {'date-range-picker.start_date': '2014-01-01', 'date-range-picker.end_date': '2014-12-31'}},
+        {'set': {'date-range-picker.start_date': '2015-01-01', 'date-range-picker.end_date': '2015-12-31'}},
+        {'set': {'date-range-picker.start_date': '2016-01-01', 'date-range-picker.end_date': '2016-12-31'}},
+        {'set': {'date-range-picker.start_date': '2014-01-01', 'date-range-picker.end_date': '2017-12-31'}},
+    ],
+    # Table page: narrowing the filters down to a city, more rows, clearing the filters, searching.
+    'table': [
+        {'navigate': '/pages/table'},
+        {'set': {'region.value': 'West'}},
+        {'set': {'state.value': 'California'}},
+        {'set': {'city.value': 'Los Angeles'}},
+        {'set': {'row-dropdown.value': 50}},
+        {'set': {'region.value': None, 'state.value': None, 'city.value': None}},
+        {'set': {'search.value': 'san'}},
+        {'set': {'search.value': 'san f'}},
+        {'set': {'search.value': ''}},
+    ],
+    # Graph page: every granularity, then choosing and swapping the bubble graph axes.
+    'graph': [
+        {'navigate': '/pages/graph'},
+        {'set': {'granularity-dropdown.value': 'W'}},
+        {'set': {'granularity-dropdown.value': 'ME'}},
+        {'set': {'granularity-dropdown.value': 'QE'}},
+        {'set': {'dropdown-1.value': 'Sales'}},
+        {'set': {'dropdown-2.value': 'Profit'}},
+        {'set': {'dropdown-3.value': 'Segment_Label'}},
+        {'set': {'dropdown-1.value': 'Profit', 'dropdown-2.value': 'Sales'}},
+        {'set': {'granularity-dropdown.value': 'YE'}},
+    ],
+}
+
+
+# Requests to app.server in the current process.
+class InProcessTransport:
+    def __init__(self):
+        import app
+        self.app = app.app
+        self.server = app.server
+
+    # Function name of every callback by output key, known once Dash has set up the callbacks on the first request.
+    def callback_names(self):
+        return {output: callback['callback'].__name__ for output, callback in self.app.callback_map.items()}
+
+    def get(self, path):
+        response = self.server.test_client().get(path)
+        return response.status_code, response.get_json(silent=True)
+
+    def post(self, path, body):
+        response = self.server.test_client().post(path, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+# Requests over HTTP to a running server, with one connection per thread.
+class HttpTransport:
+    def __init__(self, url):
+        import requests
+        self.requests = requests
+        self.url = url.rstrip('/')
+        self.local = threading.local()
+
+    def callback_names(self):
+        return {}
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = self.requests.Session()
+        return self.local.session
+
+    def get(self, path):
+        response = self.session().get(self.url + path)
+        return response.status_code, response.json() if response.content else None
+
+    def post(self, path, body):
+        response = self.session().post(self.url + path, json=body)
+        return response.status_code, response.json() if response.content else None
+
+
+def prop_id(item):
+    return f"{item['id']}.{item['property']}"
+
+
+# Outputs of a callback from its output key, '..a.children...b.figure..' for several outputs.
+def parse_outputs(output):
+    multi = output.startswith('..')
+    keys = output[2:-2].split('...') if multi else [output]
+    outputs = []
+    for key in keys:
+        component_id, _, prop = key.rpartition('.')
+        outputs.append({'id': component_id, 'property': prop})
+    return multi, outputs
+
+
+# Values of every component property in a serialised layout, by component id.
+def layout_values(node, values):
+    if isinstance(node, list):
+        for child in node:
+            layout_values(child, values)
+    elif isinstance(node, dict):
+        props = node.get('props') if 'type' in node and 'namespace' in node else None
+        if props is None:
+            for child in node.values():
+                layout_values(child, values)
+            return
+        if isinstance(props.get('id'), str):
+            values[props['id']] = {prop: value for prop, value in props.items() if prop != 'children'}
+        for value in props.values():
+            layout_values(value, values)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+        self.requests = 0
+
+    def add(self, name, outcome, seconds, requests):
+        with self.lock:
+            self.samples.append((name, outcome, seconds))
+            self.requests += requests
+
+
+# One browser session: the component values of the current page and the callbacks they trigger.
+class Session:
+    def __init__(self, transport, dependencies, names, app_values, recorder, poll_interval, timeout):
+        self.transport = transport
+        self.dependencies = dependencies
+        self.names = names
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.app_values = app_values
+        self.components = dict(app_values)
+        self.lock = threading.Lock()
+
+    def value(self, item):
+        return self.components.get(item['id'], {}).get(item['property'])
+
+    # Whether the browser would fire the callback: its inputs and state and at least one of its outputs are on the page.
+    def present(self, dependency):
+        return (all(item['id'] in self.components for item in dependency['inputs'] + dependency['state'])
+                and any(item['id'] in self.components for item in parse_outputs(dependency['output'])[1]))
+
+    def request_body(self, dependency, changed):
+        multi, outputs = parse_outputs(dependency['output'])
+        return {
+            'output': dependency['output'],
+            'outputs': outputs if multi else outputs[0],
+            'inputs': [{**item, 'value': self.value(item)} for item in dependency['inputs']],
+            'changedPropIds': [prop_id(item) for item in dependency['inputs'] if prop_id(item) in changed],
+            'state': [{**item, 'value': self.value(item)} for item in dependency['state']],
+        }
+
+    # Send a callback request, polling background callbacks until they finish or time out. Returns the response data.
+    def call(self, dependency, changed):
+        body = self.request_body(dependency, changed)
+        started = time.perf_counter()
+        status, data = self.transport.post(UPDATE_PATH, body)
+        requests = 1
+        outcome = None
+        if status == 200 and dependency.get('long') and data and 'job' in data:
+            poll_path = f"{UPDATE_PATH}?cacheKey={data['cacheKey']}&job={data['job']}"
+            while True:
+                if time.perf_counter() - started > self.timeout:
+                    outcome, data = 'timeout', None
+                    break
+                time.sleep(self.poll_interval)
+                status, data = self.transport.post(poll_path, body)
+                requests += 1
+                if status != 200 or (data and 'response' in data):
+                    break
+        seconds = time.perf_counter() - started
+        outcome = outcome or {200: 'ok', 204: 'prevented', 503: 'busy'}.get(status, 'error')
+        name = self.names.get(dependency['output']) or prop_id(parse_outputs(dependency['output'])[1][0])
+        self.recorder.add(name, outcome, seconds, requests)
+        return data if outcome == 'ok' else None
+
+    def apply(self, data):
+        for component_id, props in ((data or {}).get('response') or {}).items():
+            with self.lock:
+                self.components.setdefault(component_id, {}).update(props)
+
+    # Callbacks with one of the changed properties as input.
+    def triggered(self, changed):
+        return [d for d in self.dependencies if changed & {prop_id(i) for i in d['inputs']} and self.present(d)]
+
+    # Fire the given callbacks in parallel, like the browser does for independent callbacks, then the callbacks of
+    # the properties they updated, until no callback is left.
+    def fire(self, dependencies, changed):
+        results = []
+        while dependencies:
+            with ThreadPoolExecutor(len(dependencies)) as executor:
+                fired = list(executor.map(lambda dependency: self.call(dependency, changed), dependencies))
+            changed = set()
+            for data in fired:
+                self.apply(data)
+                for component_id, props in ((data or {}).get('response') or {}).items():
+                    changed.update(f'{component_id}.{prop}' for prop in props)
+            results.extend(fired)
+            dependencies = self.triggered(changed)
+        return results
+
+    def navigate(self, path):
+        self.components = {**self.app_values, 'url': {**self.app_values.get('url', {}), 'pathname': path}}
+        changed = {'url.pathname'}
+        before = set(self.components)
+        for data in self.fire(self.triggered(changed), changed):
+            page = {}
+            layout_values((data or {}).get('response'), page)
+            self.components.update(page)
+        # Initial callbacks of the new page.
+        added = set(self.components) - before
+        self.fire([d for d in self.dependencies if not d['prevent_initial_call'] and self.present(d)
+                   and any(item['id'] in added for item in d['inputs'])], set())
+
+    def set(self, values):
+        changed = set(values)
+        for key, value in values.items():
+            component_id, _, prop = key.rpartition('.')
+            self.components.setdefault(component_id, {})[prop] = value
+        self.fire(self.triggered(changed), changed)
+
+    def run(self, steps, think, deadline=None):
+        for step in steps:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            if 'navigate' in step:
+                self.navigate(step['navigate'])
+            else:
+                self.set(step['set'])
+            if think:
+                time.sleep(think)
+
+
+def run(transport, scenarios, users, duration, iterations, think, poll_interval, timeout):
+    # The first requests also make Dash set up its callbacks.
+    _, app_layout = transport.get('/_dash-layout')
+    app_values = {}
+    layout_values(app_layout, app_values)
+    _, dependencies = transport.get(DEPENDENCIES_PATH)
+    names = transport.callback_names()
+    recorder = Recorder()
+    order = list(scenarios)
+    deadline = time.perf_counter() + duration if duration else None
+
+    def user(number):
+        session = Session(transport, dependencies, names, app_values, recorder, poll_interval, timeout)
+        rng = random.Random(number)
+        completed = 0
+        while (deadline is None and completed < iterations) or (deadline and time.perf_counter() < deadline):
+            steps = scenarios[order[(number + completed) % len(order)]]
+            session.run(steps, think * rng.uniform(0.5, 1.5), deadline)
+            completed += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(number,), daemon=True) for number in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return report(recorder, time.perf_counter() - started, users)
+
+
+def report(recorder, seconds, users):
+    callbacks = {}
+    for name, outcome, latency in recorder.samples:
+        callbacks.setdefault(name, []).append((outcome, latency))
+    result = {'seconds': seconds, 'users': users, 'calls': len(recorder.samples), 'requests': recorder.requests,
+              'throughput': len(recorder.samples) / seconds, 'callbacks': {}}
+    for name, samples in sorted(callbacks.items()):
+        latencies = np.array([latency for _, latency in samples])
+        outcomes = [outcome for outcome, _ in samples]
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result['callbacks'][name] = {
+            'calls': len(samples), 'throughput': len(samples) / seconds,
+            'p50': p50, 'p95': p95, 'p99': p99, 'max': latencies.max(),
+            **{outcome: outcomes.count(outcome) for outcome in ('ok', 'prevented', 'busy', 'error', 'timeout')},
+        }
+    return result
+
+
+def print_report(result):
+    print(f"{result['users']} users, {result['seconds']:.1f} s: {result['calls']} callback calls "
+          f"({result['requests']} requests), {result['throughput']:.1f} calls/s")
+    print(f"{'callback':<28} {'calls':>6} {'calls/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'busy':>5} {'error':>5} {'timeout':>7}")
+    for name, stats in result['callbacks'].items():
+        print(f"{name:<28} {stats['calls']:>6} {stats['throughput']:>8.2f} {stats['p50'] * 1000:>9.1f} "
+              f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f} {stats['busy']:>5} {stats['error']:>5} "
+              f"{stats['timeout']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay concurrent user sessions against the dashboard.')
+    parser.add_argument('--url', help='server to load, e.g. http://localhost:8080 (default: app.server in-process)')
+    parser.add_argument('--users', type=int, default=8, help='concurrent sessions')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to replay the scenarios for')
+    parser.add_argument('--iterations', type=int, help='scenarios per user instead of a duration')
+    parser.add_argument('--scenario', nargs='+', help='scenarios to replay (default: all)')
+    parser.add_argument('--scenarios', help='JSON file with the scenarios to replay')
+    parser.add_argument('--think', type=float, default=0, help='mean pause between the steps of a user in seconds')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='poll interval of background callbacks')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for a background callback')
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    args = parser.parse_args()
+    scenarios = SCENARIOS
+    if args.scenarios:
+        with open(args.scenarios) as scenarios_file:
+            scenarios = json.load(scenarios_file)
+    if args.scenario:
+        unknown = set(args.scenario) - set(scenarios)
+        if unknown:
+            sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {name: scenarios[name] for name in args.scenario}
+    transport = HttpTransport(args.url) if args.url else InProcessTransport()
+    result = run(transport, scenarios, args.users, None if args.iterations else args.duration, args.iterations,
+                 args.think, args.poll_interval, args.timeout)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Memory accounting of the page data sources.
+# Every page reads its columns through a ProjectedView of the current dataset snapshot. For every page this reports the
+# bytes of its columns and how many of them are not mapped from the files of the snapshot's shared store
+# (services.shared_store), i.e. are held by this process instead of once per host.
+# Run `python -m services.memory` for the report; it exits with status 1 if any page duplicates dataset memory.
+# tests/test_memory.py runs the same check under pytest.
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# The arrays holding the values of a column (the codes of a categorical column).
+def column_buffers(series):
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        return [values.codes]
+    if isinstance(values, pd.arrays.NumpyExtensionArray) or values.dtype.kind in 'mM':
+        return [series.to_numpy()]
+    if isinstance(values, pd.api.extensions.ExtensionArray) and hasattr(values, '_data'):
+        return [values._data, values._mask]
+    return [np.asarray(values)]
+
+
+# Path of the file an array is a view of a memory map of, or None.
+def mapped_file(array):
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap) and array.filename:
+            return array.filename
+        array = array.base
+    return None
+
+
+# Bytes of the view's columns and the part of them not mapped from the files of the store directory.
+def account_view(view, store):
+    store = os.path.abspath(store) if store else None
+    total = duplicated = 0
+    for name in view.columns:
+        for buffer in column_buffers(view.column(name)):
+            total += buffer.nbytes
+            path = mapped_file(buffer)
+            if store is None or path is None or os.path.dirname(os.path.abspath(path)) != store:
+                duplicated += buffer.nbytes
+    return total, duplicated
+
+
+def page_report():
+    import config
+    from main import dataset
+    from pages import page_graph, page_landing, page_table
+    if config.DATA_BACKEND != 'pandas':
+        raise SystemExit('Memory accounting only applies to the pandas backend')
+    store = dataset.current().store
+    return {page.__name__: account_view(page.source.view, store)
+            for page in (page_landing, page_table, page_graph)}
+
+
+if __name__ == '__main__':
+    report = page_report()
+    for page, (total, duplicated) in report.items():
+        print(f'{page:<20} columns {total / 2 ** 20:8.2f} MiB   duplicated {duplicated / 2 ** 20:8.2f} MiB')
+    sys.exit(1 if any(duplicated for total, duplicated in report.values()) else 0)
@@ -0,0 +1,133 @@
+# On-demand profiling of callback requests.
+# With config.PROFILING on, a callback request is run under cProfile when it carries the X-Profile header or the
+# profile=1 query flag. The flag may also be on the page URL (e.g. /pages/graph?profile=1): the browser sends that URL
+# as Referer of the callback requests. Each profile is written to config.PROFILE_DIR as <time>-<callback>.prof
+# (pstats format, for `python -m pstats` or snakeviz) next to a .json file with the callback, its inputs and the
+# duration. The oldest profiles are removed once the directory holds more than config.PROFILE_DIR_MAX_BYTES.
+# Heavy callbacks run on a worker thread of the bounded pool (services.scheduler), which is profiled as well and
+# merged into the request's profile. Background callbacks run in a job process, so only starting the job is profiled.
+# With config.PROFILING off no hook is installed and requests pay nothing.
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+import flask
+
+import config
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_FLAG = 'profile'
+FLAG_VALUES = ('1', 'true', 'yes', 'on')
+
+# Profiles of the worker threads of the request being profiled.
+thread_profiles = contextvars.ContextVar('thread_profiles', default=None)
+write_lock = threading.Lock()
+
+
+def flag_set(value):
+    return value is not None and value.strip().lower() in FLAG_VALUES
+
+
+def requested(request):
+    if flag_set(request.headers.get(PROFILE_HEADER)) or flag_set(request.args.get(PROFILE_FLAG)):
+        return True
+    referrer_flags = parse_qs(urlparse(request.referrer or '').query).get(PROFILE_FLAG, [])
+    return any(flag_set(value) for value in referrer_flags)
+
+
+# Profile the current (worker) thread too when it runs for a profiled request.
+@contextmanager
+def profile_thread():
+    profiles = thread_profiles.get()
+    if profiles is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profiles.append(profile)
+
+
+# Remove the oldest profiles (.prof and .json file together) until the directory fits in max_bytes.
+def rotate(directory, max_bytes):
+    files = {}
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            files.setdefault(os.path.splitext(entry.path)[0], []).append((entry.path, entry.stat()))
+    profiles = sorted((min(stat.st_mtime for _, stat in group), sum(stat.st_size for _, stat in group),
+                       [path for path, _ in group]) for group in files.values())
+    total = sum(size for _, size, _ in profiles)
+    for _, size, paths in profiles:
+        if total <= max_bytes:
+            break
+        for path in paths:
+            os.remove(path)
+        total -= size
+
+
+def write_profile(profile, profiles, tags):
+    stats = pstats.Stats(profile)
+    for thread_profile in profiles:
+        stats.add(thread_profile)
+    name = '{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), re.sub(r'[^\w.-]+', '_', tags['callback']))
+    with write_lock:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(config.PROFILE_DIR, name)
+        suffix = 0
+        while os.path.exists(f'{base}.prof'):
+            suffix += 1
+            base = os.path.join(config.PROFILE_DIR, f'{name}-{suffix}')
+        stats.dump_stats(f'{base}.prof')
+        with open(f'{base}.json', 'w') as output:
+            json.dump(tags, output, indent=2, default=str)
+        rotate(config.PROFILE_DIR, config.PROFILE_DIR_MAX_BYTES)
+    return f'{base}.prof'
+
+
+def instrument(app):
+    if not config.PROFILING:
+        return
+    path = app.config.routes_pathname_prefix + '_dash-update-component'
+
+    @app.server.before_request
+    def start_profile():
+        request = flask.request
+        if request.path != path or not requested(request):
+            return
+        flask.g.profile = (cProfile.Profile(), thread_profiles.set([]), time.perf_counter())
+        flask.g.profile[0].enable()
+
+    @app.server.after_request
+    def stop_profile(response):
+        profiling = flask.g.pop('profile', None)
+        if profiling is None:
+            return response
+        profile, token, started = profiling
+        profile.disable()
+        seconds = time.perf_counter() - started
+        profiles = thread_profiles.get()
+        thread_profiles.reset(token)
+        body = flask.request.get_json(silent=True) or {}
+        callback = app.callback_map.get(body.get('output'), {}).get('callback')
+        tags = {
+            'callback': getattr(callback, '__name__', 'unknown'),
+            'output': body.get('output'),
+            'inputs': body.get('inputs'),
+            'state': body.get('state'),
+            'job': flask.request.args.get('job'),
+            'status': response.status_code,
+            'seconds': seconds,
+            'pid': os.getpid(),
+        }
+        response.headers['X-Profile-File'] = os.path.basename(write_profile(profile, profiles, tags))
+        return response
@@ -0,0 +1,84 @@
+# Hot reload of the dataset when its source changes.
+# A SourceWatcher polls the source file and calls main.refresh_dataset() when its version (mtime and size) changes.
+# Rows are matched on their 'Row ID'. When the source only gained rows of new Row IDs with later order dates, they
+# are appended to the dataset; when rows were edited or removed (including a changed Returns sheet) or late orders
+# arrived, the dataset is replaced by the rows of the source. The new dataset is published as a new snapshot in one
+# assignment, while callbacks that are already running keep the snapshot they pinned (see Dataset.pinned).
+# Appended rows extend the derived columns, search index, preview sample and aggregation partitions of the previous
+# snapshot. The shared store and the cached callback results belong to one version and are written again.
+import os
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+
+def file_version(path):
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+
+ROW_ID_COLUMN = 'Row ID'
+
+
+# Whether two columns hold the same values in the same order, missing values included. Text columns may be
+# categorical in one frame and plain text in the other.
+def same_values(left, right):
+    left, right = left.to_numpy(), right.to_numpy()
+    return bool(((left == right) | (pd.isna(left) & pd.isna(right))).all())
+
+
+# Apply df_source, the processed rows of the changed source, to the dataset. Returns the new dataset and the rows
+# appended to df_main, or None for the appended rows when the dataset is replaced by df_source.
+def apply_increment(df_main, df_source):
+    row_ids = df_source[ROW_ID_COLUMN]
+    is_new = ~row_ids.isin(df_main[ROW_ID_COLUMN]).to_numpy()
+    df_new_rows = df_source[is_new]
+    if len(df_source) - len(df_new_rows) != len(df_main) or not row_ids.is_unique:  # rows were removed
+        return df_source, None
+    df_known = df_source[~is_new].set_index(ROW_ID_COLUMN).loc[df_main[ROW_ID_COLUMN].to_numpy()]
+    if not all(same_values(df_main[column], df_known[column]) for column in df_known.columns):  # rows were edited
+        return df_source, None
+    if df_new_rows.empty:
+        return df_main, df_new_rows
+    # Appending late orders would break the order of the rows by 'Order Date'.
+    if not df_main.empty and df_new_rows['Order Date'].min() < df_main['Order Date'].max():
+        return df_source, None
+    df_new_rows = df_new_rows[df_main.columns].reset_index(drop=True)
+    return pd.concat([df_main, df_new_rows], ignore_index=True), df_new_rows
+
+
+class SourceWatcher(threading.Thread):
+    def __init__(self, path, interval, on_change, version=None):
+        super().__init__(name='source-watcher', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self.version = version or file_version(path)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                version = file_version(self.path)
+            except OSError:
+                # The source is being replaced, check again on the next tick.
+                continue
+            if version != self.version:
+                # Wait until the writer is done, i.e. the version is stable for one more tick.
+                time.sleep(min(self.interval, 1))
+                try:
+                    if file_version(self.path) != version:
+                        continue
+                except OSError:
+                    continue
+                try:
+                    self.on_change()
+                except Exception:  # a broken source must not stop the watcher; the reload is retried next tick
+                    traceback.print_exc()
+                    continue
+                self.version = version
+
+    def stop(self):
+        self.stopped.set()
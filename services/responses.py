@@ -0,0 +1,92 @@
+# Compression and HTTP caching of the server's responses, so fewer bytes cross slow client links.
+# - Callback, layout, page and static responses of a compressible type and at least config.COMPRESSION_MIN_BYTES are
+#   gzipped when the client accepts it. Callback responses are compressed per request at config.COMPRESSION_LEVEL;
+#   static and layout bodies are compressed once at the highest level and kept by ETag or fingerprinted URL.
+# - Layout responses (the page HTML, /_dash-layout and /_dash-dependencies) get an ETag of their content and
+#   'no-cache', so the browser revalidates them and gets 304 Not Modified while they are unchanged.
+# - Assets carry Dash's modification stamp (?m=...) in their URL, so they are cached for config.STATIC_MAX_AGE.
+#   Dash already serves its fingerprinted component suites the same way.
+# - A gzipped response gets its own ETag (suffix -gzip), and conditional GETs are answered with 304 for either encoding.
+# Flask-Compress (Dash's compress=True) is not among the dependencies; gzip from the standard library does the work.
+import gzip
+import threading
+from collections import OrderedDict
+
+import flask
+
+import config
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+LAYOUT_PATHS = ('_dash-layout', '_dash-dependencies')
+SUITES_PATH = '_dash-component-suites/'
+# Compressed static and layout bodies kept by ETag or URL, and their compression level.
+MAX_CACHED_BODIES = 64
+CACHED_COMPRESSION_LEVEL = 9
+
+compressed_bodies = OrderedDict()
+compressed_bodies_lock = threading.Lock()
+
+
+def compressible(response):
+    return (response.status_code == 200 and not response.is_streamed and 'Content-Encoding' not in response.headers
+            and response.mimetype.startswith(COMPRESSIBLE_TYPES))
+
+
+def compress(body, key):
+    if key is None:
+        return gzip.compress(body, config.COMPRESSION_LEVEL)
+    with compressed_bodies_lock:
+        if key in compressed_bodies:
+            compressed_bodies.move_to_end(key)
+            return compressed_bodies[key]
+    compressed = gzip.compress(body, CACHED_COMPRESSION_LEVEL)
+    with compressed_bodies_lock:
+        compressed_bodies[key] = compressed
+        while len(compressed_bodies) > MAX_CACHED_BODIES:
+            compressed_bodies.popitem(last=False)
+    return compressed
+
+
+def instrument(app):
+    prefix = app.config.routes_pathname_prefix
+    assets_prefix = prefix + app.config.assets_url_path.strip('/') + '/'
+    static_prefixes = (assets_prefix, prefix + SUITES_PATH)
+    layout_paths = {prefix + path for path in LAYOUT_PATHS}
+
+    @app.server.after_request
+    def finish_response(response):
+        request = flask.request
+        if response.status_code != 200:
+            return response
+        if response.direct_passthrough:
+            # Files are sent as a passthrough stream; read them into the response to hash or compress them.
+            response.direct_passthrough = False
+            response.make_sequence()
+        if request.method in ('GET', 'HEAD'):
+            if request.path.startswith(assets_prefix) and 'm' in request.args:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = config.STATIC_MAX_AGE
+            elif request.path in layout_paths or response.mimetype == 'text/html':
+                response.add_etag()
+                response.cache_control.no_cache = True
+
+        encode = False
+        if compressible(response):
+            response.vary.add('Accept-Encoding')
+            encode = (config.COMPRESSION_MIN_BYTES > 0 and 'gzip' in request.accept_encodings
+                      and response.calculate_content_length() >= config.COMPRESSION_MIN_BYTES)
+        etag, weak = response.get_etag()
+        if etag is not None and encode:
+            etag = f'{etag}-gzip'
+            response.set_etag(etag, weak)
+        if etag is not None and request.method in ('GET', 'HEAD') and request.if_none_match.contains_weak(etag):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Length', None)
+            return response
+        if encode:
+            static = request.method in ('GET', 'HEAD') and request.path.startswith(static_prefixes)
+            response.set_data(compress(response.get_data(), etag or (request.full_path if static else None)))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,65 @@
+# In-memory cache of callback results.
+# Results are kept per callback, dataset version and normalised inputs (the key of services.singleflight), up to
+# config.RESULT_CACHE_ENTRIES of them; the least recently used ones are dropped first, and the results of older versions
+# when a reload publishes a new one. Only callbacks with results of a bounded size are cached: the overview cards and
+# the timeline graph, whose patches grow with the number of time bins, not rows. Rows appended from the table page have
+# no Order Date, so they never change these date filtered results.
+# Cached results are shared by every request and must not be changed. Background callback jobs run in processes forked
+# from the server, so they read the results cached before they started; results they compute are not kept.
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import config
+import main
+from services.callback_metrics import record_cache_lookup
+from services.singleflight import make_key
+
+results = OrderedDict()
+results_lock = threading.Lock()
+
+
+# The lock may be held by a thread of the parent when a background job is forked.
+def reset_in_child():
+    global results_lock
+    results_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_in_child)
+
+
+def contains(func, *args, **kwargs):
+    with results_lock:
+        return make_key(func, args, kwargs) in results
+
+
+def cached(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if config.RESULT_CACHE_ENTRIES <= 0:
+            return func(*args, **kwargs)
+        key = make_key(func, args, kwargs)
+        with results_lock:
+            hit = key in results
+            if hit:
+                results.move_to_end(key)
+                result = results[key]
+        record_cache_lookup(func.__name__, 'result', hit)
+        if hit:
+            return result
+        result = func(*args, **kwargs)
+        with results_lock:
+            results[key] = result
+            while len(results) > config.RESULT_CACHE_ENTRIES:
+                results.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+@main.dataset.subscribe
+def drop_previous_versions(previous, snapshot, appended):
+    with results_lock:
+        for key in [key for key in results if key[2] != snapshot.version]:
+            del results[key]
@@ -0,0 +1,119 @@
+# Stratified samples of the dataset for approximate previews of the graph aggregations (see pages/page_graph.py).
+# Rows are stratified by month of 'Order Date' and drawn without replacement, the same fraction in every month but at
+# least MIN_STRATUM_ROWS rows, so every time bin of a preview is estimated from its own months.
+# With N_h rows in month h and n_h of them sampled, a sum over a group is estimated as the sum of value * N_h / n_h
+# over its sampled rows and a mean as the mean of its sampled rows weighted the same way. The error bound of an
+# estimated sum is the half width of its 95% confidence interval, 1.96 * sqrt(sum_h N_h^2 (1 - n_h / N_h) s_h^2 / n_h),
+# where s_h^2 is the sample variance in month h of the value restricted to the group (0 outside of it).
+# Rows appended to the dataset by a reload are drawn as strata of their own, by month, and the strata drawn before are
+# kept. The estimators hold for any strata, so a month split in two strata is estimated exactly like other ones.
+import copy
+
+import numpy as np
+import pandas as pd
+
+from services.aggregation import complete_time_bins, filter_dates
+
+Z_95 = 1.96
+MIN_STRATUM_ROWS = 30
+STRATUM_COLUMN = '__stratum'
+WEIGHT_COLUMN = '__weight'
+
+
+class StratifiedSample:
+    def __init__(self, dates, rows, seed=0):
+        self.rows = rows
+        self.seed = seed
+        self.population = 0
+        self.stratum_rows = np.zeros(0, dtype=np.int64)
+        self.sample_rows = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.strata = np.zeros(0, dtype=np.int64)
+        self.draw(dates)
+
+    # Draw the rows of dates, which follow the population, as new strata.
+    def draw(self, dates):
+        population = self.population + len(dates)
+        months = dates.dt.year.to_numpy() * 12 + dates.dt.month.to_numpy()
+        _, strata = np.unique(months, return_inverse=True)
+        stratum_rows = np.bincount(strata)
+        fraction = min(1.0, self.rows / max(population, 1))
+        sample_rows = np.minimum(stratum_rows, np.maximum(np.ceil(stratum_rows * fraction).astype(int),
+                                                          MIN_STRATUM_ROWS))
+        # Rows grouped by month in random order; the first n_h rows of every month are sampled.
+        random = np.random.default_rng(self.seed + len(self.stratum_rows)).random(len(dates))
+        order = np.lexsort((random, strata))
+        first_rows = np.repeat(np.cumsum(stratum_rows) - stratum_rows, stratum_rows)
+        rank = np.arange(len(dates)) - first_rows
+        positions = np.sort(order[rank < np.repeat(sample_rows, stratum_rows)])
+        self.strata = np.concatenate([self.strata, strata[positions] + len(self.stratum_rows)])
+        self.stratum_rows = np.concatenate([self.stratum_rows, stratum_rows])
+        self.sample_rows = np.concatenate([self.sample_rows, sample_rows])
+        self.positions = np.concatenate([self.positions, positions + self.population])
+        self.population = population
+        self.weights = (self.stratum_rows / self.sample_rows)[self.strata]
+
+    # Sample of the population followed by the rows of dates.
+    def extended(self, dates):
+        sample = copy.copy(self)
+        sample.draw(dates)
+        return sample
+
+    @property
+    def fraction(self):
+        return len(self.positions) / max(self.population, 1)
+
+
+# Estimated values and error bounds of the sums of an aggregation, computed from a sample of a fraction of the rows.
+class Estimate:
+    def __init__(self, values, bounds, fraction):
+        self.values = values
+        self.bounds = bounds
+        self.fraction = fraction
+
+
+# Estimate the aggregation of the full data from df_sample, the sampled rows of the sample in order. With scale=False
+# the sampled rows are aggregated as they are, e.g. to plot a sample of the groups, and no bounds are given.
+def estimate(sample, df_sample, by, agg, start_date=None, end_date=None, scale=True):
+    by = by if isinstance(by, list) else [by]
+    if not scale:
+        values = filter_dates(df_sample, start_date, end_date).groupby(by, observed=True).agg(agg)
+        return Estimate(complete_time_bins(values, by, agg), None, sample.fraction)
+
+    df = filter_dates(df_sample.assign(**{STRATUM_COLUMN: sample.strata, WEIGHT_COLUMN: sample.weights}),
+                      start_date, end_date)
+    weight = df[WEIGHT_COLUMN].to_numpy()
+    sum_columns = [column for column, function in agg.items() if function == 'sum']
+    derived = {}
+    for column in agg:
+        derived[f'{column}__weighted'] = df[column].to_numpy(dtype=float) * weight
+    for column in sum_columns:
+        derived[f'{column}__squared'] = df[column].to_numpy(dtype=float) ** 2
+    df = df.assign(**derived)
+
+    # One pass over the groups and months; the sums per group are rolled up from the sums per group and month.
+    per_stratum = df.groupby(by + [STRATUM_COLUMN], observed=True)[
+        list(derived) + [WEIGHT_COLUMN] + sum_columns].sum()
+    groups = list(range(len(by)))
+    sums = per_stratum.groupby(level=groups).sum()
+    values = pd.DataFrame(index=sums.index)
+    for column, function in agg.items():
+        if function == 'sum':
+            values[column] = sums[f'{column}__weighted']
+        elif function == 'mean':
+            values[column] = sums[f'{column}__weighted'] / sums[WEIGHT_COLUMN]
+        elif function == 'count':
+            values[column] = sums[WEIGHT_COLUMN]
+        else:
+            raise ValueError(f'Aggregation function {function!r} cannot be estimated from a sample')
+
+    # Variance of every estimated sum, from the sums and sums of squares per group and month.
+    strata = per_stratum.index.get_level_values(STRATUM_COLUMN).to_numpy()
+    n, big_n = sample.sample_rows[strata].astype(float), sample.stratum_rows[strata].astype(float)
+    factor = np.where(n > 1, big_n ** 2 * (1 - n / big_n) / n / np.maximum(n - 1, 1), 0)
+    variances = pd.DataFrame({
+        column: factor * (per_stratum[f'{column}__squared'] - per_stratum[column] ** 2 / n)
+        for column in sum_columns}, index=per_stratum.index)
+    bounds = Z_95 * np.sqrt(variances.groupby(level=groups).sum().clip(lower=0))
+    return Estimate(complete_time_bins(values, by, agg),
+                    complete_time_bins(bounds, by, {column: 'sum' for column in sum_columns}), sample.fraction)
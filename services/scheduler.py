@@ -0,0 +1,271 @@
+# Admission control for callbacks.
+# Callbacks are classified as cheap or heavy (config.HEAVY_CALLBACKS). Cheap callbacks run inline on the request
+# thread. Heavy callbacks run in a bounded worker pool; when more than config.HEAVY_QUEUE_DEPTH of them are waiting
+# for a worker, new ones are rejected right away with ServerBusy, which app.py turns into a 503 response.
+# The pool only covers callbacks running in the server process. Background callbacks (config.BACKGROUND_CALLBACKS) run
+# as job processes, each with a pool of its own, so they are admitted by JobSlots when the server starts their job:
+# at most config.HEAVY_POOL_WORKERS jobs run at once and up to config.HEAVY_QUEUE_DEPTH wait for one to finish.
+# Callbacks called by background work (see services.warmup) run inline on its thread and are not counted as traffic;
+# background work checks traffic_idle() to keep out of the way of real requests.
+# Job processes are forked from the threaded server. A child inherits the memory of every thread, including locks they
+# hold and SQLite's in-process lock state, but not the threads that would release them. So jobs are only forked while
+# no thread is inside a fork_guard section (SQLite access, see services.jobs and services.datasource), and the modules
+# whose locks a job uses replace them in the child (os.register_at_fork).
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from multiprocessing.connection import wait as wait_for_ready
+
+import config
+from services import metrics, profiling
+
+queue_wait_seconds = metrics.histogram(
+    'dashboard_callback_queue_wait_seconds', 'Time heavy callbacks waited for a worker of the bounded pool.')
+execution_seconds = metrics.histogram(
+    'dashboard_callback_execution_seconds', 'Time spent executing callbacks, by admission class.')
+rejected_total = metrics.counter(
+    'dashboard_callback_rejected_total', 'Heavy callbacks rejected because the queue was full.')
+queue_depth = metrics.gauge(
+    'dashboard_callback_queue_depth', 'Heavy callbacks currently waiting for a worker.')
+
+
+# Metrics label of background callback jobs, admitted by JobSlots.
+BACKGROUND_JOB = 'background_job'
+# Seconds between checks whether a running job process finished, while jobs wait for a slot.
+JOB_POLL_SECONDS = 0.05
+
+# Set while background work calls callbacks.
+background_work = contextvars.ContextVar('background_work', default=False)
+# Callbacks of real requests running now and when the last one finished.
+running_callbacks = 0
+last_callback_finished = 0.0
+traffic_lock = threading.Lock()
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class HeavyPool:
+    def __init__(self, workers, max_queued):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='heavy-callback')
+        self.max_queued = max_queued
+        self.queued = 0
+        self.lock = threading.Lock()
+
+    def run(self, name, func, *args, **kwargs):
+        with self.lock:
+            if self.queued >= self.max_queued:
+                rejected_total.inc(callback=name)
+                raise ServerBusy(f'{name} rejected, {self.queued} heavy callbacks are already queued')
+            self.queued += 1
+            queue_depth.set(self.queued)
+        submitted = time.perf_counter()
+
+        def task():
+            with self.lock:
+                self.queued -= 1
+                queue_depth.set(self.queued)
+            started = time.perf_counter()
+            queue_wait_seconds.observe(started - submitted, callback=name)
+            try:
+                with profiling.profile_thread():
+                    return func(*args, **kwargs)
+            finally:
+                execution_seconds.observe(time.perf_counter() - started, callback=name, admission='heavy')
+
+        # Carry the callback context (dash.ctx) over to the worker thread.
+        return self.executor.submit(contextvars.copy_context().run, task).result()
+
+
+# Sections of any number of threads, and forks that wait until no section runs and hold new ones back meanwhile.
+# Sections may be nested within a thread.
+class ForkGuard:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.condition = threading.Condition()
+        self.sections = 0
+        self.forking = 0
+        self.local = threading.local()
+
+    @contextmanager
+    def section(self):
+        depth = getattr(self.local, 'depth', 0)
+        if not depth:
+            with self.condition:
+                while self.forking:
+                    self.condition.wait()
+                self.sections += 1
+        self.local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            if not depth:
+                with self.condition:
+                    self.sections -= 1
+                    self.condition.notify_all()
+
+    # Fork within the block. The condition stays locked until it ends, so no section can start.
+    @contextmanager
+    def fork(self):
+        with self.condition:
+            self.forking += 1
+            try:
+                while self.sections:
+                    self.condition.wait()
+                yield
+            finally:
+                self.forking -= 1
+                self.condition.notify_all()
+
+
+fork_guard = ForkGuard()
+# The condition of the guard is locked while a child is forked.
+os.register_at_fork(after_in_child=fork_guard.reset)
+
+
+class JobSlots:
+    def __init__(self, workers, max_queued):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.running = {}
+        # Slots taken by jobs being forked, which are not running yet.
+        self.starting = 0
+        self.queued = 0
+        self.condition = threading.Condition()
+
+    # Forget the job processes that finished. A job reaped outside of its Process object (e.g. by psutil) would stay
+    # alive for Process.is_alive(); the sentinel of a process becomes ready when it exits. Called with the condition
+    # held.
+    def reap(self):
+        finished = set(wait_for_ready([process.sentinel for process in self.running], timeout=0))
+        for process, started in list(self.running.items()):
+            if process.sentinel in finished:
+                del self.running[process]
+                execution_seconds.observe(time.perf_counter() - started, callback=BACKGROUND_JOB, admission='heavy')
+
+    def busy(self):
+        return len(self.running) + self.starting >= self.workers
+
+    # Start the job process once fewer than workers jobs are running. It is forked outside of the condition, as
+    # terminate() may be called within a fork_guard section.
+    def start(self, process):
+        submitted = time.perf_counter()
+        with self.condition:
+            self.reap()
+            if self.busy():
+                if self.queued >= self.max_queued:
+                    rejected_total.inc(callback=BACKGROUND_JOB)
+                    raise ServerBusy(f'Background job rejected, {self.queued} jobs are already queued')
+                self.queued += 1
+                queue_depth.set(self.queued, pool='jobs')
+                try:
+                    while self.busy():
+                        self.condition.wait(JOB_POLL_SECONDS)
+                        self.reap()
+                finally:
+                    self.queued -= 1
+                    queue_depth.set(self.queued, pool='jobs')
+            queue_wait_seconds.observe(time.perf_counter() - submitted, callback=BACKGROUND_JOB)
+            self.starting += 1
+        try:
+            with fork_guard.fork():
+                process.start()
+        finally:
+            with self.condition:
+                self.starting -= 1
+                if process.pid is not None:
+                    self.running[process] = time.perf_counter()
+
+    def running_job(self, pid):
+        with self.condition:
+            self.reap()
+            return any(process.pid == pid for process in self.running)
+
+    # Kill a job process and its children (e.g. the workers of the parallel aggregation mode). Only processes started
+    # here are killed, so a process ID reused after a job exited never is.
+    def terminate(self, pid):
+        import psutil
+        with self.condition:
+            process = next((process for process in self.running if process.pid == pid), None)
+        if process is None:
+            return
+        try:
+            children = psutil.Process(pid).children(recursive=True)
+        except psutil.NoSuchProcess:
+            children = []
+        for child in children:
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        process.kill()
+
+
+heavy_pool = None
+heavy_pool_lock = threading.Lock()
+job_slots = JobSlots(config.HEAVY_POOL_WORKERS, config.HEAVY_QUEUE_DEPTH)
+
+
+def get_heavy_pool():
+    global heavy_pool
+    with heavy_pool_lock:
+        if heavy_pool is None:
+            heavy_pool = HeavyPool(config.HEAVY_POOL_WORKERS, config.HEAVY_QUEUE_DEPTH)
+        return heavy_pool
+
+
+# Worker threads do not survive a fork (background callback jobs, gunicorn workers), so a child starts a fresh pool.
+def reset_heavy_pool():
+    global heavy_pool, heavy_pool_lock, traffic_lock
+    heavy_pool, heavy_pool_lock, traffic_lock = None, threading.Lock(), threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_heavy_pool)
+
+
+def is_heavy(name):
+    return name in config.HEAVY_CALLBACKS
+
+
+# Whether no callback of a real request is running or finished within the last idle_seconds.
+def traffic_idle(idle_seconds):
+    with traffic_lock:
+        return running_callbacks == 0 and time.monotonic() - last_callback_finished >= idle_seconds
+
+
+def admitted(name, func, *args, **kwargs):
+    if is_heavy(name):
+        return get_heavy_pool().run(name, func, *args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        execution_seconds.observe(time.perf_counter() - started, callback=name, admission='cheap')
+
+
+def admission_controlled(func):
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global running_callbacks, last_callback_finished
+        if background_work.get():
+            return func(*args, **kwargs)
+        with traffic_lock:
+            running_callbacks += 1
+        try:
+            return admitted(name, func, *args, **kwargs)
+        finally:
+            with traffic_lock:
+                running_callbacks -= 1
+                last_callback_finished = time.monotonic()
+
+    return wrapper
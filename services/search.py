@@ -0,0 +1,129 @@
+# Prefix search over the high-cardinality text columns of the dataset.
+# A value matches a search text when the value or one of its words starts with the text, ignoring case: 'los' and
+# 'ang' both match 'Los Angeles'. Per column the index holds the distinct values, the row positions of every value
+# grouped by value (posting lists) and the sorted lowercase words of the values. A search is two binary searches over
+# the words plus gathering the posting lists of the matching values, so it costs the number of matches, not the number
+# of rows. The index belongs to one Snapshot (services.datasource); rows appended to a view later are not indexed.
+# Rows appended to the dataset by a reload extend a copy of the index of the previous snapshot.
+import copy
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = ['City', 'State', 'Product Name', 'Customer Name']
+# Sorts after every character, so text + LAST_CHARACTER bounds the words starting with text.
+LAST_CHARACTER = '\U0010ffff'
+
+
+def normalise(text):
+    return text.strip().casefold()
+
+
+# Lowercase words of the values, each with the code of its value.
+def value_words(values, codes):
+    words, word_values = [], []
+    for code, value in zip(codes, values):
+        text = normalise(str(value))
+        starts = [0] + [i + 1 for i, character in enumerate(text) if character == ' ' and i + 1 < len(text)]
+        for start in starts:
+            words.append(text[start:])
+            word_values.append(code)
+    return words, word_values
+
+
+class ColumnIndex:
+    def __init__(self, series):
+        codes, values = pd.factorize(series, sort=True)
+        self.values = np.asarray(values, dtype=object)
+        index_dtype = np.int32 if len(series) < 2 ** 31 else np.int64
+        # Row positions ordered by value; the rows of value i are positions[offsets[i]:offsets[i + 1]].
+        self.positions = np.argsort(codes, kind='stable').astype(index_dtype)
+        self.counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        # Rows without a value (code -1) come first.
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)]).astype(index_dtype) + int((codes < 0).sum())
+        words, word_values = value_words(self.values, range(len(self.values)))
+        order = np.argsort(np.array(words, dtype=str), kind='stable')
+        self.words = np.array(words, dtype=str)[order]
+        self.word_values = np.array(word_values, dtype=index_dtype)[order]
+
+    # Index of the rows of this one followed by the rows of series, the first of them at position first_row. The
+    # rows of a value stay grouped, the appended ones after the known ones.
+    def appended(self, series, first_row):
+        codes, values = pd.factorize(series, sort=True)
+        values = np.asarray(values, dtype=object)
+        merged = np.union1d(self.values, values)
+        known_codes, new_codes = np.searchsorted(merged, self.values), np.searchsorted(merged, values)
+        total = len(self.positions) + len(series)
+        index_dtype = np.int32 if total < 2 ** 31 else np.int64
+        known_counts = np.zeros(len(merged), dtype=np.int64)
+        known_counts[known_codes] = self.counts
+        new_counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        counts = known_counts.copy()
+        np.add.at(counts, new_codes, new_counts)
+        known_missing, new_missing = int(self.offsets[0]), int((codes < 0).sum())
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + known_missing + new_missing
+
+        positions = np.empty(total, dtype=index_dtype)
+        positions[:known_missing] = self.positions[:known_missing]
+        starts = np.repeat(self.offsets[:-1] - known_missing, self.counts)
+        ranks = np.arange(len(self.positions) - known_missing) - starts
+        positions[offsets[np.repeat(known_codes, self.counts)] + ranks] = self.positions[known_missing:]
+        order = np.argsort(codes, kind='stable')
+        new_positions, sorted_codes = order + first_row, codes[order]
+        positions[known_missing:known_missing + new_missing] = new_positions[:new_missing]
+        sorted_codes = sorted_codes[new_missing:]
+        ranks = np.arange(len(sorted_codes)) - (np.cumsum(new_counts) - new_counts)[sorted_codes]
+        merged_codes = new_codes[sorted_codes]
+        positions[offsets[merged_codes] + known_counts[merged_codes] + ranks] = new_positions[new_missing:]
+
+        added = np.flatnonzero(~np.isin(merged, self.values))
+        words, word_values = value_words(merged[added], added)
+        words = np.concatenate([self.words, np.array(words, dtype=str)])
+        word_values = np.concatenate([known_codes[self.word_values], np.array(word_values, dtype=np.int64)])
+        order = np.argsort(words, kind='stable')
+
+        index = copy.copy(self)
+        index.values, index.positions, index.counts = merged, positions, counts
+        index.offsets = offsets.astype(index_dtype)
+        index.words, index.word_values = words[order], word_values[order].astype(index_dtype)
+        return index
+
+    # Codes of the values matching the text.
+    def matching_values(self, text):
+        lower = np.searchsorted(self.words, text, side='left')
+        upper = np.searchsorted(self.words, text + LAST_CHARACTER, side='left')
+        return np.unique(self.word_values[lower:upper])
+
+    # Positions of the rows of the given values, gathering their posting lists in one go.
+    def rows(self, codes):
+        lengths = self.offsets[codes + 1] - self.offsets[codes]
+        starts = np.repeat(self.offsets[codes] - np.cumsum(lengths) + lengths, lengths)
+        return self.positions[starts + np.arange(lengths.sum())]
+
+
+class SearchIndex:
+    def __init__(self, df):
+        self.columns = {name: ColumnIndex(df[name]) for name in df.columns}
+
+    # Index of the indexed rows followed by the rows of df, the first of them at position first_row.
+    def appended(self, df, first_row):
+        index = copy.copy(self)
+        index.columns = {name: column.appended(df[name], first_row) for name, column in self.columns.items()}
+        return index
+
+    # Sorted positions of the rows with a matching value in any indexed column.
+    def rows(self, text):
+        text = normalise(text)
+        found = [index.rows(index.matching_values(text)) for index in self.columns.values()]
+        return np.unique(np.concatenate(found))
+
+    # Matching values as (column, value) pairs, the ones of the most rows first, then by column and value.
+    def suggest(self, text, limit=10):
+        text = normalise(text)
+        names = list(self.columns)
+        matches = [self.columns[name].matching_values(text) for name in names]
+        codes = np.concatenate(matches)
+        columns = np.repeat(np.arange(len(names)), [len(found) for found in matches])
+        counts = np.concatenate([self.columns[name].counts[found] for name, found in zip(names, matches)])
+        order = np.lexsort((codes, columns, -counts))[:limit]
+        return [(names[columns[i]], self.columns[names[columns[i]]].values[codes[i]]) for i in order]
@@ -0,0 +1,124 @@
+# Memory-mapped columnar store of the processed dataset, shared by every worker process on a host.
+# The first process materialises the dataset into one .npy file per column (text columns as integer codes plus their
+# sorted categories). Every process then attaches read-only memory-mapped views of those files, so the column data is
+# held once in the OS page cache instead of once per worker. Columns derived from the stored ones (see
+# services.transform.DERIVED_COLUMNS) are added to the store of a version by the first process computing them.
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+
+
+def column_file(position):
+    return f'column_{position}.npy'
+
+
+# The integer type pandas uses for categorical codes. Storing codes in it lets Categorical.from_codes keep the view.
+def codes_dtype(categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def derived_file(name):
+    return 'derived_' + name.lower().replace(' ', '_') + '.npy'
+
+
+def array_values(series):
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        series = series.astype(series.dtype.numpy_dtype)
+    return series.to_numpy()
+
+
+def write_column(path, series):
+    if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+        # Sorted categories keep sort_values and sorted() results identical to the original text column.
+        codes, categories = pd.factorize(series, sort=True)
+        np.save(path, codes.astype(codes_dtype(len(categories))))
+        return {'kind': 'category', 'categories': [str(c) for c in categories]}
+    np.save(path, array_values(series))
+    return {'kind': 'array'}
+
+
+def materialise(df, directory):
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    # Write into a temporary directory first and rename it, so readers never see a half written store.
+    staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    try:
+        columns = []
+        for position, name in enumerate(df.columns):
+            meta = write_column(os.path.join(staging, column_file(position)), df[name])
+            columns.append({'name': name, **meta})
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as manifest:
+            json.dump({'rows': len(df), 'columns': columns}, manifest)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def attach(directory):
+    with open(os.path.join(directory, MANIFEST_FILE)) as manifest_file:
+        manifest = json.load(manifest_file)
+    data = {}
+    for position, column in enumerate(manifest['columns']):
+        values = np.load(os.path.join(directory, column_file(position)), mmap_mode='r')
+        if column['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, column['categories'])
+        data[column['name']] = values
+    # copy=False keeps every column a view of its memory-mapped file.
+    return pd.DataFrame(data, copy=False)
+
+
+# Memory-mapped values of the numeric derived column name, adding compute() to the store if no process has done so
+# yet. Processes deriving the column at the same time write the same values, the last rename wins.
+def attach_or_write_derived(directory, name, compute):
+    path = os.path.join(directory, derived_file(name))
+    if not os.path.exists(path):
+        descriptor, staging = tempfile.mkstemp(dir=directory, prefix='.staging-', suffix='.npy')
+        try:
+            with os.fdopen(descriptor, 'wb') as staging_file:
+                np.save(staging_file, array_values(compute()))
+            os.replace(staging, path)
+        except BaseException:
+            os.remove(staging)
+            raise
+    return np.load(path, mmap_mode='r')
+
+
+def is_materialised(directory):
+    return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+# Remove stores of other dataset versions. Processes still attached to them keep their mappings until they exit.
+def remove_stale(root, keep):
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry != keep and not entry.startswith('.') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# Attach the store of the given dataset version, materialising it with build() if no process has done so yet.
+def attach_or_materialise(root, version, build):
+    directory = os.path.join(root, version)
+    if not is_materialised(directory):
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, LOCK_FILE), 'w') as lock:
+            # Only one process builds the store; the others wait here and attach the result.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not is_materialised(directory):
+                    materialise(build(), directory)
+                    remove_stale(root, version)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    return attach(directory)
@@ -0,0 +1,81 @@
+# Single-flight deduplication of callback computations.
+# Concurrent calls with the same normalised inputs against the same dataset version wait on one computation and share
+# its result (or its exception, e.g. PreventUpdate) instead of each recomputing it in their own thread.
+import os
+import re
+import threading
+from functools import wraps
+
+import main
+from services.callback_metrics import record_cache_lookup
+
+# Date pickers send the same day as '2017-01-01', '2017-01-01T00:00:00' or '2017-01-01 00:00:00'.
+MIDNIGHT_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})(?:[T ]00:00:00(?:\.0+)?)?')
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+in_flight_lock = threading.Lock()
+in_flight_calls = {}
+
+
+# A forked child (background job) only sees its own calls finish; the ones other threads of the parent were running
+# never do.
+def reset_in_child():
+    global in_flight_lock, in_flight_calls
+    in_flight_lock, in_flight_calls = threading.Lock(), {}
+
+
+os.register_at_fork(after_in_child=reset_in_child)
+
+
+def normalise_value(value):
+    if isinstance(value, str):
+        match = MIDNIGHT_PATTERN.fullmatch(value)
+        return match.group(1) if match else value
+    if isinstance(value, (list, tuple)):
+        return tuple(normalise_value(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalise_value(v)) for k, v in value.items()))
+    return value
+
+
+def make_key(func, args, kwargs):
+    return (func.__module__, func.__qualname__, main.dataset.version,
+            normalise_value(args), normalise_value(kwargs))
+
+
+def single_flight(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = make_key(func, args, kwargs)
+        with in_flight_lock:
+            call = in_flight_calls.get(key)
+            leader = call is None
+            if leader:
+                call = in_flight_calls[key] = InFlightCall()
+
+        record_cache_lookup(func.__name__, 'single_flight', not leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with in_flight_lock:
+                del in_flight_calls[key]
+            call.done.set()
+        return call.result
+
+    return wrapper
@@ -0,0 +1,115 @@
+# Startup instrumentation.
+# main.py and app.py time their startup phases with `with startup.phase(name):`, which only costs two perf_counter
+# calls. `python -m services.startup` starts a fresh interpreter with -X importtime that imports the app and builds
+# the layout of every route, then reports the phases and the import time of every top-level package:
+#   python -m services.startup [--cold] [--budget SECONDS] [--json PATH]
+# --cold points the dataset stores at an empty temporary directory, as on a fresh serverless instance. The command
+# exits with status 1 when startup takes longer than the budget (config.STARTUP_BUDGET by default), so it doubles as
+# a startup time regression check.
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Directories the app writes its stores to, replaced by empty ones in --cold runs.
+CACHE_SETTINGS = ['BACKGROUND_CACHE_DIR', 'SHARED_DATASET_DIR', 'SQLITE_DIR']
+# import time: self [us] | cumulative [us] | module
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Finished phases: name, start and duration in seconds and nesting depth.
+phases = []
+depth = 0
+
+
+@contextmanager
+def phase(name):
+    global depth
+    started = time.perf_counter()
+    depth += 1
+    try:
+        yield
+    finally:
+        depth -= 1
+        phases.append({'name': name, 'start': started, 'seconds': time.perf_counter() - started, 'depth': depth})
+
+
+# Self import time per top-level package, from the -X importtime output.
+def import_times(stderr):
+    packages = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            package = match.group(4).split('.')[0]
+            packages[package] = packages.get(package, 0) + int(match.group(1)) / 1e6
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+# Runs in the profiled interpreter: start the app as a server process would and write the phases to output_path.
+def run_child(output_path):
+    from services import startup
+    with startup.phase('import app'):
+        import app
+    for route in app.ROUTES:
+        with startup.phase(f'layout {route}'):
+            app.get_layout(route)
+    with open(output_path, 'w') as output:
+        json.dump(sorted(startup.phases, key=lambda p: p['start']), output)
+
+
+def profile(cold=False):
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as directory:
+        if cold:
+            env.update({name: os.path.join(directory, name.lower()) for name in CACHE_SETTINGS})
+        output_path = os.path.join(directory, 'phases.json')
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'services.startup', '--child', output_path],
+                                cwd=PROJECT_DIR, env=env, capture_output=True, text=True)
+        seconds = time.perf_counter() - started
+        if result.returncode != 0:
+            raise RuntimeError(f'Profiled startup failed:\n{result.stderr[-4000:]}')
+        with open(output_path) as output:
+            child_phases = json.load(output)
+    return {'seconds': seconds, 'cold': cold, 'phases': child_phases, 'imports': import_times(result.stderr)}
+
+
+def print_report(report, budget, top=15):
+    print(f"Startup {report['seconds']:.2f} s ({'cold' if report['cold'] else 'warm'} stores, budget {budget:.2f} s)")
+    print('Phases:')
+    for p in report['phases']:
+        print(f"  {'  ' * p['depth'] + p['name']:<40} {p['seconds']:8.3f} s")
+    print('Imports (self time per top-level package):')
+    for package, seconds in list(report['imports'].items())[:top]:
+        print(f'  {package:<40} {seconds:8.3f} s')
+
+
+def main():
+    import config
+    parser = argparse.ArgumentParser(description='Report where the startup time of the dashboard goes.')
+    parser.add_argument('--cold', action='store_true', help='start with empty dataset stores')
+    parser.add_argument('--budget', type=float, default=config.STARTUP_BUDGET, help='startup time budget in seconds')
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child)
+        return
+    report = profile(args.cold)
+    report['budget'] = args.budget
+    print_report(report, args.budget)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+    if report['seconds'] > args.budget:
+        print(f"Startup time {report['seconds']:.2f} s exceeds the budget of {args.budget:.2f} s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+# Deterministic synthetic Superstore data, from 10k to 10M+ rows.
+# Orders and Returns have the schema of 'Sample - Superstore.xlsx'. The region/state and category/sub-category
+# hierarchies and the mixes of ship modes, segments, discounts, order sizes and returns follow the sample; the number
+# of customers, products and cities grows with the number of rows. Text columns are categorical to keep large data
+# sets in memory.
+# The same rows and seed always give the same data: the random streams are split into blocks of BLOCK_ROWS rows, so
+# the data does not depend on how it is consumed (generate() or generate_blocks()).
+#
+# Usage: python -m services.synthetic ROWS OUTPUT_DIR [--seed N] [--xlsx]
+# writes orders.csv and returns.csv (the input of services.ingest) and with --xlsx a workbook like the sample, which
+# main.py can load (at most 1,048,575 rows).
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+BLOCK_ROWS = 1_000_000
+SAMPLE_ROWS = 9994
+FIRST_ORDER_DATE = '2014-01-01'
+LAST_ORDER_DATE = '2017-12-31'
+ORDERS_FILE = 'orders.csv'
+RETURNS_FILE = 'returns.csv'
+WORKBOOK_FILE = 'Superstore.xlsx'
+EXCEL_MAX_ROWS = 1_048_575
+
+REGION_STATES = {
+    'Central': ['Texas', 'Wisconsin', 'Nebraska', 'Illinois', 'Minnesota', 'Michigan', 'Indiana', 'Iowa', 'Missouri',
+                'Oklahoma', 'Kansas', 'South Dakota', 'North Dakota'],
+    'East': ['Pennsylvania', 'Delaware', 'New York', 'Ohio', 'Connecticut', 'New Jersey', 'Massachusetts',
+             'Rhode Island', 'New Hampshire', 'Maryland', 'District of Columbia', 'Vermont', 'Maine', 'West Virginia'],
+    'South': ['Kentucky', 'Florida', 'North Carolina', 'Virginia', 'Tennessee', 'Alabama', 'South Carolina',
+              'Louisiana', 'Georgia', 'Mississippi', 'Arkansas'],
+    'West': ['California', 'Washington', 'Utah', 'Arizona', 'Oregon', 'Colorado', 'New Mexico', 'Nevada', 'Montana',
+             'Idaho', 'Wyoming'],
+}
+REGION_SHARES = {'Central': 0.232, 'East': 0.285, 'South': 0.163, 'West': 0.32}
+CATEGORY_SUB_CATEGORIES = {
+    'Furniture': ['Bookcases', 'Chairs', 'Tables', 'Furnishings'],
+    'Office Supplies': ['Labels', 'Storage', 'Art', 'Binders', 'Appliances', 'Paper', 'Envelopes', 'Fasteners',
+                        'Supplies'],
+    'Technology': ['Phones', 'Accessories', 'Machines', 'Copiers'],
+}
+CATEGORY_SHARES = {'Furniture': 0.212, 'Office Supplies': 0.603, 'Technology': 0.185}
+# Median unit price per category.
+CATEGORY_PRICES = {'Furniture': 120.0, 'Office Supplies': 12.0, 'Technology': 110.0}
+SEGMENT_SHARES = {'Consumer': 0.519, 'Corporate': 0.302, 'Home Office': 0.179}
+# Ship mode -> (share, shortest and longest shipping time in days).
+SHIP_MODES = {'Standard Class': (0.597, 3, 7), 'Second Class': (0.195, 1, 5), 'First Class': (0.154, 1, 4),
+              'Same Day': (0.054, 0, 1)}
+# Discount -> (share, mean profit ratio).
+DISCOUNTS = {0.0: (0.48, 0.34), 0.1: (0.009, 0.156), 0.15: (0.005, 0.034), 0.2: (0.366, 0.177),
+             0.3: (0.023, -0.115), 0.32: (0.003, -0.174), 0.4: (0.021, -0.222), 0.45: (0.001, -0.455),
+             0.5: (0.007, -0.549), 0.6: (0.014, -0.689), 0.7: (0.042, -0.795), 0.8: (0.03, -1.825)}
+# Lines per order -> share of orders.
+ORDER_LINES = {1: 0.507, 2: 0.244, 3: 0.12, 4: 0.067, 5: 0.032, 6: 0.014, 7: 0.01, 8: 0.003, 9: 0.002}
+RETURNED_ORDER_SHARE = 0.059
+FIRST_NAMES = ['Aaron', 'Adam', 'Alan', 'Alice', 'Amy', 'Anna', 'Ben', 'Beth', 'Brian', 'Carl', 'Carol', 'Chris',
+               'Claire', 'Dan', 'Darrin', 'Dave', 'Diana', 'Ed', 'Emily', 'Eric', 'Frank', 'Grace', 'Greg', 'Helen',
+               'Ivan', 'Jane', 'Jason', 'Jill', 'Karen', 'Ken', 'Laura', 'Linda', 'Mark', 'Mary', 'Nick', 'Olivia',
+               'Paul', 'Rachel', 'Sam', 'Sean', 'Tom', 'Tracy']
+LAST_NAMES = ['Adams', 'Baker', 'Bell', 'Brooks', 'Carter', 'Clark', 'Cook', 'Cruz', 'Davis', 'Evans', 'Fisher',
+              'Ford', 'Gute', 'Hall', 'Hart', 'Hill', 'Hoffman', 'Hughes', 'James', 'Jones', 'Kelly', 'King', 'Lee',
+              'Lopez', 'Martin', 'Miller', 'Moore', 'Murphy', 'Nelson', 'Parker', 'Perry', 'Price', 'Reed', 'Ross',
+              'Scott', 'Smith', 'Stewart', 'Taylor', 'Turner', 'Van Huff', 'Walker', 'Ward', 'White', 'Wood',
+              'Young']
+ORDERS_COLUMNS = ['Row ID', 'Order ID', 'Order Date', 'Ship Date', 'Ship Mode', 'Customer ID', 'Customer Name',
+                  'Segment', 'Country', 'City', 'State', 'Postal Code', 'Region', 'Product ID', 'Category',
+                  'Sub-Category', 'Product Name', 'Sales', 'Quantity', 'Discount', 'Profit']
+
+
+def shares(mapping):
+    probabilities = np.array([share[0] if isinstance(share, tuple) else share for share in mapping.values()])
+    return probabilities / probabilities.sum()
+
+
+# Number of distinct entities for the given rows, growing with the rows like a long tailed catalogue.
+def scaled(sample_count, rows, exponent):
+    return max(int(sample_count * (rows / SAMPLE_ROWS) ** exponent), 1)
+
+
+# Customers, products and cities of a data set of the given size.
+class Vocabulary:
+    def __init__(self, rows, seed):
+        rng = np.random.default_rng([seed, 0])
+
+        customers = scaled(793, rows, 0.75)
+        numbers = np.arange(customers)
+        first = np.array(FIRST_NAMES, dtype=object)[numbers % len(FIRST_NAMES)]
+        last = np.array(LAST_NAMES, dtype=object)[numbers // len(FIRST_NAMES) % len(LAST_NAMES)]
+        repeat = numbers // (len(FIRST_NAMES) * len(LAST_NAMES))
+        self.customer_names = [f'{f} {l}' if r == 0 else f'{f} {l} {r + 1}' for f, l, r in zip(first, last, repeat)]
+        self.customer_ids = [f'{f[0]}{l[0]}-{10000 + n}' for f, l, n in zip(first, last, numbers)]
+        self.customer_segments = rng.choice(len(SEGMENT_SHARES), size=customers, p=shares(SEGMENT_SHARES))
+
+        states = [(region, state) for region, region_states in REGION_STATES.items() for state in region_states]
+        cities = max(scaled(531, rows, 0.5), len(states))
+        # Every state gets a city, the others go to states weighted by the share of their region.
+        state_weights = np.array([REGION_SHARES[region] / len(REGION_STATES[region]) for region, _ in states])
+        city_states = np.concatenate([np.arange(len(states)), rng.choice(
+            len(states), size=cities - len(states), p=state_weights / state_weights.sum())])
+        self.cities = [f'{states[s][1]} City {n + 1}' for n, s in enumerate(city_states)]
+        self.city_states = [states[s][1] for s in city_states]
+        self.city_regions = [states[s][0] for s in city_states]
+        self.city_postal_codes = 10000 + np.arange(cities) * 89999 // max(cities, 1)
+        self.city_weights = state_weights[city_states] / np.bincount(city_states)[city_states]
+        self.city_weights /= self.city_weights.sum()
+
+        sub_categories = [(category, sub) for category, subs in CATEGORY_SUB_CATEGORIES.items() for sub in subs]
+        products = max(scaled(1862, rows, 0.5), len(sub_categories))
+        sub_weights = np.array([CATEGORY_SHARES[category] / len(CATEGORY_SUB_CATEGORIES[category])
+                                for category, _ in sub_categories])
+        product_subs = np.concatenate([np.arange(len(sub_categories)), rng.choice(
+            len(sub_categories), size=products - len(sub_categories), p=sub_weights / sub_weights.sum())])
+        self.product_categories = [sub_categories[s][0] for s in product_subs]
+        self.product_sub_categories = [sub_categories[s][1] for s in product_subs]
+        self.product_names = [f'{sub_categories[s][1]} Model {n + 1}' for n, s in enumerate(product_subs)]
+        self.product_ids = [f'{c[:3].upper()}-{sub[:2].upper()}-{10000000 + n}'
+                            for n, (c, sub) in enumerate(sub_categories[s] for s in product_subs)]
+        median_prices = np.array([CATEGORY_PRICES[c] for c in self.product_categories])
+        self.product_prices = np.round(median_prices * rng.lognormal(0, 1.0, size=products), 2)
+        self.product_weights = sub_weights[product_subs] / np.bincount(product_subs)[product_subs]
+        self.product_weights /= self.product_weights.sum()
+
+
+def generate_block(vocabulary, block, rows, seed):
+    rng = np.random.default_rng([seed, 1, block])
+    first_row = block * BLOCK_ROWS
+
+    # Orders, with their number of lines, until the block is full.
+    lines = []
+    total = 0
+    while total < rows:
+        drawn = rng.choice(list(ORDER_LINES), size=max((rows - total) // 2 + 16, 16), p=shares(ORDER_LINES))
+        lines.append(drawn)
+        total += int(drawn.sum())
+    lines = np.concatenate(lines)
+    orders = int(np.searchsorted(np.cumsum(lines), rows)) + 1
+    lines = lines[:orders]
+    lines[-1] -= int(lines.sum()) - rows
+    order_of_line = np.repeat(np.arange(orders), lines)
+
+    days = (pd.Timestamp(LAST_ORDER_DATE) - pd.Timestamp(FIRST_ORDER_DATE)).days + 1
+    # Sales grow over the years, as in the sample.
+    order_dates = pd.Timestamp(FIRST_ORDER_DATE) + pd.to_timedelta(
+        np.floor(days * rng.power(1.3, size=orders)).astype(int), unit='D')
+    ship_mode = rng.choice(len(SHIP_MODES), size=orders, p=shares(SHIP_MODES))
+    shortest = np.array([mode[1] for mode in SHIP_MODES.values()])[ship_mode]
+    longest = np.array([mode[2] for mode in SHIP_MODES.values()])[ship_mode]
+    ship_dates = order_dates + pd.to_timedelta(rng.integers(shortest, longest + 1), unit='D')
+    customer = rng.integers(0, len(vocabulary.customer_ids), size=orders)
+    city = rng.choice(len(vocabulary.cities), size=orders, p=vocabulary.city_weights)
+    order_number = first_row + np.arange(orders)
+    order_ids = (np.where(rng.random(orders) < 0.8, 'CA-', 'US-').astype(object) + order_dates.year.astype(str)
+                 + '-' + pd.Index(100000 + order_number).astype(str))
+    returned = rng.random(orders) < RETURNED_ORDER_SHARE
+
+    product = rng.choice(len(vocabulary.product_ids), size=rows, p=vocabulary.product_weights)
+    quantity = np.minimum(rng.geometric(0.27, size=rows), 14)
+    discount_values = np.array(list(DISCOUNTS))
+    discount = rng.choice(len(DISCOUNTS), size=rows, p=shares(DISCOUNTS))
+    sales = np.round(vocabulary.product_prices[product] * quantity * (1 - discount_values[discount]), 4)
+    margin = np.array([ratio for _, ratio in DISCOUNTS.values()])[discount]
+    profit = np.round(sales * (margin + rng.normal(0, 0.08, size=rows)), 4)
+
+    customer_of_line = customer[order_of_line]
+    city_of_line = city[order_of_line]
+    df_orders = pd.DataFrame({
+        'Row ID': first_row + np.arange(rows) + 1,
+        'Order ID': pd.Categorical.from_codes(order_of_line, order_ids),
+        'Order Date': order_dates[order_of_line],
+        'Ship Date': ship_dates[order_of_line],
+        'Ship Mode': pd.Categorical.from_codes(ship_mode[order_of_line], list(SHIP_MODES)),
+        'Customer ID': pd.Categorical.from_codes(customer_of_line, vocabulary.customer_ids),
+        'Customer Name': pd.Categorical.from_codes(customer_of_line, vocabulary.customer_names),
+        'Segment': pd.Categorical.from_codes(vocabulary.customer_segments[customer_of_line], list(SEGMENT_SHARES)),
+        'Country': pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), ['United States']),
+        'City': pd.Categorical.from_codes(city_of_line, vocabulary.cities),
+        'State': pd.Categorical(np.array(vocabulary.city_states, dtype=object)[city_of_line]),
+        'Postal Code': vocabulary.city_postal_codes[city_of_line],
+        'Region': pd.Categorical(np.array(vocabulary.city_regions, dtype=object)[city_of_line]),
+        'Product ID': pd.Categorical.from_codes(product, vocabulary.product_ids),
+        'Category': pd.Categorical(np.array(vocabulary.product_categories, dtype=object)[product]),
+        'Sub-Category': pd.Categorical(np.array(vocabulary.product_sub_categories, dtype=object)[product]),
+        'Product Name': pd.Categorical.from_codes(product, vocabulary.product_names),
+        'Sales': sales,
+        'Quantity': quantity,
+        'Discount': discount_values[discount],
+        'Profit': profit,
+    }, columns=ORDERS_COLUMNS)
+    df_returns = pd.DataFrame({'Returned': 'Yes', 'Order ID': order_ids[returned]})
+    return df_orders, df_returns
+
+
+# Orders and Returns data in blocks of at most BLOCK_ROWS rows.
+def generate_blocks(rows, seed=0):
+    vocabulary = Vocabulary(rows, seed)
+    for block, first_row in enumerate(range(0, rows, BLOCK_ROWS)):
+        yield generate_block(vocabulary, block, min(BLOCK_ROWS, rows - first_row), seed)
+
+
+def generate(rows, seed=0):
+    blocks = list(generate_blocks(rows, seed))
+    if len(blocks) == 1:
+        return blocks[0]
+    # Categories differ between blocks, so categorical columns are combined over the union of their categories.
+    df_orders = pd.DataFrame({
+        name: union_categoricals([df[name] for df, _ in blocks]) if isinstance(column.dtype, pd.CategoricalDtype)
+        else np.concatenate([df[name].to_numpy() for df, _ in blocks])
+        for name, column in blocks[0][0].items()})
+    df_returns = pd.concat([df for _, df in blocks], ignore_index=True)
+    return df_orders, df_returns
+
+
+def write(rows, output_dir, seed=0, xlsx=False):
+    os.makedirs(output_dir, exist_ok=True)
+    orders_path = os.path.join(output_dir, ORDERS_FILE)
+    returns_path = os.path.join(output_dir, RETURNS_FILE)
+    returns = []
+    for block, (df_orders, df_returns) in enumerate(generate_blocks(rows, seed)):
+        df_orders.to_csv(orders_path, mode='w' if block == 0 else 'a', header=block == 0, index=False)
+        returns.append(df_returns)
+    df_returns = pd.concat(returns, ignore_index=True)
+    df_returns.to_csv(returns_path, index=False)
+    if xlsx:
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f'A worksheet holds at most {EXCEL_MAX_ROWS} rows')
+        df_orders, df_returns = generate(rows, seed)
+        with pd.ExcelWriter(os.path.join(output_dir, WORKBOOK_FILE)) as writer:
+            df_orders.to_excel(writer, sheet_name='Orders', index=False)
+            df_returns.to_excel(writer, sheet_name='Returns', index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write deterministic synthetic Superstore data.')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output_dir')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--xlsx', action='store_true', help='also write a workbook like the sample')
+    args = parser.parse_args()
+    write(args.rows, args.output_dir, args.seed, args.xlsx)
+    print(f'Wrote {args.rows} rows to {args.output_dir}')
@@ -0,0 +1,67 @@
+# Derivation of the processed orders data from the raw 'Orders' and 'Returns' data.
+# It only works row by row (plus the join with the small Returns table), so it is shared by the workbook load in
+# main.py and the chunked streaming ingest in services.ingest.
+# Columns derived from other columns of a row are registered in DERIVED_COLUMNS instead of being added here. They are
+# computed on first access and cached per dataset snapshot (see services.datasource.Snapshot).
+
+# Columns of the 'Orders' data that are not used by any page. 'Row ID' is kept to match rows on reload (see
+# services.reload).
+DROPPED_COLUMNS = ['Customer ID', 'Country', 'Postal Code', 'Product ID']
+
+# Derived column name -> function(df) computing it from the processed orders.
+DERIVED_COLUMNS = {}
+
+
+def derived_column(name):
+    def register(func):
+        DERIVED_COLUMNS[name] = func
+        return func
+
+    return register
+
+
+def prepare_orders(df_orders_data, df_returns_data):
+    # Merge above dataframes based on 'Order ID' as this column is common between two dataframe.
+    df_main = df_orders_data.merge(df_returns_data, on='Order ID', how='left')
+    # Fill missing entries of 'Returned' column with 'No'. Then assign numeric vlues: 1 for all Yes and 0 for all No values for later calculation. 
+    df_main['Returned'] = df_main['Returned'].fillna('No').map(dict(Yes=1, No=0))
+    # Calculate and Add 'Profit Ratio' column to the dataframe. It needs the unrounded 'Sales' and 'Profit', so unlike
+    # the other derived columns it cannot be computed later.
+    df_main['Profit Ratio'] = df_main['Profit'] / df_main['Sales']
+    # Round the float columns one by one, rounding the whole frame at once would copy it.
+    for column in df_main.select_dtypes('float').columns:
+        df_main[column] = df_main[column].round(2)
+    return df_main.sort_values(by='Order Date')
+
+
+# Add the derived columns (all of them by default) to a copy of df, for stores that must hold them, e.g. SQLite.
+def with_derived_columns(df, columns=None):
+    columns = [name for name in (columns or DERIVED_COLUMNS) if name not in df.columns]
+    return df.assign(**{name: DERIVED_COLUMNS[name](df) for name in columns})
+
+
+# Taken shipment days for individual order.
+@derived_column('Days to Ship')
+def days_to_ship(df):
+    return (df['Ship Date'] - df['Order Date']).dt.days + 1
+
+
+# Granularity columns.
+@derived_column('Year')
+def order_year(df):
+    return df['Order Date'].dt.year
+
+
+@derived_column('Month')
+def order_month(df):
+    return df['Order Date'].dt.month
+
+
+@derived_column('Quarter')
+def order_quarter(df):
+    return df['Order Date'].dt.quarter
+
+
+@derived_column('Week')
+def order_week(df):
+    return df['Order Date'].dt.isocalendar().week
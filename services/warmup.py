@@ -0,0 +1,136 @@
+# Warm-up of the result cache (services.result_cache) with popular views, so the first visitors after a deploy or a
+# reload do not pay for them. Once the dataset is ready and after every reload, a background thread calls the callbacks
+# of the views in config.WARMUP_VIEWS:
+#   landing-years    - the overview cards of every calendar year of the data
+#   landing-quarters - the overview cards of every calendar quarter of the data
+#   timeline         - the timeline graph of every granularity over the whole date range, the graph page's default
+# Before every entry the thread waits until no callback of a real request has run for config.WARMUP_IDLE_SECONDS
+# (services.scheduler.traffic_idle), so it pauses while real traffic needs the CPU. The callbacks run on the warm-up
+# thread instead of the heavy callback pool, and on Linux the thread runs at the lowest scheduling priority.
+# Every entry is reported as warmed, cached (already in the cache) or failed, in the dashboard_warmup_entries_total
+# metric and on /warmup (see app.py). A reload starts a new pass, which abandons the running one.
+import os
+import sys
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+import main
+from services import metrics, result_cache
+from services.aggregation import DATE_COLUMN
+from services.scheduler import background_work, traffic_idle
+
+# Nice value of the warm-up thread.
+WARMUP_NICENESS = 19
+
+entries_total = metrics.counter(
+    'dashboard_warmup_entries_total', 'Popular views precomputed by the cache warm-up, by view and result.')
+
+
+def calendar_periods(first_date, last_date, freq):
+    for period in pd.period_range(first_date, last_date, freq=freq):
+        yield period.start_time.strftime('%Y-%m-%d'), period.end_time.strftime('%Y-%m-%d')
+
+
+def landing_years():
+    from pages import page_landing
+    first_date, last_date = page_landing.source.date_range(DATE_COLUMN)
+    for start_date, end_date in calendar_periods(first_date, last_date, 'Y'):
+        yield page_landing.update_overview_cards, (start_date, end_date)
+
+
+def landing_quarters():
+    from pages import page_landing
+    first_date, last_date = page_landing.source.date_range(DATE_COLUMN)
+    for start_date, end_date in calendar_periods(first_date, last_date, 'Q'):
+        yield page_landing.update_overview_cards, (start_date, end_date)
+
+
+def timeline():
+    from pages import page_graph
+    first_date, last_date = page_graph.source.date_range(DATE_COLUMN)
+    for granularity in page_graph.time_labels:
+        yield page_graph.update_timeline_graph, (granularity, str(first_date), str(last_date))
+
+
+# View name -> generator of the (callback, arguments) entries of the view.
+VIEWS = {
+    'landing-years': landing_years,
+    'landing-quarters': landing_quarters,
+    'timeline': timeline,
+}
+
+
+def lower_priority():
+    # Linux applies nice values per thread, elsewhere they would apply to the whole process.
+    if sys.platform.startswith('linux'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WARMUP_NICENESS)
+        except OSError:
+            pass
+
+
+class Warmer:
+    def __init__(self, views, idle_seconds):
+        unknown = [name for name in views if name not in VIEWS]
+        if unknown:
+            raise ValueError(f'Unknown warm-up views {unknown}, known are {list(VIEWS)}')
+        self.views = views
+        self.idle_seconds = idle_seconds
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.report = {'views': views, 'state': 'idle', 'entries': []}
+
+    # Start a new pass over the views, abandoning the running one.
+    def start(self):
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        threading.Thread(target=self.run, args=(generation,), name='cache-warmup', daemon=True).start()
+
+    def superseded(self, generation):
+        return generation != self.generation
+
+    # Wait until real traffic is idle. Returns False when a newer pass started meanwhile.
+    def wait_for_idle(self, generation):
+        while not traffic_idle(self.idle_seconds):
+            if self.superseded(generation):
+                return False
+            time.sleep(max(self.idle_seconds / 4, 0.05))
+        return not self.superseded(generation)
+
+    def run(self, generation):
+        lower_priority()
+        background_work.set(True)
+        report = self.report = {'views': self.views, 'version': main.dataset.version, 'state': 'running',
+                                'started': time.time(), 'entries': []}
+        for view in self.views:
+            try:
+                entries = list(VIEWS[view]())
+            except Exception:
+                traceback.print_exc()
+                entries_total.inc(view=view, result='failed')
+                report['entries'].append({'view': view, 'result': 'failed'})
+                continue
+            for func, args in entries:
+                if not self.wait_for_idle(generation):
+                    report['state'] = 'superseded'
+                    return
+                entry = {'view': view, 'callback': func.__name__, 'inputs': list(args)}
+                started = time.perf_counter()
+                if result_cache.contains(func, *args):
+                    entry['result'] = 'cached'
+                else:
+                    try:
+                        func(*args)
+                        entry['result'] = 'warmed'
+                    except Exception:  # a broken view must not stop the others
+                        traceback.print_exc()
+                        entry['result'] = 'failed'
+                entry['seconds'] = time.perf_counter() - started
+                entries_total.inc(view=view, result=entry['result'])
+                report['entries'].append(entry)
+        report['state'] = 'finished'
+        report['finished'] = time.time()
@@ -0,0 +1,62 @@
+# The parallel aggregation mode (see services.aggregation) must give the results of one serial pandas groupby, means
+# and time bins without rows included.
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from services import aggregation
+
+
+@pytest.fixture
+def orders():
+    rng = np.random.default_rng(0)
+    # No orders in 2015, so the weekly and monthly bins of that year are empty.
+    dates = np.concatenate([pd.date_range('2014-01-01', '2014-12-31', periods=300).to_numpy(),
+                            pd.date_range('2016-01-01', '2017-12-31', periods=700).to_numpy()])
+    yield pd.DataFrame({
+        'Order Date': dates,
+        'Ship Date': dates + pd.to_timedelta(rng.integers(0, 7, len(dates)), unit='D'),
+        'Region': pd.Categorical(rng.choice(['Central', 'East', 'South', 'West'], len(dates))),
+        'Sales': rng.random(len(dates)) * 100,
+        'Discount': rng.choice([0, 0.2, np.nan], len(dates)),
+        'Returned': rng.integers(0, 2, len(dates)),
+    })
+    aggregation.reset()
+
+
+CASES = [
+    ([pd.Grouper(key='Order Date', freq='W')], {'Sales': 'sum', 'Discount': 'mean', 'Returned': 'sum'}),
+    ([pd.Grouper(key='Order Date', freq='ME')], {'Days to Ship': 'mean', 'Sales': 'max', 'Returned': 'count'}),
+    (['Region'], {'Sales': 'sum', 'Discount': 'mean', 'Days to Ship': 'min'}),
+    ([pd.Grouper(key='Order Date', freq='QE'), 'Region'], {'Sales': 'mean', 'Returned': 'sum'}),
+]
+
+
+def with_days_to_ship(df):
+    return df.assign(**{'Days to Ship': (df['Ship Date'] - df['Order Date']).dt.days + 1})
+
+
+def expected(df, by, agg, start_date=None, end_date=None):
+    df = with_days_to_ship(df)
+    return aggregation.complete_time_bins(aggregation.serial_aggregate(df, by, agg, start_date, end_date), by, agg)
+
+
+@pytest.mark.parametrize('partition', ['year', 'month'])
+@pytest.mark.parametrize('by, agg', CASES)
+def test_parallel_equals_serial(orders, monkeypatch, partition, by, agg):
+    monkeypatch.setattr(config, 'AGGREGATION_PARTITION', partition)
+    monkeypatch.setattr(config, 'AGGREGATION_WORKERS', 2)
+    # Like the page views, df holds the derived columns and the partitioned frame only the stored ones.
+    df = with_days_to_ship(orders)
+    for start_date, end_date in [(None, None), ('2014-06-01', '2016-03-31'), ('2015-02-01', '2015-11-30')]:
+        result = aggregation.parallel_aggregate(df, by, agg, start_date, end_date, key=partition, frame=lambda: orders)
+        pd.testing.assert_frame_equal(result, expected(orders, by, agg, start_date, end_date), check_freq=False)
+
+
+@pytest.mark.parametrize('by, agg', CASES)
+def test_merged_partials_equal_serial(orders, by, agg):
+    aggregation.partitions = aggregation.partition_frame(orders)
+    partials = [aggregation.aggregate_partition(label, by, agg, None, None) for label in aggregation.partitions]
+    result = aggregation.merge_partials(partials, by, agg)
+    pd.testing.assert_frame_equal(result, expected(orders, by, agg), check_freq=False)
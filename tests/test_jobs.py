@@ -0,0 +1,72 @@
+# Background callback jobs (see services.jobs): jobs forked while other threads use the job cache must finish, and the
+# load replay of the graph page must not fail or time out with background callbacks on.
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from services import jobs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cache of the manager under test, used by the job functions in the forked job processes.
+jobs_cache = None
+
+
+def write_result(result_key, progress_key, args, context):
+    jobs_cache.set(result_key, args[0])
+
+
+def write_forever(result_key, progress_key, args, context):
+    while True:
+        jobs_cache.set(progress_key, list(range(1000)))
+
+
+def test_jobs_forked_during_cache_traffic_finish(tmp_path):
+    global jobs_cache
+    manager = jobs.JobManager(str(tmp_path))
+    jobs_cache = manager.handle
+    stopped = threading.Event()
+
+    def traffic():
+        while not stopped.is_set():
+            manager.clear_cache_entry('traffic')
+            manager.result_ready('traffic')
+
+    threads = [threading.Thread(target=traffic) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for number in range(20):
+            # Superseded jobs are killed while they write to the cache.
+            writer = manager.call_job_fn(f'writer-{number}', write_forever, [], {})
+            time.sleep(0.02)
+            manager.terminate_job(writer)
+            manager.call_job_fn(f'job-{number}', write_result, [number], {})
+        deadline = time.monotonic() + 30
+        pending = {f'job-{number}' for number in range(20)}
+        while pending and time.monotonic() < deadline:
+            pending = {key for key in pending if not manager.result_ready(key)}
+            time.sleep(0.05)
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
+    assert not pending
+    assert [manager.get_result(f'job-{number}', None) for number in range(20)] == list(range(20))
+
+
+def test_load_replay_with_background_callbacks(tmp_path):
+    report_path = tmp_path / 'report.json'
+    env = {**os.environ, 'BACKGROUND_CALLBACKS': '1', 'RELOAD_INTERVAL': '0',
+           'BACKGROUND_CACHE_DIR': str(tmp_path / 'background'), 'SHARED_DATASET_DIR': str(tmp_path / 'dataset')}
+    subprocess.run([sys.executable, '-m', 'services.loadtest', '--users', '4', '--iterations', '2',
+                    '--scenario', 'graph', '--json', str(report_path)], cwd=ROOT, env=env, check=True, timeout=300)
+    with open(report_path) as report_file:
+        callbacks = json.load(report_file)['callbacks']
+    assert any(stats['ok'] for name, stats in callbacks.items() if name.endswith('timeline_graph'))
+    assert any(stats['ok'] for name, stats in callbacks.items() if name.endswith('bubble_graph'))
+    for name, stats in callbacks.items():
+        assert stats['error'] == 0 and stats['timeout'] == 0, name
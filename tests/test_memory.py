@@ -0,0 +1,30 @@
+# Every page must read its columns as views of the memory-mapped files of the shared dataset store, not as copies
+# (see services.memory). Their text columns are categorical, and stay so when a row is appended to a view.
+import warnings
+
+import pandas as pd
+import pytest
+
+import config
+from services import memory
+from services.datasource import ProjectedView
+
+
+@pytest.mark.skipif(config.DATA_BACKEND != 'pandas', reason='memory accounting only applies to the pandas backend')
+@pytest.mark.skipif(not config.SHARED_DATASET, reason='the dataset is not shared')
+def test_pages_share_dataset_memory():
+    report = memory.page_report()
+    assert report
+    for page, (total, duplicated) in report.items():
+        assert total > 0, page
+        assert duplicated == 0, f'{page} duplicates {duplicated} bytes of the dataset'
+
+
+def test_append_keeps_categorical_columns():
+    view = ProjectedView(pd.DataFrame({'Region': pd.Categorical(['East', 'West']), 'Sales': [1.0, 2.0]}, index=[1, 0]))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        appended = view.append({'Region': 'Mars', 'Sales': None}).append({'Region': None, 'Sales': 3.0})
+    assert isinstance(appended.column('Region').dtype, pd.CategoricalDtype)
+    assert appended.column('Region').tolist()[:3] == ['East', 'West', 'Mars']
+    assert len(view) == 2
@@ -0,0 +1,108 @@
+# Reloads match rows on 'Row ID' (see services.reload): only rows of new Row IDs are appended, edited or removed rows
+# replace the dataset. Whatever a snapshot computed is extended with the appended rows as if built from all rows.
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from services import aggregation, reload, sampling
+from services.search import SearchIndex
+
+
+@pytest.fixture
+def source():
+    rng = np.random.default_rng(0)
+    rows = 400
+    return pd.DataFrame({
+        'Row ID': np.arange(1, rows + 1),
+        'Order ID': [f'CA-{i // 3}' for i in range(rows)],
+        'Order Date': pd.date_range('2016-01-01', '2017-06-30', periods=rows).floor('D'),
+        'City': rng.choice(np.array(['Los Angeles', 'New York City', 'Newark', 'Seattle'], dtype=object), rows),
+        'Sales': rng.random(rows).round(2),
+        'Returned': rng.integers(0, 2, rows),
+    })
+
+
+def later_rows(row_ids, order_ids):
+    return pd.DataFrame({
+        'Row ID': row_ids,
+        'Order ID': order_ids,
+        'Order Date': pd.to_datetime(['2017-07-02'] * len(row_ids)),
+        'City': 'Yonkers',
+        'Sales': 1.5,
+        'Returned': 0,
+    })
+
+
+def test_unchanged_source_appends_nothing(source):
+    # The dataset attached from the shared store has categorical text columns.
+    df_main = source.astype({'City': 'category', 'Order ID': 'category'})
+    df, df_appended = reload.apply_increment(df_main, source.copy())
+    assert df is df_main and df_appended.empty
+
+
+def test_new_rows_are_appended(source):
+    # A new line item of a known order and a new order.
+    df_new = later_rows([1001, 1002], [source['Order ID'].iloc[-1], 'CA-new'])
+    df, df_appended = reload.apply_increment(source, pd.concat([source, df_new], ignore_index=True))
+    pd.testing.assert_frame_equal(df_appended, df_new)
+    pd.testing.assert_frame_equal(df, pd.concat([source, df_new], ignore_index=True))
+
+
+@pytest.mark.parametrize('change', ['edited', 'removed', 'returned', 'late'])
+def test_changed_rows_replace_the_dataset(source, change):
+    df_source = source.copy()
+    if change == 'edited':
+        df_source.loc[10, 'Sales'] += 1
+    elif change == 'removed':
+        df_source = df_source.drop(index=10)
+    elif change == 'returned':
+        df_source.loc[df_source['Order ID'] == 'CA-3', 'Returned'] = 1 - df_source.loc[10, 'Returned']
+    else:
+        df_late = later_rows([1001], ['CA-late']).assign(**{'Order Date': pd.to_datetime(['2016-03-01'])})
+        df_source = pd.concat([df_source, df_late]).sort_values('Order Date', kind='stable')
+    df, df_appended = reload.apply_increment(source, df_source)
+    assert df is df_source and df_appended is None
+
+
+def test_search_index_extended_with_appended_rows(source):
+    df = pd.concat([source, later_rows([1001, 1002], ['CA-1', 'CA-new'])], ignore_index=True)
+    df.loc[5, 'City'] = None
+    full = SearchIndex(df[['City']])
+    extended = SearchIndex(df[['City']].iloc[:len(source)]).appended(df[['City']].iloc[len(source):], len(source))
+    for text in ['new', 'yo', 'los', 'c', 'zz']:
+        np.testing.assert_array_equal(extended.rows(text), full.rows(text))
+        assert extended.suggest(text) == full.suggest(text)
+
+
+def test_sample_extended_with_appended_rows(source):
+    dates = pd.concat([source['Order Date'], pd.Series(pd.Timestamp('2017-07-02'), index=range(50))],
+                      ignore_index=True)
+    sample = sampling.StratifiedSample(dates.iloc[:len(source)], 100).extended(dates.iloc[len(source):])
+    assert sample.population == len(dates)
+    assert sample.stratum_rows.sum() == len(dates)
+    assert (np.diff(sample.positions) > 0).all() and sample.positions[-1] < len(dates)
+    # Every stratum holds the rows of one month.
+    months = dates.dt.to_period('M').to_numpy()
+    for stratum in np.unique(sample.strata):
+        assert len(set(months[sample.positions[sample.strata == stratum]])) == 1
+    # Sums of the appended rows are estimated exactly, every appended row is drawn.
+    df = pd.DataFrame({'Order Date': dates, 'Sales': 1.0})
+    estimate = sampling.estimate(sample, df.iloc[sample.positions], [pd.Grouper(key='Order Date', freq='ME')],
+                                 {'Sales': 'sum'})
+    assert estimate.values['Sales'].iloc[-1] == 50
+
+
+def test_partitions_extended_with_appended_rows(source, monkeypatch):
+    monkeypatch.setattr(config, 'AGGREGATION_WORKERS', 1)
+    df = pd.concat([source, later_rows([1001, 1002], ['CA-1', 'CA-new'])], ignore_index=True)
+    by, agg = [pd.Grouper(key='Order Date', freq='ME'), 'City'], {'Sales': 'mean', 'Returned': 'sum'}
+    try:
+        aggregation.parallel_aggregate(source, by, agg, key='previous')
+        aggregation.extend('previous', 'next', df.iloc[len(source):])
+        assert aggregation.partitioned_key == 'next'
+        result = aggregation.parallel_aggregate(df, by, agg, key='next')
+    finally:
+        aggregation.reset()
+    expected = aggregation.serial_aggregate(df, by, agg)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
@@ -0,0 +1,67 @@
+# Layout and asset responses must be cached and revalidated, and gzipped when accepted (see services.responses).
+import gzip
+import json
+
+import dash
+import pytest
+from dash import html
+
+import config
+from services import responses
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'COMPRESSION_MIN_BYTES', 100)
+    (tmp_path / 'style.css').write_text('body { color: black; }\n' * 50)
+    app = dash.Dash(__name__, assets_folder=str(tmp_path))
+    app.layout = html.Div([html.P(f'Paragraph {i}') for i in range(100)])
+    responses.instrument(app)
+    return app.server.test_client()
+
+
+def test_layout_is_gzipped_with_its_own_etag(client):
+    response = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert 'no-cache' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    plain = client.get('/_dash-layout')
+    assert 'Content-Encoding' not in plain.headers
+    assert json.loads(gzip.decompress(response.data)) == json.loads(plain.data)
+    assert plain.headers['ETag'] != response.headers['ETag']
+
+
+@pytest.mark.parametrize('accept_encoding', ['gzip', 'identity'])
+def test_unchanged_layout_is_answered_with_304(client, accept_encoding):
+    headers = {'Accept-Encoding': accept_encoding}
+    etag = client.get('/_dash-layout', headers=headers).headers['ETag']
+    response = client.get('/_dash-layout', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_etag_of_the_other_encoding_is_not_matched(client):
+    etag = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/_dash-layout', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert json.loads(response.data)
+
+
+def test_fingerprinted_assets_are_cached(client):
+    response = client.get('/assets/style.css?m=1700000000', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.cache_control.public and response.cache_control.max_age == config.STATIC_MAX_AGE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).startswith(b'body')
+    unstamped = client.get('/assets/style.css')
+    assert unstamped.cache_control.max_age != config.STATIC_MAX_AGE
+
+
+def test_small_responses_are_not_compressed(client, monkeypatch):
+    monkeypatch.setattr(config, 'COMPRESSION_MIN_BYTES', 10 ** 6)
+    response = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert not response.headers['ETag'].endswith('-gzip"')
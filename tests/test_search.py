@@ -0,0 +1,68 @@
+# The prefix search index (see services.search) must find the rows a scan of the values finds: the value or one of its
+# words starts with the search text, ignoring case. The SQLite backend searches the same index built from its rows.
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import datasource
+from services.search import SearchIndex
+
+CITIES = ['Los Angeles', 'New York City', 'Newark', 'San Francisco', 'Saint Paul', 'Lafayette', 'York']
+STATES = ['California', 'New York', 'New Jersey', 'Minnesota', 'Louisiana', None]
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'City': rng.choice(np.array(CITIES, dtype=object), 500),
+        'State': pd.Categorical(rng.choice(np.array(STATES, dtype=object), 500)),
+    })
+
+
+def matches(value, text):
+    if value is None or value != value:
+        return False
+    value, text = str(value).casefold(), text.strip().casefold()
+    return value.startswith(text) or any(word.startswith(text) for word in value.split(' ')[1:])
+
+
+def scan(df, text):
+    found = np.zeros(len(df), dtype=bool)
+    for name in df.columns:
+        found |= np.array([matches(value, text) for value in df[name]])
+    return np.flatnonzero(found)
+
+
+@pytest.mark.parametrize('text', ['new', 'NEW Y', 'york', 'san', 'sa', 'l', 'city', ' paul ', 'x', 'ork'])
+def test_rows_match_a_scan(df, text):
+    np.testing.assert_array_equal(SearchIndex(df).rows(text), scan(df, text))
+
+
+def test_suggest_orders_by_rows_then_column_and_value(df):
+    counts = {(name, value): count for name in df.columns for value, count in df[name].value_counts().items()
+              if count and matches(value, 'n')}
+    order = list(df.columns)
+    expected = sorted(counts, key=lambda pair: (-counts[pair], order.index(pair[0]), pair[1]))
+    assert SearchIndex(df).suggest('n', limit=3) == expected[:3]
+    assert SearchIndex(df).suggest('n', limit=100) == expected
+
+
+def test_no_match(df):
+    index = SearchIndex(df)
+    assert len(index.rows('zz')) == 0
+    assert index.suggest('zz') == []
+
+
+def test_sqlite_backend_searches_like_pandas(df, tmp_path):
+    df = df.assign(**{'Product Name': 'Newell 312', 'Customer Name': 'Sean Miller',
+                      'Order Date': pd.date_range('2016-01-01', periods=len(df), freq='D'),
+                      'State': df['State'].astype(object).fillna('Unknown')})
+    pool = datasource.attach_or_build_database(str(tmp_path), 'v1', lambda: df, [], 1)
+    pandas_source = datasource.PandasDataSource(datasource.Dataset('v1', df), list(df.columns))
+    sqlite_source = datasource.SQLiteDataSource(datasource.Dataset('v1', None, pool=pool))
+    for text in ['new', 'york', 'sean', 'zz']:
+        expected = pandas_source.select(search=text, start_date=df['Order Date'][60], end_date=df['Order Date'][400])
+        found = sqlite_source.select(search=text, start_date=df['Order Date'][60], end_date=df['Order Date'][400])
+        pd.testing.assert_frame_equal(found, expected.reset_index(drop=True), check_dtype=False)
+        assert sqlite_source.suggest(text) == pandas_source.suggest(text)
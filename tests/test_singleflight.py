@@ -0,0 +1,99 @@
+# Concurrent calls of a single_flight callback with the same inputs must share one computation (see
+# services.singleflight), its result or its exception.
+import threading
+import time
+
+import pytest
+
+from services import singleflight
+
+
+def run_concurrently(func, calls):
+    results, errors = [None] * len(calls), [None] * len(calls)
+
+    def call(i, args):
+        try:
+            results[i] = func(*args)
+        except Exception as error:
+            errors[i] = error
+
+    threads = [threading.Thread(target=call, args=(i, args)) for i, args in enumerate(calls)]
+    # The first call leads; the others start once it is in flight and wait for it.
+    threads[0].start()
+    while not singleflight.in_flight_calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_computation():
+    computed = []
+    release = threading.Event()
+
+    @singleflight.single_flight
+    def compute(start_date, end_date):
+        computed.append((start_date, end_date))
+        release.wait()
+        return {'rows': len(computed)}
+
+    # Date pickers send the same day in different formats.
+    calls = [('2017-01-01', '2017-12-31'), ('2017-01-01T00:00:00', '2017-12-31 00:00:00'), ('2017-01-01', '2017-12-31')]
+    threads, results, errors = run_concurrently(compute, calls)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert computed == [('2017-01-01', '2017-12-31')]
+    assert errors == [None] * 3
+    assert all(result is results[0] for result in results)
+    assert not singleflight.in_flight_calls
+
+
+def test_concurrent_calls_share_the_exception():
+    release = threading.Event()
+    calls = []
+
+    @singleflight.single_flight
+    def compute(value):
+        calls.append(value)
+        release.wait()
+        raise ValueError(value)
+
+    threads, results, errors = run_concurrently(compute, [('a',), ('a',)])
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ['a']
+    assert isinstance(errors[0], ValueError) and errors[1] is errors[0]
+    assert not singleflight.in_flight_calls
+
+
+def test_other_inputs_and_later_calls_compute_again():
+    release = threading.Event()
+    calls = []
+
+    @singleflight.single_flight
+    def compute(value):
+        calls.append(value)
+        release.wait()
+        return value
+
+    threads, results, errors = run_concurrently(compute, [('a',), ('b',)])
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == ['a', 'b'] and results == ['a', 'b']
+    assert compute('a') == 'a'
+    assert calls[-1] == 'a' and len(calls) == 3
+
+
+@pytest.mark.parametrize('value, normalised', [
+    ('2017-01-01T00:00:00', '2017-01-01'),
+    ('2017-01-01 00:00:00.000', '2017-01-01'),
+    ('2017-01-01T10:00:00', '2017-01-01T10:00:00'),
+    (['2017-01-01T00:00:00', 'W'], ('2017-01-01', 'W')),
+    ({'b': 1, 'a': '2017-01-01 00:00:00'}, (('a', '2017-01-01'), ('b', 1))),
+])
+def test_normalise_value(value, normalised):
+    assert singleflight.normalise_value(value) == normalised